@@ -1,11 +1,37 @@
-from flask import Flask, send_from_directory, render_template_string, jsonify
+from flask import Flask, Response, send_file, jsonify, request, abort, stream_with_context
+from werkzeug.security import safe_join
 import os
+import re
 import json
+import hashlib
+import mimetypes
 from pathlib import Path
+from functools import lru_cache
+
+from .artifact_cache import ArtifactCache
+from .precompress import pick_encoding, is_precompressed_sibling, ENCODING_SUFFIXES
+from .storage import get_storage
+from .utils import optional_import
+from . import jobs
+from . import events
+from . import exporter
+from . import serialization
+from .main import PIPELINE_STAGES
 
 BASE = Path(__file__).resolve().parent
 OUT = BASE / 'outputs'
 app = Flask(__name__)
+# local files, or a read-through cache of a shared bucket (CALYCO_STORAGE)
+storage = get_storage()
+cache = ArtifactCache(OUT, storage=storage)
+
+# Artifacts the preview page is rendered from; the rendered page is memoised
+# until one of them (or the directory listing) changes.
+INDEX_SOURCES = ['article.html', 'metadata.json', 'qa_report.json', 'hero.png']
+
+# Artifacts change with every run, so caches may keep them for a short while
+# and must then revalidate with the ETag (a cheap 304).
+CACHE_MAX_AGE = int(os.environ.get('CALYCO_CACHE_MAX_AGE', '60'))
 
 
 HTML_TEMPLATE = """
@@ -224,45 +250,39 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Compiled once at import instead of on every request
+INDEX_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
 
-@app.route('/')
-def index():
-    """Main preview page with article and metadata"""
-    article_path = OUT / 'article.html'
-    hero_exists = (OUT / 'hero.png').exists()
-    
+
+def _article_body(full_html):
+    match = re.search(r'<body[^>]*>(.*?)</body>', full_html, re.S)
+    return match.group(1) if match else ""
+
+
+def _render_index():
     article_html = ""
     metadata = None
     metadata_json = ""
     stats = {}
     files = []
-    
+
     try:
-        if article_path.exists():
-            full_html = article_path.read_text(encoding='utf-8')
-            # Extract body content
-            import re
-            match = re.search(r'<body[^>]*>(.*?)</body>', full_html, re.S)
-            if match:
-                article_html = match.group(1)
-        
-        md_path = OUT / 'metadata.json'
-        if md_path.exists():
-            metadata = json.load(open(md_path, 'r', encoding='utf-8'))
+        full_html = cache.text('article.html')
+        if full_html:
+            article_html = _article_body(full_html)
+
+        metadata = cache.json('metadata.json')
+        if metadata is not None:
             metadata_json = f"<pre>{json.dumps(metadata, ensure_ascii=False, indent=2)}</pre>"
-        
-        qa_path = OUT / 'qa_report.json'
-        if qa_path.exists():
-            stats = json.load(open(qa_path, 'r', encoding='utf-8'))
-        
-        files = sorted([p.name for p in OUT.iterdir() if p.is_file()])
-    except Exception as e:
+
+        stats = cache.json('qa_report.json') or {}
+        files = cache.listing()
+    except Exception:
         pass
-    
-    return render_template_string(
-        HTML_TEMPLATE,
+
+    return INDEX_TEMPLATE.render(
         article=article_html,
-        hero_exists=hero_exists,
+        hero_exists=cache.exists('hero.png'),
         stats=stats,
         metadata=metadata,
         metadata_json=metadata_json,
@@ -270,58 +290,239 @@ def index():
     )
 
 
+def _render_index_with_etag():
+    page = _render_index()
+    return page, hashlib.sha256(page.encode('utf-8')).hexdigest()
+
+
+def _revalidating(resp, etag, max_age=0):
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    resp.cache_control.must_revalidate = True
+    return resp.make_conditional(request)
+
+
+@app.route('/')
+def index():
+    """Main preview page with article and metadata"""
+    page, etag = cache.memo('index', cache.signature(INDEX_SOURCES), _render_index_with_etag)
+    return _revalidating(Response(page, mimetype='text/html'), etag)
+
+
+def _send_artifact(filename, artifacts=cache):
+    """Send a file from ``artifacts``' directory (``outputs/`` by default) with a
+    content-hash ETag, 304/Range handling and the best precompressed encoding
+    the client accepts."""
+    root = artifacts.root
+    path = safe_join(root, filename)
+    # .gz/.br siblings are only sent as an encoding of their source file
+    if path is None or is_precompressed_sibling(filename) or storage.fetch_path(path) is None:
+        abort(404)
+    if storage.remote:
+        for suffix in ENCODING_SUFFIXES.values():
+            storage.fetch_path(path + suffix)
+    encoding, send_path = pick_encoding(request.headers.get('Accept-Encoding'), path)
+    rel = os.path.relpath(send_path, root)
+    etag = artifacts.content_hash(rel)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    resp = send_file(send_path, mimetype=mimetype, etag=etag, conditional=True, max_age=CACHE_MAX_AGE)
+    resp.cache_control.must_revalidate = True
+    resp.vary.add('Accept-Encoding')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    return resp
+
+
 @app.route('/hero.png')
 def hero():
     """Serve hero image"""
-    try:
-        return send_from_directory(OUT, 'hero.png')
-    except Exception:
+    if not cache.exists('hero.png'):
         return "Hero image not found", 404
+    return _send_artifact('hero.png')
 
 
 @app.route('/outputs/<path:filename>')
 def outputs(filename):
     """Serve files from outputs directory"""
+    path = safe_join(str(OUT), filename)
+    if path is None or storage.fetch_path(path) is None:
+        return "File not found", 404
+    if filename.endswith('.json') and serialization.is_binary(path):
+        # internal artifacts may be MessagePack (CALYCO_ARTIFACT_FORMAT); browsers get JSON
+        return _api_json(filename)
+    return _send_artifact(filename)
+
+
+def _api_json(name):
+    body = None
+    etag = None
     try:
-        return send_from_directory(OUT, filename)
+        body = cache.json_bytes(name)
+        etag = cache.content_hash(name) if body is not None else None
     except Exception:
-        return "File not found", 404
+        pass
+    resp = Response(body or b'{}', mimetype='application/json')
+    return _revalidating(resp, etag or 'empty')
 
 
 @app.route('/api/metadata')
 def api_metadata():
     """API endpoint for metadata"""
-    try:
-        md_path = OUT / 'metadata.json'
-        if md_path.exists():
-            return jsonify(json.load(open(md_path, 'r', encoding='utf-8')))
-    except Exception:
-        pass
-    return jsonify({})
+    return _api_json('metadata.json')
 
 
 @app.route('/api/article')
 def api_article():
     """API endpoint for article data"""
-    try:
-        art_path = OUT / 'article.json'
-        if art_path.exists():
-            return jsonify(json.load(open(art_path, 'r', encoding='utf-8')))
-    except Exception:
-        pass
-    return jsonify({})
+    return _api_json('article.json')
 
 
 @app.route('/api/stats')
 def api_stats():
     """API endpoint for QA statistics"""
-    try:
-        qa_path = OUT / 'qa_report.json'
-        if qa_path.exists():
-            return jsonify(json.load(open(qa_path, 'r', encoding='utf-8')))
-    except Exception:
-        pass
-    return jsonify({})
+    return _api_json('qa_report.json')
+
+
+def _run_view(run):
+    """Public view of a queued run with links to its artifacts"""
+    run_id = run['id']
+    return {
+        'id': run_id,
+        'topic': run['topic'],
+        'keywords': run['keywords'],
+        'seed': run['seed'],
+        'status': run['status'],
+        'attempts': run['attempts'],
+        'max_attempts': run['max_attempts'],
+        'stages': {name: run['stages'].get(name, {'status': 'pending'}) for name in PIPELINE_STAGES},
+        'error': run['error'],
+        'created': run['created'],
+        'updated': run['updated'],
+        'artifacts': {name: f'/runs/{run_id}/{name}' for name in jobs.run_artifacts(run_id)},
+        'links': {'self': f'/api/runs/{run_id}'},
+    }
+
+
+@app.route('/api/runs', methods=['POST'])
+def api_create_run():
+    """Queue a pipeline run: {"topic": ..., "keywords": [...], "seed": ...}"""
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'expected a JSON object'}), 400
+    keywords = payload.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(',') if k.strip()]
+    if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+        return jsonify({'error': 'keywords must be a list of strings'}), 400
+    for field in ('topic', 'seed'):
+        if not isinstance(payload.get(field), (str, type(None))):
+            return jsonify({'error': f'{field} must be a string or null'}), 400
+    run_id = jobs.enqueue_run(topic=payload.get('topic'), keywords=keywords, seed=payload.get('seed'))
+    resp = jsonify(_run_view(jobs.get_run(run_id)))
+    resp.status_code = 202
+    resp.headers['Location'] = f'/api/runs/{run_id}'
+    return resp
+
+
+@app.route('/api/runs', methods=['GET'])
+def api_list_runs():
+    """Most recent queued/finished runs"""
+    limit = request.args.get('limit', default=50, type=int)
+    return jsonify({'runs': [_run_view(r) for r in jobs.list_runs(limit=limit)]})
+
+
+@app.route('/api/runs/<run_id>')
+def api_get_run(run_id):
+    """Stage-level status of one run"""
+    run = jobs.get_run(run_id)
+    if run is None:
+        return jsonify({'error': 'run not found'}), 404
+    resp = jsonify(_run_view(run))
+    resp.cache_control.no_cache = True
+    return resp
+
+
+@lru_cache(maxsize=64)
+def _run_cache(run_id):
+    return ArtifactCache(jobs.run_dir(run_id) / 'outputs', storage=storage)
+
+
+@app.route('/runs/<run_id>/<path:filename>')
+def run_outputs(run_id, filename):
+    """Serve an artifact produced by a queued run"""
+    if not run_id.isalnum():
+        return "File not found", 404
+    artifacts = _run_cache(run_id)
+    path = safe_join(artifacts.root, filename)
+    if path is None or storage.fetch_path(path) is None:
+        return "File not found", 404
+    return _send_artifact(filename, artifacts)
+
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _event_stream(run_id=None):
+    events.ensure_tailer()
+    q = events.bus.subscribe()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = q.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except Exception:
+                    yield ': keepalive\n\n'
+                    continue
+                if run_id is None or event.get('run_id') == run_id:
+                    yield events.format_sse(event)
+        finally:
+            events.bus.unsubscribe(q)
+
+    resp = Response(generate(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+@app.route('/api/events')
+def api_events():
+    """Server-Sent Events stream of run and stage progress (?run_id= to filter)"""
+    return _event_stream(request.args.get('run_id'))
+
+
+@app.route('/api/runs/<run_id>/events')
+def api_run_events(run_id):
+    """Server-Sent Events stream for one run"""
+    return _event_stream(run_id)
+
+
+@app.route('/api/export')
+def api_export():
+    """Stream an archive of outputs: ?format=zip|tar.zst, ?runs=id1,id2 for queued runs"""
+    fmt = request.args.get('format', 'zip')
+    if fmt not in exporter.FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(exporter.FORMATS)}"}), 400
+    if fmt == 'tar.zst' and optional_import('zstandard') is None:
+        return jsonify({'error': 'tar.zst export is not available (zstandard not installed)'}), 501
+    run_ids = [r for r in request.args.get('runs', '').split(',') if r]
+    if not all(r.isalnum() for r in run_ids):
+        return jsonify({'error': 'invalid run id'}), 400
+    sources = exporter.run_sources(run_ids) if run_ids else None
+    name = f"calyco_{'runs' if run_ids else 'outputs'}.{fmt}"
+    resp = Response(stream_with_context(exporter.iter_archive(fmt, sources)), mimetype=exporter.MIMETYPES[fmt])
+    resp.headers['Content-Disposition'] = f'attachment; filename="{name}"'
+    resp.cache_control.no_store = True
+    return resp
+
+
+@app.route('/api/notify/run-complete', methods=['POST'])
+def notify_run_complete():
+    """Drop cached artifacts after a run finished (e.g. on another host)"""
+    cache.invalidate()
+    return jsonify({'ok': True, 'generation': cache.generation})
 
 
 if __name__ == '__main__':
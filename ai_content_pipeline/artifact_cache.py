@@ -0,0 +1,161 @@
+"""
+In-memory cache of output artifacts for the preview server.
+
+Entries are keyed by file name and validated against the file's
+(mtime_ns, size) signature, so a changed artifact is re-read on the next
+access. A completed run touches ``outputs/.run_complete`` (see
+``utils.mark_run_complete``); when that marker changes every entry is dropped
+at once, including memoised values derived from several files.
+
+With a remote ``storage`` backend (see ``storage``), each file is refreshed
+from the bucket through the backend's read-through cache before its local
+signature is checked.
+"""
+import os
+import hashlib
+import threading
+
+from .serialization import dumps, load as load_artifact
+from .precompress import is_precompressed_sibling
+
+RUN_COMPLETE_MARKER = '.run_complete'
+
+
+def file_signature(path):
+    """(mtime_ns, size) of ``path`` or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ArtifactCache:
+    """Stat-validated cache of parsed artifacts under one directory."""
+
+    def __init__(self, root, storage=None):
+        self.root = str(root)
+        self._remote = storage if getattr(storage, 'remote', False) else None
+        self.generation = 0
+        self._entries = {}
+        self._memo = {}
+        self._marker_sig = file_signature(self._path(RUN_COMPLETE_MARKER))
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _refresh(self, name):
+        if self._remote is not None:
+            self._remote.fetch_path(self._path(name))
+
+    def _check_marker(self):
+        self._refresh(RUN_COMPLETE_MARKER)
+        sig = file_signature(self._path(RUN_COMPLETE_MARKER))
+        if sig != self._marker_sig:
+            with self._lock:
+                self._marker_sig = sig
+                self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._memo.clear()
+        self.generation += 1
+
+    def invalidate(self):
+        """Drop everything, e.g. when notified that a run has finished."""
+        with self._lock:
+            self._clear()
+
+    def get(self, name, loader, kind=''):
+        """Return ``loader(path)`` for ``name``, re-running it only when the file changed.
+
+        ``kind`` separates several views of the same file. Missing files yield None.
+        """
+        self._check_marker()
+        self._refresh(name)
+        path = self._path(name)
+        sig = file_signature(path)
+        key = (name, kind)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        value = loader(path) if sig is not None else None
+        with self._lock:
+            self._entries[key] = (sig, value)
+        return value
+
+    def text(self, name):
+        return self.get(name, _read_text, 'text')
+
+    def json(self, name):
+        return self.get(name, load_artifact, 'json')
+
+    def json_bytes(self, name):
+        """Compact UTF-8 JSON body for ``name``, ready to send as a response."""
+        return self.get(name, _compact_json, 'json_bytes')
+
+    def content_hash(self, name):
+        """SHA-256 hex digest of the file's bytes, used as a strong ETag."""
+        return self.get(name, _sha256_file, 'sha256')
+
+    def path(self, name):
+        return self._path(name)
+
+    def exists(self, name):
+        self._refresh(name)
+        return file_signature(self._path(name)) is not None
+
+    def listing(self):
+        """Sorted names of the visible files in the directory."""
+        self._check_marker()
+        if self._remote is not None:
+            return [n for n in self._remote.list_dir(self.root)
+                    if not n.startswith('.') and not is_precompressed_sibling(n)]
+        sig = file_signature(self.root)
+        entry = self._entries.get(('/', 'listing'))
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        try:
+            names = sorted(e.name for e in os.scandir(self.root) if e.is_file() and not e.name.startswith('.')
+                           and not is_precompressed_sibling(e.name))
+        except OSError:
+            names = []
+        with self._lock:
+            self._entries[('/', 'listing')] = (sig, names)
+        return names
+
+    def signature(self, names):
+        """Combined signature of several files plus the directory listing."""
+        for n in names:
+            self._refresh(n)
+        listing = tuple(self.listing()) if self._remote is not None else ()
+        return tuple(file_signature(self._path(n)) for n in names) + (file_signature(self.root), listing)
+
+    def memo(self, key, sig, build):
+        """Memoise a value derived from several artifacts under ``sig``."""
+        self._check_marker()
+        entry = self._memo.get(key)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        value = build()
+        with self._lock:
+            self._memo[key] = (sig, value)
+        return value
+
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _compact_json(path):
+    return dumps(load_artifact(path), 'compact')
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,113 @@
+"""
+Per-run checkpoint manifests.
+
+After each stage of ``run_full`` completes, its return value and the files it
+wrote (with size and SHA-256) are recorded in ``checkpoints/<run_id>.json``.
+Resuming a run restarts from the first stage whose manifest entry is missing
+or whose files changed; that stage and every later one run again.
+"""
+import os
+import time
+import hashlib
+from pathlib import Path
+
+from .utils import now_ts
+from . import serialization
+
+BASE = Path(__file__).resolve().parent
+CHECKPOINT_DIR = Path(os.environ.get('CALYCO_CHECKPOINT_DIR', str(BASE / 'checkpoints')))
+
+
+def checkpoint_path(run_id):
+    return CHECKPOINT_DIR / f'{run_id}.json'
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Checkpoint:
+    """Manifest of the completed stages of one run."""
+
+    def __init__(self, run_id, manifest):
+        self.run_id = run_id
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, run_id):
+        """Existing checkpoint for ``run_id`` or None."""
+        path = checkpoint_path(run_id)
+        if not path.exists():
+            return None
+        return cls(run_id, serialization.load(path))
+
+    @classmethod
+    def load_or_create(cls, run_id, **run_args):
+        """Open the run's checkpoint, creating it from ``run_args`` if new."""
+        cp = cls.load(run_id)
+        if cp is None:
+            cp = cls(run_id, {'run_id': run_id, 'created': now_ts(), 'args': run_args, 'stages': {}})
+            cp.save()
+        return cp
+
+    @property
+    def args(self):
+        return self.manifest.get('args', {})
+
+    def save(self):
+        CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+        self.manifest['updated'] = now_ts()
+        serialization.dump(checkpoint_path(self.run_id), self.manifest)
+
+    def complete(self, stage, result, files=(), digests=None):
+        """Record ``stage`` as done with its result and output files.
+
+        ``digests`` (``{path: {'size', 'sha256'}}``) covers files whose bytes
+        the caller already holds, so they are not read back to hash them.
+        """
+        outputs = {}
+        digests = digests or {}
+        for p in files:
+            p = str(p)
+            if p in digests:
+                outputs[p] = digests[p]
+            elif os.path.isfile(p):
+                outputs[p] = {'size': os.path.getsize(p), 'sha256': _file_digest(p)}
+        self.manifest['stages'][stage] = {
+            'status': 'done',
+            'result': result,
+            'outputs': outputs,
+            'completed_at': time.time(),
+        }
+        self.save()
+
+    def is_complete(self, stage):
+        """True if ``stage`` finished and all its recorded files are unchanged."""
+        entry = self.manifest['stages'].get(stage)
+        if not entry or entry.get('status') != 'done':
+            return False
+        for p, info in entry.get('outputs', {}).items():
+            if not os.path.isfile(p) or os.path.getsize(p) != info['size'] or _file_digest(p) != info['sha256']:
+                return False
+        return True
+
+    def result(self, stage):
+        return self.manifest['stages'][stage]['result']
+
+    def first_incomplete(self, stages):
+        for stage in stages:
+            if not self.is_complete(stage):
+                return stage
+        return None
+
+    def discard_from(self, stages, first):
+        """Forget ``first`` and every stage after it in ``stages``; their results are stale once it re-runs."""
+        later = stages[stages.index(first):]
+        if any(stage in self.manifest['stages'] for stage in later):
+            for stage in later:
+                self.manifest['stages'].pop(stage, None)
+            self.save()
@@ -0,0 +1,37 @@
+"""
+Structured article content.
+
+A content pack (``content/<name>.json``) holds everything the renderer needs
+for one article family: title, intro, sections, takeaways, hero alt text,
+conclusion, metadata, FAQ and social captions. ``article_content`` returns a
+fresh copy with the requested topic and publish date applied, ready to pass
+to ``renderer``.
+"""
+import json
+import copy
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+CONTENT_DIR = Path(__file__).resolve().parent / 'content'
+DEFAULT_PACK = 'pastel_homes'
+
+
+@lru_cache(maxsize=None)
+def _load_pack(name):
+    with open(CONTENT_DIR / f'{name}.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def available_packs():
+    return sorted(p.stem for p in CONTENT_DIR.glob('*.json'))
+
+
+def article_content(topic=None, pack=DEFAULT_PACK, date_published=None):
+    """Content object for one article; ``topic`` overrides the pack's title."""
+    content = copy.deepcopy(_load_pack(pack))
+    content['topic'] = topic
+    if topic:
+        content['title'] = topic
+    content['metadata']['datePublished'] = date_published or str(date.today())
+    return content
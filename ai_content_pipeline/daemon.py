@@ -0,0 +1,195 @@
+"""
+Long-running pipeline daemon.
+
+Keeps HTTP sessions, API clients and the latest trends/feeds warm in memory,
+refreshes them on a schedule and accepts run requests over local HTTP so a
+run only pays for the stage work itself.
+
+    python -m ai_content_pipeline.main --daemon --port 8765
+
+Endpoints:
+    GET  /health    liveness probe
+    GET  /status    cache ages, refresh count and last run summary
+    POST /refresh   refresh trends and feeds now
+    POST /run       run the full pipeline, body: {"seed": "calyco"}
+"""
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .utils import write_run_log, now_ts, optional_import
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_REFRESH_INTERVAL = 900.0
+
+
+class PipelineDaemon:
+    """Holds warm clients and cached source data between runs."""
+
+    def __init__(self, out_base, refresh_interval=DEFAULT_REFRESH_INTERVAL, feed_urls=None):
+        self.out_base = out_base
+        self.refresh_interval = refresh_interval
+        self.feed_urls = feed_urls or []
+        self.trends = None
+        self.feeds = None
+        self.refreshed_at = None
+        self.refresh_count = 0
+        self.last_run = None
+        self.run_count = 0
+        self._data_lock = threading.Lock()
+        # runs and refreshes share one outputs/ directory, so they execute one at a time
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def warm_up(self):
+        """Import the heavy modules and build the shared clients once."""
+        from . import data_collector, content_generator, image_generator, qa_and_valuation  # noqa: F401
+        session = data_collector.get_http_session()
+        try:
+            data_collector.get_trends_client()
+        except Exception as e:
+            write_run_log(self.out_base, f'Daemon: pytrends client unavailable: {e}')
+        optional_import('PIL.Image')
+        openai = optional_import('openai')
+        if openai is not None and hasattr(openai, 'requestssession'):
+            openai.requestssession = session
+        self.refresh()
+
+    def refresh(self):
+        from .data_collector import collect_trends, fetch_feeds
+        # writes outputs/trend_summary.json and competitor_feeds.json, which runs write too
+        with self._run_lock:
+            trends = collect_trends(out_base=self.out_base)
+            feeds = fetch_feeds(self.feed_urls, out_base=self.out_base)
+        with self._data_lock:
+            self.trends, self.feeds = trends, feeds
+            self.refreshed_at = time.time()
+            self.refresh_count += 1
+        write_run_log(self.out_base, f'Daemon: refreshed trends and feeds (#{self.refresh_count})')
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                write_run_log(self.out_base, f'Daemon refresh error: {e}')
+
+    def start(self):
+        self.warm_up()
+        if self.refresh_interval and self.refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name='calyco-refresh', daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, seed_text='calyco'):
+        from .main import run_full
+        with self._run_lock:
+            # taken under the run lock so a refresh that just finished is used
+            with self._data_lock:
+                trends, feeds = self.trends, self.feeds
+            started = time.perf_counter()
+            summary = run_full(seed_text=seed_text, trends=trends, feeds=feeds)
+            elapsed = time.perf_counter() - started
+            self.run_count += 1
+            self.last_run = {
+                'seed': seed_text,
+                'finished': now_ts(),
+                'seconds': round(elapsed, 3),
+                'title': (summary or {}).get('article', {}).get('title'),
+            }
+        return self.last_run
+
+    def status(self):
+        with self._data_lock:
+            age = None if self.refreshed_at is None else round(time.time() - self.refreshed_at, 1)
+            return {
+                'refresh_interval': self.refresh_interval,
+                'refresh_count': self.refresh_count,
+                'data_age_seconds': age,
+                'trend_count': len((self.trends or {}).get('trend_summary', [])),
+                'feed_count': len(self.feeds or []),
+                'run_count': self.run_count,
+                'last_run': self.last_run,
+            }
+
+
+def _make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, obj, status=200):
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json({'ok': True})
+            elif self.path == '/status':
+                self._send_json(daemon.status())
+            else:
+                self._send_json({'error': 'not found'}, 404)
+
+        def do_POST(self):
+            try:
+                payload = self._read_json()
+            except ValueError:
+                self._send_json({'error': 'invalid JSON body'}, 400)
+                return
+            try:
+                if self.path == '/run':
+                    self._send_json(daemon.run(seed_text=payload.get('seed') or 'calyco'))
+                elif self.path == '/refresh':
+                    daemon.refresh()
+                    self._send_json(daemon.status())
+                else:
+                    self._send_json({'error': 'not found'}, 404)
+            except Exception as e:
+                self._send_json({'error': str(e)}, 500)
+
+        def log_message(self, fmt, *args):
+            write_run_log(daemon.out_base, 'Daemon: ' + (fmt % args))
+
+    return Handler
+
+
+def serve_daemon(host=None, port=None, refresh_interval=None, out_base=None):
+    """Start the daemon and block serving requests until interrupted."""
+    from .main import BASE, print_header, print_info, print_warning
+    host = host or os.environ.get('CALYCO_DAEMON_HOST', DEFAULT_HOST)
+    port = port or int(os.environ.get('CALYCO_DAEMON_PORT', DEFAULT_PORT))
+    if refresh_interval is None:
+        refresh_interval = float(os.environ.get('CALYCO_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL))
+    out_base = out_base or str(BASE)
+    feed_urls = [u for u in os.environ.get('CALYCO_FEED_URLS', '').split(',') if u.strip()]
+
+    print_header("STARTING PIPELINE DAEMON")
+    daemon = PipelineDaemon(out_base, refresh_interval=refresh_interval, feed_urls=feed_urls)
+    daemon.start()
+    server = ThreadingHTTPServer((host, port), _make_handler(daemon))
+    print_info(f"Daemon listening on http://{host}:{port} (refresh every {refresh_interval:g}s)")
+    print_warning("Press Ctrl+C to stop the daemon\n")
+    write_run_log(out_base, f'Daemon started on {host}:{port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        server.server_close()
+        write_run_log(out_base, 'Daemon stopped')
@@ -1,20 +1,12 @@
 import os
-import json
+import time
 import traceback
-from .utils import ensure_outputs_dir, write_run_log, deterministic_choice, seed_from_text
+from .utils import ensure_outputs_dir, write_run_log, deterministic_choice, seed_from_text, optional_import
+from . import hedging
+from .run_context import store
 
-try:
-    from pytrends.request import TrendReq
-except Exception:
-    TrendReq = None
-
-try:
-    import feedparser
-except Exception:
-    feedparser = None
-
-import requests
-from bs4 import BeautifulSoup
+# requests, bs4 and pytrends are imported on first use so that
+# importing this module (e.g. from the CLI menu) stays cheap.
 
 
 DEFAULT_KEYWORDS = [
@@ -23,80 +15,155 @@ DEFAULT_KEYWORDS = [
     "urban home décor trends",
 ]
 
+# Clients are created once per process so long-running callers (the daemon)
+# reuse their connection pools instead of rebuilding them on every run.
+_TRENDS_CLIENT = None
+_HTTP_SESSION = None
+
+# Feeds read per run and entries kept from each; parsing stops at the limit
+MAX_FEEDS = 2
+FEED_ITEM_LIMIT = 3
+
+
+def get_trends_client():
+    global _TRENDS_CLIENT
+    if _TRENDS_CLIENT is None:
+        pytrends_request = optional_import('pytrends.request')
+        if pytrends_request is None:
+            raise RuntimeError('pytrends not available')
+        _TRENDS_CLIENT = pytrends_request.TrendReq(hl='en-US', tz=330)
+    return _TRENDS_CLIENT
+
+
+def get_http_session():
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        import requests
+        _HTTP_SESSION = requests.Session()
+        _HTTP_SESSION.headers.update({'User-Agent': 'calyco-bot/1.0'})
+    return _HTTP_SESSION
+
+
+def _pytrends_bullets(keywords):
+    pytrends = get_trends_client()
+    pytrends.build_payload(keywords, timeframe='today 3-m')
+    data = pytrends.interest_over_time()
+    # simple summary: pick trend directions
+    bullets = []
+    for k in keywords:
+        bullets.append(f"Search interest for '{k}' has shown recent upticks in metropolitan areas.")
+    return bullets[:5]
+
+
+def _fallback_bullets(keywords):
+    # deterministic fallback
+    seed = 'trends-' + '-'.join(keywords)
+    return [
+        deterministic_choice(seed + '1', [
+            'Pastel palettes are rising in searches among urban homeowners.',
+            'Minimalist soft-colour interior updates are trending in 2025.',
+        ]),
+        deterministic_choice(seed + '2', [
+            'Natural light and plant-friendly palettes are influencing paint choices.',
+            'Textured finishes are receiving renewed interest for accent walls.',
+        ]),
+        deterministic_choice(seed + '3', [
+            'Sustainable paint pigments remain a buyer concern.',
+            'Easy-clean and low-VOC paints are top considerations.'
+        ])
+    ]
+
 
-def collect_trends(keywords=None, out_base='.'):
+def collect_trends(keywords=None, out_base='.', deadline=None, hedge_log=None, ctx=None):
+    """Summarise search trends for ``keywords``.
+
+    With a ``deadline`` (absolute ``time.monotonic()``), pytrends runs in the
+    background while the deterministic summary is built, and whichever is
+    available by the deadline is used. ``hedge_log`` collects which path won.
+    The summary is stored in ``ctx`` (a ``RunContext``) when given.
+    """
     keywords = keywords or DEFAULT_KEYWORDS
     out = ensure_outputs_dir(out_base)
     write_run_log(out_base, f"Starting trends collection for: {keywords}")
     result = {'keywords': keywords, 'trend_summary': []}
-    try:
-        if TrendReq is None:
-            raise RuntimeError('pytrends not available')
-        pytrends = TrendReq(hl='en-US', tz=330)
-        pytrends.build_payload(keywords, timeframe='today 3-m')
-        data = pytrends.interest_over_time()
-        # simple summary: pick trend directions
-        bullets = []
-        for k in keywords:
-            bullets.append(f"Search interest for '{k}' has shown recent upticks in metropolitan areas.")
-        result['trend_summary'] = bullets[:5]
-    except Exception as e:
-        write_run_log(out_base, f"pytrends error: {e}")
-        # deterministic fallback
-        seed = 'trends-' + '-'.join(keywords)
-        bullets = [
-            deterministic_choice(seed + '1', [
-                'Pastel palettes are rising in searches among urban homeowners.',
-                'Minimalist soft-colour interior updates are trending in 2025.',
-            ]),
-            deterministic_choice(seed + '2', [
-                'Natural light and plant-friendly palettes are influencing paint choices.',
-                'Textured finishes are receiving renewed interest for accent walls.',
-            ]),
-            deterministic_choice(seed + '3', [
-                'Sustainable paint pigments remain a buyer concern.',
-                'Easy-clean and low-VOC paints are top considerations.'
-            ])
-        ]
+    if deadline is not None:
+        bullets, info = hedging.hedged(lambda: _pytrends_bullets(keywords), lambda: _fallback_bullets(keywords),
+                                       deadline, name='trends', log=hedge_log)
+        if info['path'] == 'fallback':
+            write_run_log(out_base, f"pytrends not used ({info['reason']})")
         result['trend_summary'] = bullets
+        result['source'] = 'pytrends' if info['path'] == 'primary' else 'fallback'
+    else:
+        started = time.monotonic()
+        try:
+            result['trend_summary'] = _pytrends_bullets(keywords)
+            result['source'] = 'pytrends'
+            hedging.record(hedge_log, 'trends', 'primary', 'ok', started)
+        except Exception as e:
+            write_run_log(out_base, f"pytrends error: {e}")
+            result['trend_summary'] = _fallback_bullets(keywords)
+            result['source'] = 'fallback'
+            hedging.record(hedge_log, 'trends', 'fallback', f'error: {e}', started)
 
     path = os.path.join(out, 'trend_summary.json')
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    store(ctx, out_base, 'trend_summary.json', result)
     write_run_log(out_base, f"Saved trend summary to {path}")
     return result
 
 
-def fetch_feeds(feed_urls=None, out_base='.'):
+def _feed_items(feed_urls, timeout=6):
+    from .feed_parser import parse_feed
+    if not feed_urls:
+        raise RuntimeError('no feed URLs configured')
+    items = []
+    for url in feed_urls[:MAX_FEEDS]:
+        session = get_http_session() if url.startswith(('http://', 'https://')) else None
+        items.extend(parse_feed(url, limit=FEED_ITEM_LIMIT, session=session, timeout=timeout))
+    return items
+
+
+def _fallback_feed_items(feed_urls):
+    # fallback: return deterministic competitor bullets
+    seed = 'feeds-' + ''.join(feed_urls)
+    return [
+        {'title': 'Competitor: Pastel Home Trends', 'link': 'https://example.com/comp1', 'summary': deterministic_choice(seed + 'a', [
+            'Competitor highlights soft blush and sage palettes for small spaces.',
+            'Competitor explores textured finishes and matte coatings.'
+        ])},
+        {'title': 'Competitor: Paint Guide', 'link': 'https://example.com/comp2', 'summary': deterministic_choice(seed + 'b', [
+            'Competitor recommends sample painting and natural lighting tests.',
+            'Competitor advises pairing pastels with wooden accents.'
+        ])}
+    ]
+
+
+def fetch_feeds(feed_urls=None, out_base='.', deadline=None, hedge_log=None, ctx=None):
+    """Fetch up to three entries from each of the first two competitor feeds.
+
+    ``deadline``/``hedge_log``/``ctx`` behave as in ``collect_trends``.
+    """
     feed_urls = feed_urls or []
     out = ensure_outputs_dir(out_base)
     write_run_log(out_base, f"Starting feed fetch for: {feed_urls}")
-    items = []
-    try:
-        if feedparser is None:
-            raise RuntimeError('feedparser not available')
-        for url in feed_urls[:2]:
-            d = feedparser.parse(url)
-            for e in d.entries[:3]:
-                items.append({'title': e.get('title'), 'link': e.get('link'), 'summary': e.get('summary', '')})
-    except Exception as e:
-        write_run_log(out_base, f"feedparser error: {e}")
-        # fallback: return deterministic competitor bullets
-        seed = 'feeds-' + ''.join(feed_urls)
-        items = [
-            {'title': 'Competitor: Pastel Home Trends', 'link': 'https://example.com/comp1', 'summary': deterministic_choice(seed + 'a', [
-                'Competitor highlights soft blush and sage palettes for small spaces.',
-                'Competitor explores textured finishes and matte coatings.'
-            ])},
-            {'title': 'Competitor: Paint Guide', 'link': 'https://example.com/comp2', 'summary': deterministic_choice(seed + 'b', [
-                'Competitor recommends sample painting and natural lighting tests.',
-                'Competitor advises pairing pastels with wooden accents.'
-            ])}
-        ]
+    if deadline is not None:
+        timeout = min(6, hedging.remaining(deadline, floor=0.1))
+        items, info = hedging.hedged(lambda: _feed_items(feed_urls, timeout=timeout),
+                                     lambda: _fallback_feed_items(feed_urls),
+                                     deadline, name='feeds', log=hedge_log)
+        if info['path'] == 'fallback':
+            write_run_log(out_base, f"feeds not used ({info['reason']})")
+    else:
+        started = time.monotonic()
+        try:
+            items = _feed_items(feed_urls)
+            hedging.record(hedge_log, 'feeds', 'primary', 'ok', started)
+        except Exception as e:
+            write_run_log(out_base, f"feed error: {e}")
+            items = _fallback_feed_items(feed_urls)
+            hedging.record(hedge_log, 'feeds', 'fallback', f'error: {e}', started)
 
     path = os.path.join(out, 'competitor_feeds.json')
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    store(ctx, out_base, 'competitor_feeds.json', items)
     write_run_log(out_base, f"Saved competitor feeds to {path}")
     return items
 
@@ -104,8 +171,9 @@ def fetch_feeds(feed_urls=None, out_base='.'):
 def fetch_page_snippet(url, out_base='.'):
     write_run_log(out_base, f"Fetching page snippet: {url}")
     try:
-        r = requests.get(url, timeout=6, headers={'User-Agent': 'calyco-bot/1.0'})
+        r = get_http_session().get(url, timeout=6)
         if r.status_code == 200:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(r.text, 'html.parser')
             title = soup.title.string.strip() if soup.title else url
             p = soup.find('p')
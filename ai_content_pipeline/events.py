@@ -0,0 +1,174 @@
+"""
+In-process event bus for pipeline progress.
+
+``run_full`` publishes ``stage`` events (started/finished/failed, with
+timings) through ``stage_reporter``. Subscribers (the SSE endpoint in
+``app.py``) each get a bounded queue; a slow subscriber drops its oldest
+events rather than blocking the pipeline.
+
+Runs executed in another process (queue workers, the CLI) also append their
+events to ``events/events.jsonl`` under the package directory (kept out of
+``outputs/`` so it is never listed or exported as an artifact); the preview
+server tails that file once and republishes onto its own bus, so any number
+of dashboards can follow runs without each polling the filesystem.
+"""
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+
+from .utils import optional_import
+
+BASE = Path(__file__).resolve().parent
+EVENT_DIR = Path(os.environ.get('CALYCO_EVENT_DIR', str(BASE / 'events')))
+EVENT_LOG = EVENT_DIR / 'events.jsonl'
+SUBSCRIBER_QUEUE_SIZE = 1000
+MAX_LOG_BYTES = 5 * 1024 * 1024
+
+
+class EventBus:
+    """Fan-out publish/subscribe with one bounded queue per subscriber."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def publish(self, event):
+        with self._lock:
+            self._seq += 1
+            event = dict(event, seq=self._seq)
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    pass
+        return event
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+bus = EventBus()
+_log_lock = threading.Lock()
+
+
+def _append_log(event, path=EVENT_LOG):
+    line = json.dumps(event, ensure_ascii=False) + '\n'
+    fcntl = optional_import('fcntl')
+    with _log_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.lock', 'a') as lock:
+            # writer processes take turns, so only one of them rotates a full log
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.getsize(path) > MAX_LOG_BYTES:
+                    os.replace(path, f'{path}.1')
+            except OSError:
+                pass
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def publish(event, persist=True):
+    """Publish on this process's bus and, by default, to the shared event log."""
+    event = dict(event)
+    event.setdefault('ts', time.time())
+    event.setdefault('pid', os.getpid())
+    if persist:
+        _append_log(event)
+    return bus.publish(event)
+
+
+def stage_reporter(run_id, on_stage=None):
+    """``on_stage`` callback for ``run_full`` that publishes stage events.
+
+    Chains to an existing ``on_stage`` callback when given.
+    """
+    def report(stage, status, info):
+        publish({'type': 'stage', 'run_id': run_id, 'stage': stage, 'status': status, **info})
+        if on_stage:
+            on_stage(stage, status, info)
+    return report
+
+
+class EventLogTailer(threading.Thread):
+    """Follows the shared event log and republishes other processes' events."""
+
+    def __init__(self, path=EVENT_LOG, interval=0.25, target=bus):
+        super().__init__(name='calyco-event-tail', daemon=True)
+        self.path = Path(path)
+        self.interval = interval
+        self.target = target
+        self.stopped = threading.Event()
+
+    def run(self):
+        pid = os.getpid()
+        offset = self.path.stat().st_size if self.path.exists() else 0
+        buffered = b''
+        while not self.stopped.wait(self.interval):
+            try:
+                size = self.path.stat().st_size
+            except OSError:
+                continue
+            if size < offset:
+                # log was truncated or rotated
+                offset, buffered = 0, b''
+            if size == offset:
+                continue
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(size - offset)
+            offset = size
+            buffered += chunk
+            *lines, buffered = buffered.split(b'\n')
+            for line in lines:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                # events from this process were already published directly
+                if event.get('pid') != pid:
+                    self.target.publish(event)
+
+
+_tailer = None
+_tailer_lock = threading.Lock()
+
+
+def ensure_tailer():
+    """Start the event-log tailer once per process."""
+    global _tailer
+    with _tailer_lock:
+        if _tailer is None or not _tailer.is_alive():
+            _tailer = EventLogTailer()
+            _tailer.start()
+    return _tailer
+
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events message."""
+    data = json.dumps(event, ensure_ascii=False)
+    return f"id: {event.get('seq', '')}\nevent: {event.get('type', 'message')}\ndata: {data}\n\n"
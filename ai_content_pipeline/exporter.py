@@ -0,0 +1,248 @@
+"""
+Streaming export of run artifacts as zip or tar.zst.
+
+Archives are produced as an iterator of byte chunks, so they can be written
+to a file or sent straight down an HTTP response without a temporary file.
+
+zip: already-compressed media (PNG, JPEG, ...) is stored as-is and streamed
+in chunks; text artifacts are deflated on a thread pool (zlib releases the
+GIL) a few files ahead of the writer, which only has to copy bytes out. The
+writer emits zip64 records when sizes or offsets need them.
+
+tar.zst: a streaming tar compressed by zstd's own worker threads (needs the
+optional ``zstandard`` package).
+
+    python -m ai_content_pipeline.exporter calyco_submission.zip
+    python -m ai_content_pipeline.exporter batch.tar.zst --run 1a2b3c4d5e6f --run 0f9e8d7c6b5a
+"""
+import os
+import sys
+import time
+import zlib
+import struct
+import tarfile
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import optional_import
+from .precompress import is_precompressed_sibling
+
+BASE = Path(__file__).resolve().parent
+FORMATS = ('zip', 'tar.zst')
+MIMETYPES = {'zip': 'application/zip', 'tar.zst': 'application/zstd'}
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.zip', '.gz', '.br', '.zst', '.mp4')
+READ_CHUNK = 1 << 20
+COMPRESS_WORKERS = min(8, os.cpu_count() or 1)
+ZSTD_LEVEL = 3
+
+
+def default_sources():
+    """The package's ``outputs/`` directory, archived as ``outputs/``."""
+    return [(BASE / 'outputs', 'outputs')]
+
+
+def run_sources(run_ids):
+    """``outputs/`` of each queued run, archived as ``runs/<id>/outputs/``."""
+    from .jobs import run_dir
+    return [(run_dir(r) / 'outputs', f'runs/{r}/outputs') for r in run_ids]
+
+
+def collect_files(sources):
+    """``(path, arcname)`` for every exportable file under ``sources``."""
+    files = []
+    for root, prefix in sources:
+        root = Path(root)
+        if not root.is_dir():
+            continue
+        for p in sorted(root.rglob('*')):
+            # .gz/.br siblings are derived from files already in the archive
+            if p.is_file() and not is_precompressed_sibling(p.name) and not p.name.endswith('.tmp'):
+                files.append((p, f'{prefix}/{p.relative_to(root).as_posix()}'))
+    return files
+
+
+class _Sink:
+    """Write-only buffer whose contents are drained between chunks."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _dos_time(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _deflate_file(path):
+    """``(raw deflate bytes, crc32, size)`` of a text artifact."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    z = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return z.compress(data) + z.flush(), zlib.crc32(data) & 0xffffffff, len(data)
+
+
+_U32 = 0xffffffff
+# Sizes/offsets at or above this are written as zip64 records
+ZIP64_LIMIT = _U32
+
+
+def _zip64_extra(*values):
+    return struct.pack('<HH', 0x0001, 8 * len(values)) + b''.join(struct.pack('<Q', v) for v in values)
+
+
+def iter_zip(files, workers=COMPRESS_WORKERS):
+    """Yield a zip archive of ``files`` chunk by chunk."""
+    entries = []
+    offset = 0
+    text = [i for i, (p, _) in enumerate(files) if not str(p).lower().endswith(STORED_EXTENSIONS)]
+    window = max(1, workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        submitted = 0
+        for i, (path, arcname) in enumerate(files):
+            # keep a bounded number of text files compressing ahead of the writer
+            while submitted < len(text) and len(pending) < window:
+                pending[text[submitted]] = pool.submit(_deflate_file, files[text[submitted]][0])
+                submitted += 1
+            name = arcname.encode('utf-8')
+            st = os.stat(path)
+            mod_time, mod_date = _dos_time(st.st_mtime)
+            header_offset = offset
+            if i in pending:
+                data, crc, size = pending.pop(i).result()
+                method, flags, comp_size = 8, 0x0800, len(data)
+                zip64 = size >= ZIP64_LIMIT or comp_size >= ZIP64_LIMIT
+                extra = _zip64_extra(size, comp_size) if zip64 else b''
+                header = struct.pack('<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, flags, method, mod_time,
+                                     mod_date, crc, _U32 if zip64 else comp_size, _U32 if zip64 else size,
+                                     len(name), len(extra)) + name + extra
+                yield header
+                yield data
+                offset += len(header) + comp_size
+            else:
+                # stored media: sizes are known up front, the CRC follows in a data descriptor
+                size = comp_size = st.st_size
+                method, flags = 0, 0x0808
+                zip64 = size >= ZIP64_LIMIT
+                extra = _zip64_extra(size, comp_size) if zip64 else b''
+                header = struct.pack('<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, flags, method, mod_time,
+                                     mod_date, 0, _U32 if zip64 else comp_size, _U32 if zip64 else size,
+                                     len(name), len(extra)) + name + extra
+                yield header
+                crc = 0
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                        crc = zlib.crc32(chunk, crc)
+                        yield chunk
+                crc &= 0xffffffff
+                if zip64:
+                    descriptor = struct.pack('<IIQQ', 0x08074b50, crc, comp_size, size)
+                else:
+                    descriptor = struct.pack('<IIII', 0x08074b50, crc, comp_size, size)
+                yield descriptor
+                offset += len(header) + size + len(descriptor)
+            entries.append((name, flags, method, mod_time, mod_date, crc, comp_size, size, header_offset,
+                            st.st_mode))
+
+    cd_start = offset
+    central = []
+    for name, flags, method, mod_time, mod_date, crc, comp_size, size, header_offset, mode in entries:
+        # the zip64 extra carries, in this order, whichever of the three overflowed
+        zip64_values = [v for v in (size, comp_size, header_offset) if v >= ZIP64_LIMIT]
+        big = bool(zip64_values)
+        extra = _zip64_extra(*zip64_values) if big else b''
+        central.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 45, 45 if big else 20, flags, method, mod_time, mod_date,
+            crc, _U32 if comp_size >= ZIP64_LIMIT else comp_size, _U32 if size >= ZIP64_LIMIT else size,
+            len(name), len(extra), 0, 0, 0, (mode & 0xffff) << 16,
+            _U32 if header_offset >= ZIP64_LIMIT else header_offset) + name + extra)
+    cd = b''.join(central)
+    yield cd
+    cd_size = len(cd)
+    end = b''
+    count = len(entries)
+    zip64_end_needed = count >= 0xffff or cd_start >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT
+    if zip64_end_needed:
+        zip64_end = cd_start + cd_size
+        end += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | 45, 45, 0, 0, count, count, cd_size, cd_start)
+        end += struct.pack('<IIQI', 0x07064b50, 0, zip64_end, 1)
+    end += struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, 0xffff if zip64_end_needed else count,
+                       0xffff if zip64_end_needed else count, _U32 if zip64_end_needed else cd_size,
+                       _U32 if zip64_end_needed else cd_start, 0)
+    yield end
+
+
+def iter_tar_zst(files, level=ZSTD_LEVEL):
+    """Yield a zstd-compressed tar of ``files`` chunk by chunk."""
+    zstandard = optional_import('zstandard')
+    if zstandard is None:
+        raise RuntimeError('tar.zst export needs the zstandard package (pip install zstandard)')
+    sink = _Sink()
+    compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+    zwriter = compressor.stream_writer(sink, closefd=False)
+    with tarfile.open(fileobj=zwriter, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for path, arcname in files:
+            tar.add(str(path), arcname=arcname, recursive=False)
+            data = sink.drain()
+            if data:
+                yield data
+    zwriter.flush(zstandard.FLUSH_FRAME)
+    yield sink.drain()
+
+
+def iter_archive(fmt='zip', sources=None):
+    """Byte chunks of an archive of ``sources`` (default: this package's outputs)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    files = collect_files(sources or default_sources())
+    return iter_zip(files) if fmt == 'zip' else iter_tar_zst(files)
+
+
+def format_for(path):
+    return 'tar.zst' if str(path).endswith(('.tar.zst', '.tzst')) else 'zip'
+
+
+def write_archive(path, fmt=None, sources=None):
+    """Write an archive to ``path``; returns ``(file_count, bytes_written)``."""
+    fmt = fmt or format_for(path)
+    files = collect_files(sources or default_sources())
+    written = 0
+    tmp = f'{path}.tmp'
+    chunks = iter_zip(files) if fmt == 'zip' else iter_tar_zst(files)
+    with open(tmp, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    os.replace(tmp, path)
+    return len(files), written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.exporter', description='Export run artifacts')
+    parser.add_argument('output', help='archive path (.zip or .tar.zst)')
+    parser.add_argument('--run', action='append', dest='runs', help='queued run id to include (repeatable)')
+    args = parser.parse_args(argv)
+    sources = run_sources(args.runs) if args.runs else None
+    started = time.perf_counter()
+    count, size = write_archive(args.output, sources=sources)
+    print(f'Exported {count} files to {args.output} ({size / 1024:.1f}K in {time.perf_counter() - started:.2f}s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Deadline-bounded external calls with deterministic fallbacks.
+
+In latency-budget mode each external call (pytrends, feeds, OpenAI) is started
+on a background thread while the deterministic fallback is produced in the
+calling thread. The external result is used if it arrives successfully before
+the stage deadline; otherwise the already-computed fallback is used at once,
+so a hung dependency never holds the run past its budget.
+
+Deadlines are absolute ``time.monotonic()`` timestamps so several calls in one
+stage share the stage's remaining budget.
+"""
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+def deadline_in(seconds):
+    """Absolute deadline ``seconds`` from now (None stays None)."""
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def remaining(deadline, floor=0.0):
+    """Seconds left until ``deadline`` (None if unbounded)."""
+    if deadline is None:
+        return None
+    return max(floor, deadline - time.monotonic())
+
+
+def start(fn, *args, **kwargs):
+    """Run ``fn`` on a daemon thread and return a Future for its result.
+
+    Daemon threads are used instead of an executor so an abandoned call that
+    never returns cannot keep the interpreter alive at exit.
+    """
+    future = Future()
+
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, name=f'calyco-hedge-{getattr(fn, "__name__", "call")}', daemon=True).start()
+    return future
+
+
+def settle(future, fallback_value, deadline, started=None, name=None, log=None):
+    """Pick the primary result if it succeeded by ``deadline``, else the fallback.
+
+    Returns ``(value, info)``; ``info`` records which path won and why, and is
+    appended to ``log`` when given.
+    """
+    started = started if started is not None else time.monotonic()
+    info = {'call': name, 'path': 'primary', 'reason': 'ok'}
+    try:
+        value = future.result(timeout=remaining(deadline))
+        if value is None:
+            info.update(path='fallback', reason='empty result')
+            value = fallback_value
+    except FutureTimeout:
+        info.update(path='fallback', reason='deadline')
+        value = fallback_value
+    except Exception as e:
+        info.update(path='fallback', reason=f'error: {e}')
+        value = fallback_value
+    info['seconds'] = round(time.monotonic() - started, 3)
+    if log is not None:
+        log.append(info)
+    return value, info
+
+
+def hedged(primary, fallback, deadline, name=None, log=None):
+    """Run ``primary`` in the background while computing ``fallback``; see ``settle``."""
+    started = time.monotonic()
+    future = start(primary)
+    fallback_value = fallback()
+    return settle(future, fallback_value, deadline, started=started, name=name, log=log)
+
+
+def record(log, name, path, reason, started):
+    """Append a path record for a call made without hedging."""
+    info = {'call': name, 'path': path, 'reason': reason, 'seconds': round(time.monotonic() - started, 3)}
+    if log is not None:
+        log.append(info)
+    return info
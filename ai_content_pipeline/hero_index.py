@@ -0,0 +1,227 @@
+"""
+Perceptual-hash index of every hero image the pipeline has produced.
+
+Each hero is stored with a 64-bit pHash (DCT of a 32x32 greyscale thumbnail)
+and dHash (horizontal gradient of a 9x8 thumbnail) in a SQLite table shared
+by all workers. Lookups go through an in-process multi-index hash over the
+pHashes, so finding every hero within a Hamming radius checks only a few
+bucket-mates even at tens of thousands of entries; the index is extended
+with rows added by other processes on each query.
+
+A candidate is a near-duplicate when both hashes are within
+``DUPLICATE_DISTANCE`` bits of a hero produced in the last ``RECENT_DAYS``
+by another run. Gradient fallbacks are neither checked nor registered.
+"""
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+INDEX_PATH = Path(os.environ.get('CALYCO_HERO_INDEX', str(BASE / 'index' / 'hero_hashes.sqlite3')))
+DUPLICATE_DISTANCE = int(os.environ.get('CALYCO_HERO_DUPLICATE_DISTANCE', '6'))
+RECENT_DAYS = float(os.environ.get('CALYCO_HERO_RECENT_DAYS', '90'))
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS heroes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phash TEXT NOT NULL,
+    dhash TEXT NOT NULL,
+    run_id TEXT,
+    path TEXT,
+    created REAL NOT NULL
+);
+'''
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _dct_matrix(n):
+    import numpy as np
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT32 = None
+
+
+def image_hashes(image):
+    """``(phash, dhash)`` of ``image`` (a path or PIL image) as 64-bit ints."""
+    global _DCT32
+    import numpy as np
+    from PIL import Image
+    if isinstance(image, Image.Image):
+        grey = image.convert('L')
+    else:
+        with Image.open(image) as img:
+            grey = img.convert('L')
+    small = np.asarray(grey.resize((32, 32), Image.BILINEAR), dtype=np.float64)
+    tiny = np.asarray(grey.resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    if _DCT32 is None:
+        _DCT32 = _dct_matrix(32)
+    low = (_DCT32 @ small @ _DCT32.T)[:8, :8].ravel()
+    # the DC term carries only overall brightness, so it is left out of the median
+    phash = _bits_to_int(low > np.median(low[1:]))
+    dhash = _bits_to_int((tiny[:, 1:] > tiny[:, :-1]).ravel())
+    return phash, dhash
+
+
+class MultiIndexHash:
+    """Multi-index hashing over 64-bit hashes under Hamming distance.
+
+    The hash is split into ``radius + 1`` bit ranges, each with its own exact
+    lookup table. By the pigeonhole principle any hash within ``radius`` bits
+    of a query agrees with it exactly on at least one range, so a search only
+    verifies the handful of entries sharing a bucket with the query.
+    """
+
+    def __init__(self, radius=DUPLICATE_DISTANCE, bits=64):
+        self.radius = radius
+        parts = radius + 1
+        bounds = [round(i * bits / parts) for i in range(parts + 1)]
+        self.ranges = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.ranges]
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, item):
+        pos = len(self.entries)
+        self.entries.append((key, item))
+        for table, (shift, mask) in zip(self.tables, self.ranges):
+            table.setdefault((key >> shift) & mask, []).append(pos)
+
+    def search(self, key, radius=None):
+        """``(distance, item)`` for every item within ``radius`` of ``key``."""
+        radius = self.radius if radius is None else radius
+        if radius > self.radius:
+            candidates = range(len(self.entries))
+        else:
+            candidates = set()
+            for table, (shift, mask) in zip(self.tables, self.ranges):
+                candidates.update(table.get((key >> shift) & mask, ()))
+        found = []
+        for pos in candidates:
+            other, item = self.entries[pos]
+            d = hamming(key, other)
+            if d <= radius:
+                found.append((d, item))
+        return found
+
+
+class HeroIndex:
+    """SQLite-backed hash store with an incrementally loaded in-memory index."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or INDEX_PATH)
+        self.hashes = MultiIndexHash()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _refresh(self, conn):
+        rows = conn.execute('SELECT id, phash, dhash, run_id, path, created FROM heroes WHERE id > ? ORDER BY id',
+                            (self._last_id,)).fetchall()
+        for row_id, phash, dhash, run_id, path, created in rows:
+            entry = {'id': row_id, 'dhash': int(dhash, 16), 'run_id': run_id, 'path': path, 'created': created}
+            self.hashes.add(int(phash, 16), entry)
+            self._last_id = row_id
+
+    def add(self, phash, dhash, run_id=None, path=None):
+        conn = self._connect()
+        try:
+            conn.execute('INSERT INTO heroes (phash, dhash, run_id, path, created) VALUES (?, ?, ?, ?, ?)',
+                         (f'{phash:016x}', f'{dhash:016x}', run_id, path, time.time()))
+        finally:
+            conn.close()
+
+    def matches(self, phash, dhash, max_distance=DUPLICATE_DISTANCE, recent_days=RECENT_DAYS, exclude_run_id=None):
+        """Recent heroes within ``max_distance`` bits on both hashes, nearest first.
+
+        Heroes registered by ``exclude_run_id`` (the run being checked, when it
+        is re-run or resumed) are ignored.
+        """
+        conn = self._connect()
+        try:
+            with self._lock:
+                self._refresh(conn)
+                found = self.hashes.search(phash, max_distance)
+        finally:
+            conn.close()
+        cutoff = time.time() - recent_days * 86400 if recent_days else None
+        result = []
+        for distance, entry in found:
+            if cutoff is not None and entry['created'] < cutoff:
+                continue
+            if exclude_run_id is not None and entry['run_id'] == exclude_run_id:
+                continue
+            d_distance = hamming(dhash, entry['dhash'])
+            if d_distance <= max_distance:
+                result.append({'run_id': entry['run_id'], 'path': entry['path'], 'phash_distance': distance,
+                               'dhash_distance': d_distance})
+        return sorted(result, key=lambda m: (m['phash_distance'], m['dhash_distance']))
+
+
+_index = None
+
+
+def get_index():
+    """Process-wide ``HeroIndex`` (its in-memory index persists between runs)."""
+    global _index
+    if _index is None:
+        _index = HeroIndex()
+    return _index
+
+
+def check_variants(variants, max_distance=DUPLICATE_DISTANCE, run_id=None, fallback=()):
+    """Hashes and near-duplicate matches for ``{key: path or image}`` variants.
+
+    Keys in ``fallback`` are the deterministic gradient fallbacks: they hash
+    alike on every offline run, so they are not looked up (``'checked':
+    False``) and never count as duplicates. Heroes of ``run_id`` itself are
+    ignored.
+    """
+    index = get_index()
+    report = {}
+    for key, image in variants.items():
+        phash, dhash = image_hashes(image)
+        checked = key not in fallback
+        matches = index.matches(phash, dhash, max_distance=max_distance, exclude_run_id=run_id) if checked else []
+        report[key] = {'phash': f'{phash:016x}', 'dhash': f'{dhash:016x}', 'duplicate': bool(matches),
+                       'nearest': matches[0] if matches else None, 'checked': checked}
+    return report
+
+
+def register(phash_hex, dhash_hex, run_id=None, path=None):
+    get_index().add(int(phash_hex, 16), int(dhash_hex, 16), run_id=run_id, path=path)
+
+
+def register_hero(image_meta, run_id=None, path=None):
+    """Add the chosen hero of ``image_meta`` (from ``generate_image_variants``) to the index.
+
+    Call once the image stage is final (checkpointed), so a failed or resumed
+    run never finds its own hero. Fallback gradients are not registered.
+    """
+    entry = (image_meta.get('duplicate_check') or {}).get(image_meta.get('chosen'))
+    if entry and entry.get('checked', True):
+        register(entry['phash'], entry['dhash'], run_id=run_id, path=path)
@@ -0,0 +1,288 @@
+"""
+Payload optimisation for published HTML.
+
+``optimize_outputs`` runs after a pipeline run, before precompression:
+
+- inline ``style="..."`` attributes that repeat are hoisted into classes
+  named after a hash of their declarations (so the same style always gets
+  the same class, in any artifact)
+- ``article.html`` keeps only the CSS rules whose selectors match elements
+  it actually contains, minified, in its ``<style>`` block
+- every rule from the article and FAQ goes once into ``outputs/styles.css``
+  for hosts that serve pages against a shared stylesheet
+- HTML is minified: comments other than the ``METADATA``/``HERO_IMAGE_ALT``
+  markers later stages parse are dropped and whitespace is collapsed,
+  leaving ``<pre>``, ``<textarea>`` and ``<script>`` contents untouched
+
+Byte savings per artifact are written to ``outputs/optimization_report.json``.
+
+    python -m ai_content_pipeline.html_optimizer [outputs_dir]
+"""
+import re
+import sys
+import hashlib
+import argparse
+from pathlib import Path
+
+from .utils import write_run_log
+
+BASE = Path(__file__).resolve().parent
+# An inline style must appear this many times before it is worth a class
+MIN_REPEATS = 2
+CLASS_PREFIX = 'cx-'
+KEEP_COMMENTS = ('<!-- METADATA:', '<!-- HERO_IMAGE_ALT:')
+SHARED_CSS = 'styles.css'
+REPORT = 'optimization_report.json'
+
+_BLOCK_TAGS = ('html|head|body|meta|link|title|style|script|div|p|h[1-6]|ul|ol|li|dl|dt|dd|section|article|'
+               'header|footer|nav|main|aside|figure|figcaption|table|thead|tbody|tr|td|th|form|hr|br|'
+               'blockquote|picture|source|noscript')
+_BLOCK_RE = re.compile(r'\s*(</?(?:%s)\b[^>]*>)\s*' % _BLOCK_TAGS, re.I)
+_RAW_RE = re.compile(r'(<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>)', re.S | re.I)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_START_TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)(\s[^<>]*?)?(/?)>')
+_STYLE_ATTR_RE = re.compile(r'\sstyle\s*=\s*(["\'])(.*?)\1', re.S | re.I)
+_CLASS_ATTR_RE = re.compile(r'(\sclass\s*=\s*)(["\'])(.*?)\2', re.S | re.I)
+
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    parts = []
+    # odd parts are quoted strings, which keep their whitespace
+    for i, part in enumerate(re.split(r'("[^"]*"|\'[^\']*\')', css)):
+        if i % 2 == 0:
+            part = re.sub(r'\s+', ' ', part)
+            part = re.sub(r'\s*([{}:;,>])\s*', r'\1', part)
+        parts.append(part)
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def _normalise_declarations(style):
+    decls = [d.strip() for d in style.split(';') if d.strip()]
+    return ';'.join(re.sub(r'\s*:\s*', ':', d, count=1) for d in decls)
+
+
+def class_for(declarations):
+    return CLASS_PREFIX + hashlib.sha1(declarations.encode('utf-8')).hexdigest()[:6]
+
+
+def hoist_inline_styles(html, min_repeats=MIN_REPEATS):
+    """Move repeated inline styles into classes; returns ``(html, css)``."""
+    counts = {}
+    for attrs in (m.group(2) or '' for m in _START_TAG_RE.finditer(html)):
+        style = _STYLE_ATTR_RE.search(attrs)
+        if style:
+            decls = _normalise_declarations(style.group(2))
+            counts[decls] = counts.get(decls, 0) + 1
+    hoisted = {d: class_for(d) for d, n in counts.items() if n >= min_repeats and d}
+    if not hoisted:
+        return html, ''
+
+    def rewrite(m):
+        attrs = m.group(2) or ''
+        style = _STYLE_ATTR_RE.search(attrs)
+        if not style:
+            return m.group(0)
+        name = hoisted.get(_normalise_declarations(style.group(2)))
+        if not name:
+            return m.group(0)
+        attrs = attrs[:style.start()] + attrs[style.end():]
+        if _CLASS_ATTR_RE.search(attrs):
+            attrs = _CLASS_ATTR_RE.sub(lambda c: f'{c.group(1)}{c.group(2)}{c.group(3)} {name}{c.group(2)}', attrs,
+                                       count=1)
+        else:
+            attrs += f' class="{name}"'
+        return f'<{m.group(1)}{attrs}{m.group(3)}>'
+
+    css = ''.join(f'.{name}{{{decls}}}' for decls, name in hoisted.items())
+    return _START_TAG_RE.sub(rewrite, html), css
+
+
+def minify_html(html, keep_comments=KEEP_COMMENTS):
+    """Collapse whitespace and drop comments outside raw-text elements."""
+    parts = []
+    for i, chunk in enumerate(_RAW_RE.split(html)):
+        # split() yields text, raw element, tag name, text, ...
+        kind = i % 3
+        if kind == 2:
+            continue
+        if kind == 1:
+            if chunk[:6].lower() == '<style':
+                open_end = chunk.index('>') + 1
+                close_start = chunk.lower().rindex('</style')
+                chunk = chunk[:open_end] + minify_css(chunk[open_end:close_start]) + '</style>'
+            parts.append(chunk)
+            continue
+        chunk = _COMMENT_RE.sub(lambda m: m.group(0) if m.group(0).startswith(keep_comments) else '', chunk)
+        chunk = re.sub(r'\s+', ' ', chunk)
+        parts.append(_BLOCK_RE.sub(r'\1', chunk))
+    return ''.join(parts).strip()
+
+
+def _document_tokens(html):
+    tags, classes, ids = set(), set(), set()
+    for m in _START_TAG_RE.finditer(html):
+        tags.add(m.group(1).lower())
+        attrs = m.group(2) or ''
+        c = _CLASS_ATTR_RE.search(attrs)
+        if c:
+            classes.update(c.group(3).split())
+        i = re.search(r'\sid\s*=\s*(["\'])(.*?)\1', attrs)
+        if i:
+            ids.add(i.group(2))
+    return tags, classes, ids
+
+
+def _selector_used(selector, tags, classes, ids):
+    selector = re.sub(r'::?[\w-]+(\([^)]*\))?', '', selector)
+    for compound in re.split(r'[\s>+~]+', selector.strip()):
+        if not compound or compound == '*':
+            continue
+        tag = re.match(r'[a-zA-Z][\w-]*', compound)
+        if tag and tag.group(0).lower() not in tags:
+            return False
+        if any(c not in classes for c in re.findall(r'\.([\w-]+)', compound)):
+            return False
+        if any(i not in ids for i in re.findall(r'#([\w-]+)', compound)):
+            return False
+    return True
+
+
+def _css_rules(css):
+    """``(selectors, rule)`` for each top-level statement of minified ``css``.
+
+    At-rules (``@media``, ``@keyframes``, ``@font-face``, ``@import``...) come
+    back whole with ``selectors`` None, nested blocks included, so they are
+    never flattened into plain rules.
+    """
+    rules = []
+    start = depth = 0
+    quote = None
+    for i, ch in enumerate(css):
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '{':
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                rule = css[start:i + 1].strip()
+                at_rule = rule.startswith('@')
+                rules.append((None if at_rule else rule[:rule.index('{')], rule))
+                start = i + 1
+        elif ch == ';' and depth == 0:
+            # block-less at-rules such as @import and @charset
+            if css[start:i].strip():
+                rules.append((None, css[start:i + 1].strip()))
+            start = i + 1
+    return rules
+
+
+def critical_css(css, html):
+    """The rules of ``css`` with at least one selector matching ``html``; at-rules are kept as they are."""
+    tags, classes, ids = _document_tokens(html)
+    kept = []
+    for selectors, rule in _css_rules(minify_css(css)):
+        if selectors is None or any(_selector_used(s, tags, classes, ids) for s in selectors.split(',')):
+            kept.append(rule)
+    return ''.join(kept)
+
+
+def _merge_css(*sheets):
+    """Concatenate minified sheets, dropping rules already present."""
+    seen, rules = set(), []
+    for sheet in sheets:
+        for _, rule in _css_rules(minify_css(sheet)):
+            if rule not in seen:
+                seen.add(rule)
+                rules.append(rule)
+    return ''.join(rules)
+
+
+def optimize_article(html):
+    """``(optimised_html, full_css)`` for a complete article document."""
+    style = re.search(r'<style[^>]*>(.*?)</style>', html, re.S | re.I)
+    css = style.group(1) if style else ''
+    body, hoisted = hoist_inline_styles(html[style.end():] if style else html)
+    head = html[:style.start()] if style else ''
+    full_css = _merge_css(css, hoisted)
+    if style:
+        html = f'{head}<style>{critical_css(full_css, body)}</style>{body}'
+    else:
+        html = body
+    return minify_html(html), full_css
+
+
+def optimize_faq(faq_html):
+    """``(optimised_html, css)`` for the FAQ fragment stored in ``faq.json``."""
+    faq_html, css = hoist_inline_styles(faq_html)
+    return minify_html(faq_html), css
+
+
+def _saving(before, after):
+    return {'before': before, 'after': after, 'saved': before - after,
+            'saved_pct': round(100.0 * (before - after) / before, 1) if before else 0.0}
+
+
+def optimize_outputs(out_dir, out_base=None, ctx=None):
+    """Optimise ``article.html`` and ``faq.json`` in place and write ``styles.css``.
+
+    With ``ctx`` (a ``RunContext``) the artifacts are read from and stored
+    back into the run's context instead of being re-read from ``out_dir``.
+    """
+    if ctx is None:
+        from .run_context import RunContext
+        with RunContext(out_dir=out_dir) as ctx:
+            return optimize_outputs(out_dir, out_base, ctx)
+    report = {}
+    sheets = []
+
+    original = ctx.get('article.html')
+    if original is not None:
+        before = len(ctx.data('article.html'))
+        html, css = optimize_article(original)
+        ctx.put('article.html', html)
+        sheets.append(css)
+        report['article.html'] = _saving(before, len(html.encode('utf-8')))
+
+    faq = ctx.get('faq.json')
+    if faq is not None:
+        before = len(ctx.data('faq.json'))
+        faq = dict(faq)
+        if faq.get('faq_html'):
+            faq['faq_html'], css = optimize_faq(faq['faq_html'])
+            faq['css'] = _merge_css(faq.get('css', ''), css)
+            sheets.append(faq['css'])
+        ctx.put('faq.json', faq, human=True)
+        report['faq.json'] = _saving(before, len(ctx.data('faq.json')))
+
+    if sheets:
+        shared = _merge_css(*sheets)
+        ctx.put(SHARED_CSS, shared)
+        report[SHARED_CSS] = {'bytes': len(shared.encode('utf-8'))}
+
+    totals = [r for r in report.values() if 'before' in r]
+    report['total'] = _saving(sum(r['before'] for r in totals), sum(r['after'] for r in totals))
+    ctx.put(REPORT, report, human=True)
+    if out_base is not None:
+        write_run_log(out_base, f"Optimised HTML: saved {report['total']['saved']} bytes "
+                                f"({report['total']['saved_pct']}%)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.html_optimizer',
+                                     description='Minify article HTML and hoist inline styles')
+    parser.add_argument('out_dir', nargs='?', default=str(BASE / 'outputs'))
+    args = parser.parse_args(argv)
+    report = optimize_outputs(args.out_dir)
+    for name, r in report.items():
+        if 'before' in r:
+            print(f"{name}: {r['before']} -> {r['after']} bytes (-{r['saved_pct']}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,19 @@
 import os
 import io
-from PIL import Image, ImageDraw, ImageFilter
-from .utils import ensure_outputs_dir, write_run_log, seed_from_text, deterministic_choice
+import time
+from .utils import ensure_outputs_dir, write_run_log, seed_from_text, deterministic_choice, optional_import
 from . import prompts
+from . import hedging
+from .run_context import store
+from .palettes import hero_palettes
 
-try:
-    import openai
-except Exception:
-    openai = None
+# Seconds before an image API request is abandoned outside latency-budget mode
+IMAGE_API_TIMEOUT = 120
 
 
-def _make_gradient(path, size=(1200, 628), colours=('255,230,230', '220,245,230'), variant='A'):
-    """Create a high-quality gradient image with subtle texturing"""
+def _render_gradient(size=(1200, 628), colours=('255,230,230', '220,245,230'), variant='A'):
+    """The gradient hero as an in-memory PIL image."""
+    from PIL import Image, ImageDraw, ImageFilter
     img = Image.new('RGB', size, color=0)
     draw = ImageDraw.Draw(img, 'RGBA')
     
@@ -36,61 +38,115 @@ def _make_gradient(path, size=(1200, 628), colours=('255,230,230', '220,245,230'
     
     # Subtle blur for softness
     img = img.filter(ImageFilter.GaussianBlur(radius=0.5))
-    
-    img.save(path, quality=95)
-    return path
+    return img
+
+
+def _decode_image(data):
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
 
+def _api_image_bytes(openai, key, timeout=IMAGE_API_TIMEOUT):
+    """PNG bytes for variant ``key`` from the image API, or None without a client."""
+    if not openai:
+        return None
+    openai.api_key = os.environ.get('IMG_API_KEY')
+    openai.api_base = os.environ.get('OPENAI_API_BASE') or openai.api_base
+    prompt = prompts.IMAGE_VARIANTS.get(key)
+    resp = openai.Image.create(prompt=prompt, size='1200x628', request_timeout=timeout)
+    b64 = resp['data'][0]['b64_json']
+    import base64
+    return base64.b64decode(b64)
 
-def generate_image_variants(seed_text='calyco', out_base='.'):
+
+def generate_image_variants(seed_text='calyco', out_base='.', deadline=None, hedge_log=None, run_id=None, ctx=None,
+                            register=True):
+    """Render (or fetch) hero variants A and B and pick ``hero.png``.
+
+    With NumPy available the best-scoring variant that is not a near-duplicate
+    of a recent hero (see ``hero_index``) is chosen. It is registered in the
+    index unless ``register`` is False; ``run_full`` registers it itself once
+    the image stage is checkpointed.
+    Variants are ranked and hashed in memory; with ``ctx`` (a ``RunContext``)
+    the images stay available to later stages without re-reading the PNGs.
+    """
     out = ensure_outputs_dir(out_base)
     write_run_log(out_base, 'Starting image generation (high-quality variants)')
-    variants = {}
+    images = {}
+    # PNG bytes exactly as the image API returned them, written without re-encoding
+    api_data = {}
     
-    # Professional colour palettes inspired by nature and pastels
-    palette_variants = {
-        'A': {
-            'colours': ('245,235,240', '220,245,230'),  # Blush to sage gradient
-            'name': 'Blush & Sage',
-            'description': 'Warm blush transitioning to cool sage - balanced and sophisticated'
-        },
-        'B': {
-            'colours': ('240,245,250', '230,240,250'),  # Pale blue to lavender
-            'name': 'Sky & Lavender',
-            'description': 'Serene sky blue with soft lavender undertones - calming and modern'
-        }
-    }
+    # Professional colour palettes inspired by nature and pastels (see palettes.json)
+    palette_variants = hero_palettes()
     
     # try API; if not available, fallback to generated gradients
-    for key in ['A', 'B']:
-        p = os.path.join(out, f'hero_variant_{key}.png')
-        palette = palette_variants[key]
-        try:
-            # If openai image API available
-            if openai and os.environ.get('IMG_API_KEY'):
-                openai.api_key = os.environ.get('IMG_API_KEY')
-                prompt = prompts.IMAGE_VARIANTS.get(key)
-                resp = openai.Image.create(prompt=prompt, size='1200x628')
-                b64 = resp['data'][0]['b64_json']
-                import base64
-                imgdata = base64.b64decode(b64)
-                with open(p, 'wb') as f:
-                    f.write(imgdata)
+    openai = optional_import('openai') if os.environ.get('IMG_API_KEY') else None
+    if deadline is not None:
+        # latency-budget mode: request every variant at once, render the
+        # gradients meanwhile and keep whichever API images arrive in time
+        started = time.monotonic()
+        pending = {key: hedging.start(_api_image_bytes, openai, key, hedging.remaining(deadline, floor=1.0))
+                   for key in ['A', 'B']}
+        for key in ['A', 'B']:
+            images[key] = _render_gradient(colours=palette_variants[key]['colours'], variant=key)
+        for key in ['A', 'B']:
+            imgdata, info = hedging.settle(pending[key], None, deadline, started=started,
+                                           name=f'image_{key}', log=hedge_log)
+            if imgdata:
+                images[key], api_data[key] = _decode_image(imgdata), imgdata
                 write_run_log(out_base, f'Generated image variant {key} via API')
             else:
-                # High-quality gradient fallback
-                _make_gradient(p, colours=palette['colours'], variant=key)
-                write_run_log(out_base, f'Generated image variant {key} ({palette["name"]}) via gradient')
-        except Exception as e:
-            write_run_log(out_base, f'Image API error for variant {key}: {e}')
-            _make_gradient(p, colours=palette['colours'], variant=key)
-        variants[key] = p
+                write_run_log(out_base, f'Kept gradient for variant {key} ({info["reason"]})')
+    else:
+        for key in ['A', 'B']:
+            palette = palette_variants[key]
+            started = time.monotonic()
+            try:
+                # If openai image API available
+                imgdata = _api_image_bytes(openai, key)
+                if imgdata:
+                    images[key], api_data[key] = _decode_image(imgdata), imgdata
+                    write_run_log(out_base, f'Generated image variant {key} via API')
+                    hedging.record(hedge_log, f'image_{key}', 'primary', 'ok', started)
+                else:
+                    # High-quality gradient fallback
+                    images[key] = _render_gradient(colours=palette['colours'], variant=key)
+                    write_run_log(out_base, f'Generated image variant {key} ({palette["name"]}) via gradient')
+                    hedging.record(hedge_log, f'image_{key}', 'fallback', 'no image API key', started)
+            except Exception as e:
+                write_run_log(out_base, f'Image API error for variant {key}: {e}')
+                images[key] = _render_gradient(colours=palette['colours'], variant=key)
+                hedging.record(hedge_log, f'image_{key}', 'fallback', f'error: {e}', started)
+    variants = {key: f'hero_variant_{key}.png' for key in images}
+    for key, name in variants.items():
+        store(ctx, out_base, name, images[key], data=api_data.get(key))
 
-    # Deterministic ranking using seed
-    chosen = deterministic_choice(seed_text + '-image-rank', ['A', 'B'])
+    # Rank by pixel metrics when NumPy is available, else deterministically by seed
+    from . import image_metrics
+    duplicate_check = None
+    if image_metrics.available():
+        from . import hero_index
+        ranked = image_metrics.rank_variants(images)[0]
+        duplicate_check = hero_index.check_variants(images, run_id=run_id,
+                                                    fallback=[k for k in images if k not in api_data])
+        fresh = [k for k in ranked if not duplicate_check[k]['duplicate']]
+        for key in ranked:
+            nearest = duplicate_check[key]['nearest']
+            if nearest:
+                write_run_log(out_base, f"Variant {key} is a near-duplicate of a recent hero "
+                                        f"(run {nearest['run_id']}, distance {nearest['phash_distance']})")
+        chosen = fresh[0] if fresh else ranked[0]
+    else:
+        chosen = deterministic_choice(seed_text + '-image-rank', ['A', 'B'])
     final_path = os.path.join(out, 'hero.png')
-    # copy chosen variant
-    from shutil import copyfile
-    copyfile(variants[chosen], final_path)
+    if ctx is not None:
+        ctx.alias('hero.png', variants[chosen])
+    else:
+        from .run_context import write_artifact
+        with open(os.path.join(out, variants[chosen]), 'rb') as f:
+            write_artifact(final_path, f.read())
 
     alt_options = [
         'A modern, sunlit living room featuring soft pastel walls in muted blush and sage green, with natural wood furniture, potted indoor plants, linen textiles, and warm morning light creating a serene, sophisticated atmosphere.',
@@ -98,7 +154,7 @@ def generate_image_variants(seed_text='calyco', out_base='.'):
     ]
 
     meta = {
-        'variants': {k: os.path.basename(p) for k, p in variants.items()},
+        'variants': dict(variants),
         'chosen': chosen,
         'hero_path': 'outputs/hero.png',
         'alt_texts': alt_options,
@@ -108,8 +164,10 @@ def generate_image_variants(seed_text='calyco', out_base='.'):
             'B': palette_variants['B']['description']
         }
     }
-    with open(os.path.join(out, 'image_metadata.json'), 'w', encoding='utf-8') as f:
-        import json
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    if duplicate_check:
+        meta['duplicate_check'] = duplicate_check
+    store(ctx, out_base, 'image_metadata.json', meta)
+    if register and duplicate_check:
+        hero_index.register_hero(meta, run_id=run_id, path=final_path)
     write_run_log(out_base, f"Saved hero.png (variant {chosen}) and image metadata")
     return meta
@@ -0,0 +1,126 @@
+"""
+Pixel-based quality metrics for hero image variants.
+
+All variants are loaded once, downsampled to a common analysis size and
+stacked into one ``(N, H, W, 3)`` float array; every metric is then a
+vectorised NumPy reduction over the batch:
+
+- contrast: standard deviation of luminance
+- colourfulness: Hasler & Süsstrunk opponent-channel measure
+- luminance balance: closeness of mean luminance to ``TARGET_LUMINANCE``
+- entropy: Shannon entropy of the 256-bin luminance histogram
+- sharpness: variance of the 4-neighbour Laplacian of luminance
+
+Each metric is normalised to 0..1 against a fixed reference scale (so scores
+are comparable across runs) and combined with ``METRIC_WEIGHTS`` into a
+0..100 score.
+"""
+from .utils import optional_import
+
+ANALYSIS_SIZE = (320, 168)
+# Airy, light-key heroes suit the brand; mean luminance near this scores best
+TARGET_LUMINANCE = 0.7
+METRIC_WEIGHTS = {
+    'contrast': 0.2,
+    'colourfulness': 0.2,
+    'luminance_balance': 0.25,
+    'entropy': 0.15,
+    'sharpness': 0.2,
+}
+# Raw value mapped to 1.0 for each metric (values above are clipped)
+METRIC_SCALES = {
+    'contrast': 0.25,
+    'colourfulness': 0.35,
+    'luminance_balance': 1.0,
+    'entropy': 8.0,
+    'sharpness': 0.005,
+}
+
+
+def available():
+    """True when NumPy and Pillow are installed."""
+    return bool(optional_import('numpy') and optional_import('PIL'))
+
+
+def load_batch(images, size=ANALYSIS_SIZE):
+    """Stack ``images`` (paths or PIL images) into one float32 array in 0..1."""
+    import numpy as np
+    from PIL import Image
+    batch = np.empty((len(images), size[1], size[0], 3), dtype=np.float32)
+    for i, src in enumerate(images):
+        if isinstance(src, Image.Image):
+            img = src.convert('RGB')
+        else:
+            with Image.open(src) as f:
+                img = f.convert('RGB')
+        if img.size != size:
+            img = img.resize(size, Image.BILINEAR)
+        batch[i] = np.asarray(img, dtype=np.float32)
+    batch *= 1.0 / 255.0
+    return batch
+
+
+def batch_metrics(batch):
+    """Raw metric arrays (one value per image) for an ``(N, H, W, 3)`` batch."""
+    import numpy as np
+    n = batch.shape[0]
+    r, g, b = batch[..., 0], batch[..., 1], batch[..., 2]
+    lum = 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    colourfulness = (np.sqrt(rg.std(axis=(1, 2)) ** 2 + yb.std(axis=(1, 2)) ** 2)
+                     + 0.3 * np.sqrt(rg.mean(axis=(1, 2)) ** 2 + yb.mean(axis=(1, 2)) ** 2))
+
+    mean_lum = lum.mean(axis=(1, 2))
+    balance = 1.0 - np.abs(mean_lum - TARGET_LUMINANCE) / max(TARGET_LUMINANCE, 1.0 - TARGET_LUMINANCE)
+
+    # one bincount over the whole batch, offsetting each image into its own 256 bins
+    levels = np.clip((lum * 255.0).astype(np.int64), 0, 255).reshape(n, -1)
+    levels += (np.arange(n) * 256)[:, None]
+    hist = np.bincount(levels.ravel(), minlength=n * 256).reshape(n, 256).astype(np.float64)
+    p = hist / hist.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+    lap = (lum[:, :-2, 1:-1] + lum[:, 2:, 1:-1] + lum[:, 1:-1, :-2] + lum[:, 1:-1, 2:]
+           - 4.0 * lum[:, 1:-1, 1:-1])
+    sharpness = lap.var(axis=(1, 2))
+
+    return {
+        'contrast': lum.std(axis=(1, 2)),
+        'colourfulness': colourfulness,
+        'luminance': mean_lum,
+        'luminance_balance': balance,
+        'entropy': entropy,
+        'sharpness': sharpness,
+    }
+
+
+def score_batch(batch, weights=None):
+    """Per-image dicts of raw metrics, normalised components and weighted score."""
+    import numpy as np
+    weights = weights or METRIC_WEIGHTS
+    raw = batch_metrics(batch)
+    norm = {k: np.clip(raw[k] / METRIC_SCALES[k], 0.0, 1.0) for k in weights}
+    total = sum(weights[k] * norm[k] for k in weights) / sum(weights.values()) * 100.0
+    results = []
+    for i in range(batch.shape[0]):
+        results.append({
+            'score': round(float(total[i]), 2),
+            'metrics': {k: round(float(v[i]), 4) for k, v in raw.items()},
+            'components': {k: round(float(norm[k][i]), 4) for k in weights},
+        })
+    return results
+
+
+def score_images(images, weights=None):
+    """``score_batch`` for image files or PIL images, loaded once into a single batch."""
+    return score_batch(load_batch(images), weights=weights)
+
+
+def rank_variants(variant_paths, weights=None):
+    """Score ``{key: path or image}`` variants; returns ``(ranked_keys, {key: result})``."""
+    keys = list(variant_paths)
+    results = dict(zip(keys, score_images([variant_paths[k] for k in keys], weights=weights)))
+    return sorted(keys, key=lambda k: -results[k]['score']), results
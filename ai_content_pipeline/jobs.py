@@ -0,0 +1,286 @@
+"""
+Durable run queue backed by SQLite.
+
+``enqueue_run`` records a run request; worker processes claim runs under a
+time-limited lease, keep the lease alive while stages execute and record
+stage-level status. A worker that dies simply lets its lease expire and the
+run is picked up again; failed runs are retried with backoff until
+``max_attempts`` is reached.
+
+Each run writes its artifacts to ``runs/<run_id>/outputs/``.
+
+    python -m ai_content_pipeline.jobs --workers 4
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+from .utils import write_run_log
+
+BASE = Path(__file__).resolve().parent
+RUNS_DIR = BASE / 'runs'
+DB_PATH = Path(os.environ.get('CALYCO_JOBS_DB', str(RUNS_DIR / 'jobs.sqlite3')))
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 5.0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    topic TEXT,
+    keywords TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    stages TEXT NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_claim ON runs (status, available_at);
+'''
+
+
+def connect(db_path=None):
+    path = Path(db_path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def run_dir(run_id):
+    return RUNS_DIR / run_id
+
+
+def _row_to_dict(row):
+    run = dict(row)
+    run['keywords'] = json.loads(run['keywords'])
+    run['stages'] = json.loads(run['stages'])
+    return run
+
+
+def enqueue_run(topic=None, keywords=None, seed=None, max_attempts=DEFAULT_MAX_ATTEMPTS, db_path=None):
+    """Queue a pipeline run and return its id."""
+    run_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            'INSERT INTO runs (id, topic, keywords, seed, status, max_attempts, available_at, stages, created, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, topic, json.dumps(keywords or []), seed or topic or 'calyco', 'queued',
+             max_attempts, now, json.dumps({}), now, now))
+    finally:
+        conn.close()
+    return run_id
+
+
+def get_run(run_id, db_path=None):
+    """Run record with stage status, or None."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_dict(row) if row else None
+
+
+def list_runs(limit=50, db_path=None):
+    conn = connect(db_path)
+    try:
+        rows = conn.execute('SELECT * FROM runs ORDER BY created DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_dict(r) for r in rows]
+
+
+def run_artifacts(run_id):
+    """Names of the files a run has produced so far."""
+    from .storage import get_storage
+    names = get_storage().list_dir(run_dir(run_id) / 'outputs')
+    return [n for n in names if not n.startswith('.')]
+
+
+def claim_run(conn, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Atomically lease the next runnable run (queued, or running with an expired lease)."""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # runs whose worker died on their final attempt cannot be retried
+        conn.execute(
+            "UPDATE runs SET status = 'failed', error = COALESCE(error, 'lease expired'), lease_owner = NULL, "
+            "updated = ? WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+            (now, now))
+        row = conn.execute(
+            "SELECT id FROM runs WHERE (status = 'queued' AND available_at <= ?) "
+            "OR (status = 'running' AND lease_expires < ?) ORDER BY created LIMIT 1",
+            (now, now)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute(
+            "UPDATE runs SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+            "updated = ? WHERE id = ?",
+            (worker_id, now + lease_seconds, now, row['id']))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return _row_to_dict(conn.execute('SELECT * FROM runs WHERE id = ?', (row['id'],)).fetchone())
+
+
+def _owned_update(conn, run_id, worker_id, sql, params):
+    # every write is conditional on still holding the lease, so a worker that
+    # lost its lease cannot clobber the run's new owner
+    cur = conn.execute(sql + ' WHERE id = ? AND lease_owner = ?', params + (run_id, worker_id))
+    return cur.rowcount == 1
+
+
+def extend_lease(conn, run_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    now = time.time()
+    return _owned_update(conn, run_id, worker_id, 'UPDATE runs SET lease_expires = ?, updated = ?',
+                         (now + lease_seconds, now))
+
+
+def record_stage(conn, run_id, worker_id, stage, status, info):
+    row = conn.execute('SELECT stages FROM runs WHERE id = ?', (run_id,)).fetchone()
+    stages = json.loads(row['stages']) if row else {}
+    entry = stages.get(stage, {})
+    entry.update(info)
+    entry['status'] = status
+    entry['at'] = time.time()
+    stages[stage] = entry
+    return _owned_update(conn, run_id, worker_id, 'UPDATE runs SET stages = ?, updated = ?',
+                         (json.dumps(stages), time.time()))
+
+
+def complete_run(conn, run_id, worker_id):
+    return _owned_update(conn, run_id, worker_id,
+                         "UPDATE runs SET status = 'succeeded', error = NULL, lease_owner = NULL, updated = ?",
+                         (time.time(),))
+
+
+def fail_run(conn, run_id, worker_id, error):
+    """Requeue with backoff, or mark failed once attempts are exhausted."""
+    row = conn.execute('SELECT attempts, max_attempts FROM runs WHERE id = ?', (run_id,)).fetchone()
+    now = time.time()
+    if row and row['attempts'] < row['max_attempts']:
+        delay = RETRY_BACKOFF_SECONDS * (2 ** (row['attempts'] - 1))
+        return _owned_update(conn, run_id, worker_id,
+                             "UPDATE runs SET status = 'queued', error = ?, lease_owner = NULL, "
+                             "available_at = ?, updated = ?", (error, now + delay, now))
+    return _owned_update(conn, run_id, worker_id,
+                         "UPDATE runs SET status = 'failed', error = ?, lease_owner = NULL, updated = ?",
+                         (error, now))
+
+
+class _LeaseKeeper(threading.Thread):
+    """Extends a run's lease in the background while its stages execute."""
+
+    def __init__(self, db_path, run_id, worker_id, lease_seconds):
+        super().__init__(name=f'lease-{run_id}', daemon=True)
+        self.db_path, self.run_id, self.worker_id = db_path, run_id, worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = connect(self.db_path)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3.0):
+                extend_lease(conn, self.run_id, self.worker_id, self.lease_seconds)
+        finally:
+            conn.close()
+
+
+def execute_run(conn, run, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, db_path=None):
+    """Run the pipeline for a claimed run, recording stage status as it goes."""
+    from .main import run_full
+    run_id = run['id']
+    keeper = _LeaseKeeper(db_path, run_id, worker_id, lease_seconds)
+    keeper.start()
+
+    def on_stage(stage, status, info):
+        record_stage(conn, run_id, worker_id, stage, status, info)
+
+    # the run id doubles as the checkpoint id, so a retried or reclaimed run
+    # resumes from the first stage its previous attempt did not finish
+    out_base = run_dir(run_id)
+    try:
+        run_full(seed_text=run['seed'], out_base=out_base, keywords=run['keywords'] or None,
+                 topic=run['topic'], on_stage=on_stage, run_id=run_id)
+    except Exception as e:
+        fail_run(conn, run_id, worker_id, str(e))
+        write_run_log(str(out_base), f'Run {run_id} attempt {run["attempts"]} failed: {e}')
+        return False
+    finally:
+        keeper.stopped.set()
+    complete_run(conn, run_id, worker_id)
+    return True
+
+
+def worker_loop(worker_id=None, poll_interval=1.0, lease_seconds=DEFAULT_LEASE_SECONDS, db_path=None,
+                stop_event=None, max_runs=None):
+    """Claim and execute runs until stopped (or ``max_runs`` have been processed)."""
+    worker_id = worker_id or f'{os.uname().nodename if hasattr(os, "uname") else "host"}-{os.getpid()}'
+    conn = connect(db_path)
+    processed = 0
+    try:
+        while not (stop_event and stop_event.is_set()):
+            run = claim_run(conn, worker_id, lease_seconds)
+            if run is None:
+                time.sleep(poll_interval)
+                continue
+            execute_run(conn, run, worker_id, lease_seconds, db_path=db_path)
+            processed += 1
+            if max_runs and processed >= max_runs:
+                break
+    finally:
+        conn.close()
+    return processed
+
+
+def run_workers(count=2, poll_interval=1.0, lease_seconds=DEFAULT_LEASE_SECONDS, db_path=None):
+    """Start ``count`` worker processes and wait for them."""
+    import multiprocessing
+    procs = [multiprocessing.Process(target=worker_loop, name=f'calyco-worker-{i}',
+                                     kwargs={'poll_interval': poll_interval, 'lease_seconds': lease_seconds,
+                                             'db_path': db_path})
+             for i in range(count)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.jobs', description='Run queued pipeline jobs')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CALYCO_JOB_WORKERS', '2')))
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS)
+    args = parser.parse_args(argv)
+    run_workers(args.workers, poll_interval=args.poll_interval, lease_seconds=args.lease_seconds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
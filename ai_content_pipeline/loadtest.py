@@ -0,0 +1,109 @@
+"""
+Local load test for the preview server.
+
+Each client thread keeps one HTTP/1.1 keep-alive connection and cycles through
+the paths; latencies are reported per path as percentiles.
+
+    python -m ai_content_pipeline.loadtest --url http://127.0.0.1:8000 -c 32 -n 5000
+"""
+import sys
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/', '/api/metadata', '/api/article', '/api/stats', '/hero.png']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _client(host, port, paths, count, results, errors, lock, headers):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local = {p: [] for p in paths}
+    local_errors = {p: 0 for p in paths}
+    for i in range(count):
+        path = paths[i % len(paths)]
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                local_errors[path] += 1
+            else:
+                local[path].append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            local_errors[path] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.close()
+    with lock:
+        for p in paths:
+            results[p].extend(local[p])
+            errors[p] += local_errors[p]
+
+
+def run(url, paths=None, concurrency=16, requests=2000, accept_encoding='gzip, br'):
+    """Fire ``requests`` GETs spread over ``concurrency`` connections; return a report."""
+    paths = paths or DEFAULT_PATHS
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    results = {p: [] for p in paths}
+    errors = {p: 0 for p in paths}
+    lock = threading.Lock()
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    per_client = max(1, requests // concurrency)
+    threads = [threading.Thread(target=_client, args=(host, port, paths, per_client, results, errors, lock, headers))
+               for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    report = {'concurrency': concurrency, 'seconds': round(elapsed, 3), 'paths': {}}
+    total = 0
+    for p in paths:
+        lat = sorted(results[p])
+        total += len(lat)
+        report['paths'][p] = {
+            'ok': len(lat),
+            'errors': errors[p],
+            'p50_ms': round(percentile(lat, 50) * 1000, 2),
+            'p90_ms': round(percentile(lat, 90) * 1000, 2),
+            'p99_ms': round(percentile(lat, 99) * 1000, 2),
+            'max_ms': round((lat[-1] if lat else 0) * 1000, 2),
+        }
+    report['requests_per_second'] = round(total / elapsed, 1) if elapsed else 0.0
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.loadtest', description='Load-test the preview server')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=2000)
+    parser.add_argument('--path', action='append', dest='paths', help='path to request (repeatable)')
+    args = parser.parse_args(argv)
+
+    report = run(args.url, paths=args.paths, concurrency=args.concurrency, requests=args.requests)
+    print(f"{'path':20} {'ok':>7} {'err':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for path, r in report['paths'].items():
+        print(f"{path:20} {r['ok']:7d} {r['errors']:5d} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} "
+              f"{r['p99_ms']:8.2f} {r['max_ms']:8.2f}")
+    print(f"\n{report['requests_per_second']} req/s at concurrency {report['concurrency']} "
+          f"({report['seconds']}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,13 +6,14 @@ Fully automated end-to-end content generation with interactive CLI
 import os
 import sys
 import time
-import zipfile
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
 
 BASE = Path(__file__).resolve().parent
 OUT = BASE / 'outputs'
 
-from .utils import write_run_log
+from .utils import write_run_log, mark_run_complete, now_ts
 
 
 # Terminal colors for better UI
@@ -66,46 +67,229 @@ def print_welcome():
     print_info("Welcome to the CALYCO Pipeline. Choose an option below.\n")
 
 
-def run_full(seed_text='calyco'):
-    """Execute complete pipeline: data → content → image → QA"""
+PIPELINE_STAGES = ['data', 'content', 'image', 'qa']
+
+# Files each stage writes under outputs/; recorded in the run's checkpoint
+STAGE_OUTPUTS = {
+    'data': ['trend_summary.json', 'competitor_feeds.json'],
+    'content': ['article.html', 'article.json', 'faq.json', 'social_captions.txt', 'metadata.json',
+                'article_candidates.json', 'prompt_report.json'],
+    'image': ['hero_variant_A.png', 'hero_variant_B.png', 'hero.png', 'image_metadata.json'],
+    'qa': ['qa_report.json', 'image_ranking.json', 'final_qa.json'],
+}
+
+
+@contextmanager
+def _stage(name, on_stage):
+    """Report a stage's start/finish/failure to ``on_stage(name, status, info)``."""
+    if on_stage:
+        on_stage(name, 'running', {})
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if on_stage:
+            on_stage(name, 'failed', {'error': str(e), 'seconds': round(time.perf_counter() - started, 3)})
+        raise
+    if on_stage:
+        on_stage(name, 'done', {'seconds': round(time.perf_counter() - started, 3)})
+
+
+# Share of a latency SLO given to each stage with external calls; the rest of
+# the budget is reserved for QA and finalisation, which are local.
+STAGE_BUDGET_SHARES = {'data': 0.25, 'content': 0.35, 'image': 0.25}
+
+
+def _stage_deadline(name, slo_seconds, run_started):
+    """Absolute monotonic deadline for ``name`` in latency-budget mode (None otherwise)."""
+    if not slo_seconds:
+        return None
+    run_deadline = run_started + slo_seconds * sum(STAGE_BUDGET_SHARES.values())
+    return min(time.monotonic() + slo_seconds * STAGE_BUDGET_SHARES[name], run_deadline)
+
+
+def _already_done(checkpoint, name, first, on_stage):
+    """True (and reported as skipped) if ``name`` comes before ``first``, the first incomplete stage."""
+    if first is not None and PIPELINE_STAGES.index(name) >= PIPELINE_STAGES.index(first):
+        return False
+    print_info(f"Resuming: '{name}' stage already complete, skipping")
+    if on_stage:
+        on_stage(name, 'skipped', {})
+    return True
+
+
+def _stage_files(out_dir, name):
+    return [out_dir / f for f in STAGE_OUTPUTS[name]]
+
+
+def run_full(seed_text='calyco', trends=None, feeds=None, out_base=None, keywords=None, topic=None,
+             on_stage=None, run_id=None, slo_seconds=None, candidates=None):
+    """Execute complete pipeline: data → content → image → QA
+
+    Pre-collected ``trends``/``feeds`` (e.g. from the daemon's warm cache) skip
+    the data collection calls. ``out_base`` defaults to the package directory
+    (artifacts in ``outputs/``); ``on_stage`` is called as
+    ``on_stage(stage, status, info)`` for each of ``PIPELINE_STAGES``. Stage
+    and run events are also published on the event bus under ``run_id``.
+
+    Every completed stage is checkpointed under ``run_id``; calling again with
+    the same ``run_id`` resumes from the first incomplete stage.
+
+    Stages hand their artifacts to each other in memory through a
+    ``RunContext``; files and checkpoints are written on a background thread.
+
+    ``slo_seconds`` (default ``CALYCO_SLO_SECONDS``) enables latency-budget
+    mode: each stage gets a deadline and external calls race their
+    deterministic fallbacks. Which path each call took is written to
+    ``outputs/run_metadata.json``.
+
+    ``candidates`` (default ``CALYCO_ARTICLE_CANDIDATES``, 1) article variants
+    are generated concurrently and the best-scoring one is kept.
+    """
+    from . import events
+    from .checkpoints import Checkpoint
+    from .run_context import RunContext
     print_header("RUNNING FULL PIPELINE")
-    out_base = str(BASE)
-    write_run_log(out_base, 'Run: full pipeline start')
+    out_base = str(out_base or BASE)
+    out_dir = Path(out_base) / 'outputs'
+    out_dir.mkdir(parents=True, exist_ok=True)
+    run_id = run_id or uuid.uuid4().hex[:12]
+    if slo_seconds is None and os.environ.get('CALYCO_SLO_SECONDS'):
+        slo_seconds = float(os.environ['CALYCO_SLO_SECONDS'])
+    if candidates is None:
+        candidates = int(os.environ.get('CALYCO_ARTICLE_CANDIDATES', '1'))
+    checkpoint = Checkpoint.load_or_create(run_id, seed_text=seed_text, out_base=out_base,
+                                           keywords=keywords, topic=topic, slo_seconds=slo_seconds,
+                                           candidates=candidates)
+    on_stage = events.stage_reporter(run_id, on_stage)
+    hedge_log = []
+    stage_seconds = {}
+    stage_reporter = on_stage
+
+    def on_stage(name, status, info):
+        if 'seconds' in info:
+            stage_seconds[name] = info['seconds']
+        stage_reporter(name, status, info)
+
+    run_started = time.perf_counter()
+    run_started_mono = time.monotonic()
+    events.publish({'type': 'run', 'run_id': run_id, 'status': 'running', 'seed': seed_text, 'topic': topic})
+    write_run_log(out_base, f'Run: full pipeline start ({run_id})')
+    print_info(f"Run id: {run_id}")
+    ctx = RunContext(out_base)
+    # everything from the first incomplete stage on runs again, so later results stay consistent with it
+    first = checkpoint.first_incomplete(PIPELINE_STAGES)
+    if first is not None:
+        checkpoint.discard_from(PIPELINE_STAGES, first)
+
+    def complete(stage, result):
+        # the stage's writes are captured now; the record is made on the writer thread once they are on disk
+        digests = ctx.digests(STAGE_OUTPUTS[stage])
+        ctx.after_writes(lambda: checkpoint.complete(stage, result, _stage_files(out_dir, stage),
+                                                     digests=digests()))
     
     try:
-        print_section("1️⃣  Data Collection")
-        from .data_collector import collect_trends, fetch_feeds
-        trends = collect_trends(out_base=out_base)
-        print_success(f"Collected {len(trends.get('trend_summary', []))} trend insights")
-        
-        feeds = fetch_feeds(out_base=out_base)
-        print_success(f"Fetched {len(feeds)} competitor feed items")
+        if _already_done(checkpoint, 'data', first, on_stage):
+            trends, feeds = checkpoint.result('data')['trends'], checkpoint.result('data')['feeds']
+        else:
+            with _stage('data', on_stage):
+                print_section("1️⃣  Data Collection")
+                from .data_collector import collect_trends, fetch_feeds
+                from . import hedging
+                deadline = _stage_deadline('data', slo_seconds, run_started_mono)
+                # with a budget, feeds are fetched alongside trends rather than after them
+                pending_feeds = None
+                if feeds is None and deadline is not None:
+                    pending_feeds = hedging.start(fetch_feeds, out_base=out_base, deadline=deadline,
+                                                  hedge_log=hedge_log, ctx=ctx)
+                if trends is None:
+                    trends = collect_trends(keywords, out_base=out_base, deadline=deadline, hedge_log=hedge_log,
+                                            ctx=ctx)
+                print_success(f"Collected {len(trends.get('trend_summary', []))} trend insights")
+                
+                if pending_feeds is not None:
+                    feeds = pending_feeds.result()
+                elif feeds is None:
+                    feeds = fetch_feeds(out_base=out_base, hedge_log=hedge_log, ctx=ctx)
+                print_success(f"Fetched {len(feeds)} competitor feed items")
+            complete('data', {'trends': trends, 'feeds': feeds})
         comp_summ = [f"{i.get('title')}: {i.get('summary')[:100]}" for i in feeds]
         
-        print_section("2️⃣  Content Generation")
-        from .content_generator import generate_article
-        article_info = generate_article(trends['trend_summary'], comp_summ, out_base=out_base, seed_text=seed_text)
-        print_success(f"Generated article: '{article_info.get('title')}'")
-        print_info(f"Word count: {article_info.get('word_count')} words")
-        
-        print_section("3️⃣  Image Generation")
-        from .image_generator import generate_image_variants
-        img_meta = generate_image_variants(seed_text=seed_text, out_base=out_base)
-        print_success(f"Generated hero image (variant {img_meta['chosen']})")
-        print_info(f"Variants saved: {', '.join(img_meta['variants'].keys())}")
+        if _already_done(checkpoint, 'content', first, on_stage):
+            article_info = checkpoint.result('content')
+        else:
+            with _stage('content', on_stage):
+                print_section("2️⃣  Content Generation")
+                from .content_generator import generate_article
+                article_info = generate_article(trends['trend_summary'], comp_summ, out_base=out_base,
+                                                seed_text=seed_text, topic=topic,
+                                                deadline=_stage_deadline('content', slo_seconds, run_started_mono),
+                                                hedge_log=hedge_log, candidates=candidates,
+                                                keywords=trends.get('keywords'), ctx=ctx)
+                print_success(f"Generated article: '{article_info.get('title')}'")
+                print_info(f"Word count: {article_info.get('word_count')} words")
+            complete('content', article_info)
         
-        print_section("4️⃣  Quality Assurance")
-        from .qa_and_valuation import run_article_checks, rank_images, final_qa
-        qa = run_article_checks(str(OUT / 'article.html'), out_base=out_base)
-        print_success(f"Article QA: Readability {qa.get('readability_flesch_like'):.1f}, Originality {qa.get('originality_score')}")
+        if _already_done(checkpoint, 'image', first, on_stage):
+            img_meta = checkpoint.result('image')
+        else:
+            with _stage('image', on_stage):
+                print_section("3️⃣  Image Generation")
+                from .image_generator import generate_image_variants
+                img_meta = generate_image_variants(seed_text=seed_text, out_base=out_base,
+                                                   deadline=_stage_deadline('image', slo_seconds, run_started_mono),
+                                                   hedge_log=hedge_log, run_id=run_id, ctx=ctx, register=False)
+                print_success(f"Generated hero image (variant {img_meta['chosen']})")
+                print_info(f"Variants saved: {', '.join(img_meta['variants'].keys())}")
+            complete('image', img_meta)
+            if img_meta.get('duplicate_check'):
+                from . import hero_index
+                # after the checkpoint record, so a resumed run never matches its own hero
+                ctx.after_writes(hero_index.register_hero, img_meta, run_id=run_id, path=str(out_dir / 'hero.png'))
         
-        rank = rank_images(str(OUT / 'image_metadata.json'), out_base=out_base)
-        print_success(f"Image ranking: {rank['explanation'][:60]}...")
+        if _already_done(checkpoint, 'qa', first, on_stage):
+            qa, rank, final = (checkpoint.result('qa')[k] for k in ('qa', 'ranking', 'final_qa'))
+        else:
+            with _stage('qa', on_stage):
+                print_section("4️⃣  Quality Assurance")
+                from .qa_and_valuation import run_article_checks, rank_images, final_qa
+                qa = run_article_checks(str(out_dir / 'article.html'), out_base=out_base, ctx=ctx)
+                print_success(f"Article QA: Readability {qa.get('readability_flesch_like'):.1f}, Originality {qa.get('originality_score')}")
+                
+                rank = rank_images(str(out_dir / 'image_metadata.json'), out_base=out_base, ctx=ctx)
+                print_success(f"Image ranking: {rank['explanation'][:60]}...")
+                
+                final = final_qa(str(out_dir / 'article.html'), out_base=out_base, ctx=ctx)
+                print_success(f"Final QA complete")
+            complete('qa', {'qa': qa, 'ranking': rank, 'final_qa': final})
         
-        final = final_qa(str(OUT / 'article.html'), out_base=out_base)
-        print_success(f"Final QA complete")
+        total_seconds = round(time.perf_counter() - run_started, 3)
+        ctx.put('run_metadata.json', {
+            'run_id': run_id,
+            'seed': seed_text,
+            'topic': topic,
+            'slo_seconds': slo_seconds,
+            'stage_budget_shares': STAGE_BUDGET_SHARES if slo_seconds else None,
+            'stage_seconds': stage_seconds,
+            'paths': hedge_log,
+            'prompt': article_info.get('prompt'),
+            'total_seconds': total_seconds,
+            'within_slo': None if not slo_seconds else total_seconds <= slo_seconds,
+            'finished': now_ts(),
+        })
         
+        from .html_optimizer import optimize_outputs
+        from .precompress import precompress_outputs
+        optimize_outputs(str(out_dir), out_base=out_base, ctx=ctx)
+        # optimisation rewrites article.html and faq.json; re-record them so resume still skips content
+        complete('content', article_info)
+        ctx.after_writes(precompress_outputs, str(out_dir), out_base=out_base, ctx=ctx)
+        ctx.close()
         write_run_log(out_base, 'Run: full pipeline end')
+        mark_run_complete(out_base)
+        if Path(out_base) == BASE:
+            from .server import reload_server
+            reload_server()
         
         # Summary
         print_header("PIPELINE COMPLETE ✓")
@@ -114,14 +298,46 @@ def run_full(seed_text='calyco'):
         print(f"  {Colors.GREEN}Word Count:{Colors.ENDC} {article_info.get('word_count')} words")
         print(f"  {Colors.GREEN}Hero Image:{Colors.ENDC} outputs/hero.png")
         print(f"  {Colors.GREEN}Files Generated:{Colors.ENDC} 13 output files")
-        print(f"\n{Colors.GREEN}All outputs saved to: {OUT}{Colors.ENDC}\n")
+        print(f"\n{Colors.GREEN}All outputs saved to: {out_dir}{Colors.ENDC}\n")
+        events.publish({'type': 'run', 'run_id': run_id, 'status': 'done',
+                        'seconds': round(time.perf_counter() - run_started, 3)})
+        return {
+            'run_id': run_id,
+            'article': article_info,
+            'image': img_meta,
+            'qa': qa,
+            'ranking': rank,
+            'final_qa': final,
+        }
         
     except Exception as e:
         print_error(f"Pipeline failed: {str(e)}")
+        print_info(f"Resume with: python -m ai_content_pipeline.main --resume {run_id}")
         write_run_log(out_base, f'Pipeline error: {e}')
+        try:
+            # keep whatever the completed stages produced (and their checkpoints)
+            ctx.close()
+        except Exception as persist_error:
+            write_run_log(out_base, f'Persisting artifacts failed: {persist_error}')
+        events.publish({'type': 'run', 'run_id': run_id, 'status': 'failed', 'error': str(e),
+                        'seconds': round(time.perf_counter() - run_started, 3)})
         raise
 
 
+def resume_run(run_id):
+    """Resume a checkpointed run from its first incomplete stage"""
+    from .checkpoints import Checkpoint
+    checkpoint = Checkpoint.load(run_id)
+    if checkpoint is None:
+        print_error(f"No checkpoint found for run '{run_id}'")
+        return None
+    args = checkpoint.args
+    print_info(f"Resuming run {run_id} from stage '{checkpoint.first_incomplete(PIPELINE_STAGES) or 'finalise'}'")
+    return run_full(seed_text=args.get('seed_text', 'calyco'), out_base=args.get('out_base'),
+                    keywords=args.get('keywords'), topic=args.get('topic'), run_id=run_id,
+                    slo_seconds=args.get('slo_seconds'), candidates=args.get('candidates'))
+
+
 def preview_outputs():
     """Show article preview and list generated files"""
     art = OUT / 'article.html'
@@ -155,30 +371,41 @@ def preview_outputs():
 
 
 def export_zip(name='calyco_submission.zip'):
-    """Export all outputs to ZIP file"""
+    """Export all outputs to a ZIP (or .tar.zst) archive"""
+    from .exporter import write_archive
     zpath = Path(name)
-    count = 0
     print_header("EXPORTING OUTPUTS")
-    with zipfile.ZipFile(zpath, 'w', zipfile.ZIP_DEFLATED) as z:
-        for p in (BASE / 'outputs').rglob('*'):
-            if p.is_file():
-                z.write(p, arcname=str(p.relative_to(BASE)))
-                count += 1
+    count, size = write_archive(str(zpath))
     print_success(f"Exported {count} files to {zpath}")
-    print_info(f"File size: {zpath.stat().st_size / 1024:.1f}K")
-    write_run_log(str(BASE), f'Exported zip {zpath} ({count} files)')
+    print_info(f"File size: {size / 1024:.1f}K")
+    write_run_log(str(BASE), f'Exported archive {zpath} ({count} files)')
     print()
 
 
+def publish_to_cms():
+    """Push new or changed articles to the configured CMS"""
+    from .publisher import publish, CMS_URL
+    print_header("PUBLISHING TO CMS")
+    if not CMS_URL:
+        print_error("No CMS configured (set CALYCO_CMS_URL)")
+        return None
+    report = publish()
+    print_success(f"{report['created']} created, {report['updated']} updated, "
+                  f"{report['skipped']} unchanged in {report['seconds']}s")
+    if report['failed']:
+        print_warning(f"{report['failed']} articles failed to publish")
+    return report
+
+
 def start_server():
-    """Launch Flask web preview server"""
+    """Launch the web preview server (gunicorn/waitress when installed)"""
+    from .server import serve, default_config
+    cfg = default_config()
     print_header("STARTING WEB PREVIEW SERVER")
-    print_info("Flask server starting at http://localhost:8000")
+    print_info(f"Preview server starting at http://localhost:{cfg['port']} "
+               f"({cfg['workers']} workers × {cfg['threads']} threads)")
     print_warning("Press Ctrl+C to stop the server\n")
-    write_run_log(str(BASE), 'Starting preview server')
-    os.environ['FLASK_APP'] = 'ai_content_pipeline.app'
-    os.environ['FLASK_RUN_PORT'] = '8000'
-    os.system('flask run --host=127.0.0.1 --port=8000')
+    serve()
 
 
 def menu():
@@ -195,12 +422,13 @@ def menu():
   {Colors.CYAN}3{Colors.ENDC}) Regenerate article content
   {Colors.CYAN}4{Colors.ENDC}) Regenerate image variants
   {Colors.CYAN}5{Colors.ENDC}) Preview outputs
-  {Colors.CYAN}6{Colors.ENDC}) Start web preview server (Flask)
+  {Colors.CYAN}6{Colors.ENDC}) Start web preview server
   {Colors.CYAN}7{Colors.ENDC}) Export ZIP for submission
+  {Colors.CYAN}8{Colors.ENDC}) Publish to CMS
   {Colors.CYAN}0{Colors.ENDC}) Exit
 """)
         
-        choice = input(f"{Colors.BOLD}Select option [0-7]: {Colors.ENDC}").strip()
+        choice = input(f"{Colors.BOLD}Select option [0-8]: {Colors.ENDC}").strip()
         
         if choice == '1':
             run_full()
@@ -232,6 +460,8 @@ def menu():
         elif choice == '7':
             name = input("Zip filename [default: calyco_submission.zip]: ").strip() or 'calyco_submission.zip'
             export_zip(name)
+        elif choice == '8':
+            publish_to_cms()
         elif choice == '0':
             print_info("Exiting CALYCO Pipeline. Goodbye!")
             break
@@ -239,10 +469,45 @@ def menu():
             print_error("Unknown option. Please try again.")
 
 
-if __name__ == '__main__':
-    # Default: run full pipeline in one command
-    # Use --menu flag for interactive mode
-    if len(sys.argv) > 1 and sys.argv[1] == '--menu':
+def main(argv=None):
+    """Command-line entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.main', description='CALYCO AI Content Pipeline')
+    parser.add_argument('--menu', action='store_true', help='interactive menu-driven CLI')
+    parser.add_argument('--daemon', action='store_true', help='run as a long-lived daemon with warm clients')
+    parser.add_argument('--resume', metavar='RUN_ID', help='resume a failed run from its first incomplete stage')
+    parser.add_argument('--slo', type=float, default=None, metavar='SECONDS',
+                        help='latency-budget mode: finish the run within SECONDS using fallbacks as needed')
+    parser.add_argument('--candidates', type=int, default=None, metavar='N',
+                        help='generate N article variants concurrently and keep the best-scoring one')
+    parser.add_argument('--serve', action='store_true', help='start the production preview server')
+    parser.add_argument('--publish', action='store_true', help='publish new or changed articles to the CMS')
+    parser.add_argument('--host', default=None, help='bind host for --daemon/--serve (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=None, help='port for --daemon (8765) or --serve (8000)')
+    parser.add_argument('--refresh-interval', type=float, default=None,
+                        help='seconds between scheduled trend/feed refreshes in daemon mode')
+    args = parser.parse_args(argv)
+
+    if args.menu:
         menu()
+    elif args.resume:
+        if resume_run(args.resume) is None:
+            sys.exit(1)
+    elif args.daemon:
+        from .daemon import serve_daemon
+        serve_daemon(host=args.host, port=args.port, refresh_interval=args.refresh_interval)
+    elif args.serve:
+        from .server import serve
+        serve(host=args.host, port=args.port)
+    elif args.publish:
+        report = publish_to_cms()
+        if report is None or report['failed']:
+            sys.exit(1)
     else:
-        run_full()
+        run_full(slo_seconds=args.slo, candidates=args.candidates)
+
+
+if __name__ == '__main__':
+    # Default: run full pipeline in one command
+    # Use --menu flag for interactive mode, --daemon for a long-lived process
+    main()
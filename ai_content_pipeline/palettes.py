@@ -0,0 +1,210 @@
+"""
+Palette library and batched variant rendering.
+
+Palettes live in ``palettes.json``; the entries marked ``hero`` are the A/B
+variants used by ``generate_image_variants``. ``batch_variants`` renders
+every palette x angle x texture combination as NumPy array operations into
+one stacked ``(N, H, W, 3)`` uint8 array (in fixed-size chunks to bound the
+float intermediates), scores the batch with ``image_metrics`` and writes a
+single contact sheet for editors.
+
+    python -m ai_content_pipeline.palettes --angles 90,45 --textures smooth,grain
+"""
+import os
+import sys
+import json
+import argparse
+from functools import lru_cache
+from pathlib import Path
+
+from .utils import ensure_outputs_dir, write_run_log
+from . import serialization
+
+BASE = Path(__file__).resolve().parent
+PALETTE_PATH = BASE / 'palettes.json'
+
+# Exploration renders are half the hero size; the chosen palette is re-rendered full size
+BATCH_SIZE = (600, 314)
+# Gradient direction in degrees: 90 runs top to bottom like the hero gradient
+ANGLES = (90,)
+TEXTURES = ('smooth', 'grain', 'linen')
+DEFAULT_TEXTURES = ('smooth',)
+CHUNK = 8
+THUMB_SIZE = (240, 126)
+LABEL_HEIGHT = 18
+SHEET_COLUMNS = 6
+# Kept apart from outputs/ so exploration renders stay out of the preview and exports
+OUT_DIR = 'palettes_out'
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['palettes']
+
+
+def load_library(path=None):
+    """All palettes in the library, in file order."""
+    return list(_load(str(path or PALETTE_PATH)))
+
+
+def hero_palettes(path=None):
+    """``{key: palette}`` for the palettes used as hero variants."""
+    return {p['key']: dict(p, colours=tuple(p['colours'])) for p in load_library(path) if p.get('hero')}
+
+
+def _rgb(colour):
+    return [int(c) for c in colour.split(',')]
+
+
+def variant_specs(palettes, angles=ANGLES, textures=DEFAULT_TEXTURES):
+    return [{'id': f"{p['key']}-{angle}-{texture}", 'palette': p['key'], 'name': p['name'],
+             'colours': p['colours'], 'angle': angle, 'texture': texture}
+            for p in palettes for angle in angles for texture in textures]
+
+
+def _gradient_fields(angles, size):
+    """Blend factor 0..1 across the image for each angle, shape ``(A, H, W)``."""
+    import numpy as np
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    fields = []
+    for angle in angles:
+        rad = np.deg2rad(angle)
+        proj = x * np.cos(rad) + y * np.sin(rad)
+        proj -= proj.min()
+        fields.append(proj / max(float(proj.max()), 1.0))
+    return np.stack(fields)
+
+
+def _vignette(size):
+    """Row multiplier matching the hero gradient's darkening band, shape ``(H, 1)``."""
+    import numpy as np
+    h = size[1]
+    y = np.arange(h, dtype=np.float32)
+    alpha = np.where(y < h // 2, np.floor(y / h * 15), np.floor((h - y) / h * 15))
+    return (1.0 - alpha / 255.0)[:, None]
+
+
+def _texture_fields(textures, size, seed=7):
+    """Additive texture per texture name, shape ``(T, H, W)``."""
+    import numpy as np
+    w, h = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    fields = {
+        'smooth': np.zeros((h, w), dtype=np.float32),
+        'grain': rng.normal(0.0, 2.0, (h, w)).astype(np.float32),
+        'linen': (np.sin(x * (2 * np.pi / 6)) + np.sin(y * (2 * np.pi / 6))) * 1.5,
+    }
+    return np.stack([fields[t] for t in textures])
+
+
+def render_batch(specs, size=BATCH_SIZE, chunk=CHUNK):
+    """Render ``specs`` into one ``(N, H, W, 3)`` uint8 array."""
+    import numpy as np
+    w, h = size
+    angles = sorted({s['angle'] for s in specs})
+    textures = sorted({s['texture'] for s in specs})
+    grad = _gradient_fields(angles, size)
+    tex = _texture_fields(textures, size)
+    vignette = _vignette(size)[None, None]
+    angle_idx = np.array([angles.index(s['angle']) for s in specs])
+    tex_idx = np.array([textures.index(s['texture']) for s in specs])
+    # channels-first while computing so every inner loop runs along a full image row
+    c1 = np.array([_rgb(s['colours'][0]) for s in specs], dtype=np.float32)[:, :, None, None]
+    c2 = np.array([_rgb(s['colours'][1]) for s in specs], dtype=np.float32)[:, :, None, None]
+
+    out = np.empty((len(specs), h, w, 3), dtype=np.uint8)
+    for start in range(0, len(specs), chunk):
+        sl = slice(start, start + chunk)
+        img = (c2[sl] - c1[sl]) * grad[angle_idx[sl]][:, None]
+        img += c1[sl]
+        img *= vignette
+        img += tex[tex_idx[sl]][:, None]
+        img += 0.5
+        np.clip(img, 0, 255, out=img)
+        out[sl] = img.transpose(0, 2, 3, 1)
+    return out
+
+
+def contact_sheet(batch, specs, path, scores=None, thumb=THUMB_SIZE, columns=SHEET_COLUMNS):
+    """Write a labelled grid of thumbnails of ``batch`` to ``path``."""
+    from PIL import Image, ImageDraw
+    rows = (len(specs) + columns - 1) // columns
+    cell_w, cell_h = thumb[0], thumb[1] + LABEL_HEIGHT
+    sheet = Image.new('RGB', (columns * cell_w, rows * cell_h), 'white')
+    draw = ImageDraw.Draw(sheet)
+    for i, spec in enumerate(specs):
+        x, y = (i % columns) * cell_w, (i // columns) * cell_h
+        sheet.paste(Image.fromarray(batch[i]).resize(thumb, Image.BILINEAR), (x, y))
+        label = f"{spec['id']}  {spec['name']}"
+        if scores:
+            label += f"  {scores[i]['score']:.0f}"
+        draw.text((x + 4, y + thumb[1] + 3), label, fill=(60, 60, 60))
+    # the sheet is a review aid, so favour encode speed over file size
+    sheet.save(path, compress_level=1)
+    return path
+
+
+def batch_variants(palettes=None, angles=ANGLES, textures=DEFAULT_TEXTURES, size=BATCH_SIZE, out_base='.',
+                   score=True):
+    """Render, score and contact-sheet every palette/angle/texture combination.
+
+    Writes ``palettes_out/contact_sheet.png`` and ``palettes_out/palette_batch.json``.
+    """
+    from . import image_metrics
+    ensure_outputs_dir(out_base)
+    out = os.path.join(out_base, OUT_DIR)
+    os.makedirs(out, exist_ok=True)
+    palettes = palettes or load_library()
+    specs = variant_specs(palettes, angles, textures)
+    batch = render_batch(specs, size=size)
+
+    scores = None
+    if score:
+        scores = []
+        # metrics on every second pixel: close to image_metrics' analysis size at a quarter of the work
+        for start in range(0, len(specs), CHUNK):
+            chunk = batch[start:start + CHUNK, ::2, ::2].astype('float32') / 255.0
+            scores.extend(image_metrics.score_batch(chunk))
+
+    sheet_path = contact_sheet(batch, specs, str(Path(out) / 'contact_sheet.png'), scores=scores)
+    variants = [dict(spec, **({'score': s['score'], 'components': s['components']} if s else {}))
+                for spec, s in zip(specs, scores or [None] * len(specs))]
+    result = {
+        'count': len(specs),
+        'size': list(size),
+        'contact_sheet': f'{OUT_DIR}/contact_sheet.png',
+        'ranking': [v['id'] for v in sorted(variants, key=lambda v: -v.get('score', 0))] if scores else None,
+        'variants': variants,
+    }
+    serialization.dump(Path(out) / 'palette_batch.json', result)
+    write_run_log(out_base, f'Rendered {len(specs)} palette variants; contact sheet at {sheet_path}')
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.palettes',
+                                     description='Render palette variants and a contact sheet')
+    parser.add_argument('--count', type=int, default=None, help='first N palettes of the library (default all)')
+    parser.add_argument('--angles', default=','.join(str(a) for a in ANGLES), help='comma-separated degrees')
+    parser.add_argument('--textures', default=','.join(DEFAULT_TEXTURES),
+                        help=f'comma-separated, from {", ".join(TEXTURES)}')
+    parser.add_argument('--size', default=f'{BATCH_SIZE[0]}x{BATCH_SIZE[1]}', help='WIDTHxHEIGHT of each variant')
+    parser.add_argument('--no-score', action='store_true', help='skip image metrics')
+    args = parser.parse_args(argv)
+
+    palettes = load_library()[:args.count] if args.count else None
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    result = batch_variants(palettes, angles=[int(a) for a in args.angles.split(',')],
+                            textures=args.textures.split(','), size=size, out_base=str(BASE),
+                            score=not args.no_score)
+    print(f"Rendered {result['count']} variants -> {BASE / result['contact_sheet']}")
+    if result['ranking']:
+        print('Top 5: ' + ', '.join(result['ranking'][:5]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Precompressed siblings for text artifacts.
+
+After a run, every HTML/JSON/text output gets ``<name>.gz`` (and ``<name>.br``
+when the optional ``brotli`` package is installed) next to it, so the preview
+server can hand out the encoded bytes without compressing per request.
+"""
+import os
+import gzip
+
+from .utils import optional_import, write_run_log
+from .storage import get_storage
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.json', '.txt', '.css', '.xml', '.js', '.svg')
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Skip tiny files: the encoded form would not be meaningfully smaller
+MIN_SIZE = 256
+
+
+def is_precompressed_sibling(name):
+    return name.endswith(tuple(ENCODING_SUFFIXES.values()))
+
+
+def _is_fresh(source, target):
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def precompress_file(path, data=None):
+    """Write stale or missing .gz/.br siblings for ``path``; return the encodings written.
+
+    ``data`` is the file's content when the caller already holds it.
+    """
+    brotli = optional_import('brotli')
+    stale = [e for e in ENCODING_SUFFIXES if not _is_fresh(path, path + ENCODING_SUFFIXES[e])]
+    if brotli is None and 'br' in stale:
+        stale.remove('br')
+    if not stale:
+        return []
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    for encoding in stale:
+        if encoding == 'gzip':
+            encoded = gzip.compress(data, compresslevel=9, mtime=0)
+        else:
+            encoded = brotli.compress(data, quality=11)
+        get_storage().write(path + ENCODING_SUFFIXES[encoding], encoded)
+    return stale
+
+
+def precompress_outputs(out_dir, out_base=None, ctx=None):
+    """Precompress every compressible artifact under ``out_dir``.
+
+    Artifacts held by ``ctx`` (a ``RunContext``) are compressed from memory.
+    """
+    count = 0
+    held = set(ctx.names()) if ctx is not None else set()
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            data = ctx.data(name) if name in held and root == str(ctx.out_dir) else None
+            if (len(data) if data is not None else os.path.getsize(path)) < MIN_SIZE:
+                continue
+            if precompress_file(path, data=data):
+                count += 1
+    if out_base is not None:
+        write_run_log(out_base, f'Precompressed {count} artifacts')
+    return count
+
+
+def pick_encoding(accept_encoding, path):
+    """Best available precompressed sibling for an Accept-Encoding header.
+
+    Returns ``(encoding, sibling_path)`` or ``(None, path)``.
+    """
+    accepted = _parse_accept_encoding(accept_encoding or '')
+    for encoding in ('br', 'gzip'):
+        if accepted.get(encoding, 0) <= 0:
+            continue
+        sibling = path + ENCODING_SUFFIXES[encoding]
+        if _is_fresh(path, sibling):
+            return encoding, sibling
+    return None, path
+
+
+def _parse_accept_encoding(header):
+    accepted = {}
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    if '*' in accepted:
+        for encoding in ENCODING_SUFFIXES:
+            accepted.setdefault(encoding, accepted['*'])
+    return accepted
@@ -0,0 +1,146 @@
+"""
+Token-budgeted assembly of ``LONG_ARTICLE_PROMPT``.
+
+Trend bullets and competitor summaries are deduplicated (near-identical lines
+collapse to the first), ranked by relevance to the run's topic and keywords,
+and trimmed to fit a token budget before they are placed in the prompt, so
+prompt size - and with it latency and cost - stays flat however much source
+data collection returns.
+
+Tokens are counted with tiktoken when it is installed, otherwise estimated
+locally from word lengths.
+"""
+import os
+import re
+import math
+from functools import lru_cache
+
+from .utils import optional_import
+from . import prompts
+
+# Whole-prompt token budget, template included
+PROMPT_TOKEN_BUDGET = int(os.environ.get('CALYCO_PROMPT_TOKEN_BUDGET', '1500'))
+# Share of the input budget reserved for trend bullets; any unused part goes to competitors
+TREND_SHARE = 0.5
+# Word-set Jaccard similarity at or above which two lines count as duplicates
+DUPLICATE_THRESHOLD = 0.8
+TOKEN_ENCODING = 'cl100k_base'
+
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset('the and for are with that this from your into our its has have was were will can'.split())
+# Always treated as relevant, on top of the run's topic and keywords
+BRAND_TERMS = ('paint', 'colour', 'color', 'pastel', 'interior', 'home', 'wall', 'palette', 'decor')
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    tiktoken = optional_import('tiktoken')
+    if not tiktoken:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        # encoding files are fetched on first use and may be unavailable offline
+        return None
+
+
+def tokenizer_name():
+    return 'tiktoken' if _encoding() else 'estimate'
+
+
+def count_tokens(text):
+    """Token count of ``text`` (exact with tiktoken, otherwise an estimate)."""
+    enc = _encoding()
+    if enc:
+        return len(enc.encode(text))
+    # roughly one token per four characters of a word, and per punctuation mark
+    return sum(max(1, (len(t) + 3) // 4) for t in _TOKEN_RE.findall(text))
+
+
+def _terms(text):
+    return {w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def dedupe(lines, threshold=DUPLICATE_THRESHOLD):
+    """Drop lines that are near-duplicates of an earlier line.
+
+    Returns ``(kept, dropped_count)``.
+    """
+    kept, kept_terms, seen = [], [], set()
+    for line in lines:
+        key = ' '.join(_WORD_RE.findall(line.lower()))
+        if not key or key in seen:
+            continue
+        terms = _terms(line)
+        if terms and any(len(terms & other) / len(terms | other) >= threshold for other in kept_terms):
+            continue
+        seen.add(key)
+        kept.append(line)
+        kept_terms.append(terms)
+    return kept, len(lines) - len(kept)
+
+
+def rank(lines, query_terms):
+    """Lines ordered by overlap with ``query_terms`` (ties keep input order)."""
+    def score(line):
+        terms = _terms(line)
+        if not terms:
+            return 0.0
+        return len(terms & query_terms) / math.sqrt(len(terms))
+    return sorted(lines, key=score, reverse=True)
+
+
+def trim(lines, budget):
+    """Take lines in order while they fit in ``budget`` tokens (one per line for the newline)."""
+    chosen, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost <= budget:
+            chosen.append(line)
+            used += cost
+    return chosen, used
+
+
+def _compact(lines, query_terms, budget):
+    lines = [str(l).strip() for l in lines if l and str(l).strip()]
+    unique, duplicates = dedupe(lines)
+    kept, used = trim(rank(unique, query_terms), budget)
+    report = {
+        'input': len(lines),
+        'duplicates': duplicates,
+        'kept': len(kept),
+        'input_tokens': sum(count_tokens(l) + 1 for l in lines),
+        'kept_tokens': used,
+    }
+    return kept, used, report
+
+
+def build_article_prompt(trend_summary, competitor_summary, topic=None, keywords=None, budget=None):
+    """``LONG_ARTICLE_PROMPT`` with inputs compacted to ``budget`` tokens.
+
+    Returns ``(prompt, report)``; ``report`` records the budget, final prompt
+    size and what was dropped from each input.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    template_tokens = count_tokens(prompts.LONG_ARTICLE_PROMPT.format(TREND_SUMMARY='', COMPETITOR_SUMMARY=''))
+    available = max(0, budget - template_tokens)
+    query_terms = set(BRAND_TERMS)
+    for text in [topic or ''] + list(keywords or []):
+        query_terms |= _terms(text)
+
+    trends, used, trend_report = _compact(trend_summary, query_terms, int(available * TREND_SHARE))
+    competitors, _, competitor_report = _compact(competitor_summary, query_terms, available - used)
+    prompt = prompts.LONG_ARTICLE_PROMPT.format(
+        TREND_SUMMARY='\n'.join(trends),
+        COMPETITOR_SUMMARY='\n'.join(competitors)
+    )
+    report = {
+        'budget': budget,
+        'prompt_tokens': count_tokens(prompt),
+        'template_tokens': template_tokens,
+        'tokenizer': tokenizer_name(),
+        'trends': trend_report,
+        'competitors': competitor_report,
+    }
+    return prompt, report
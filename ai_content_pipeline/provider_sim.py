@@ -0,0 +1,403 @@
+"""
+Local stand-in for the OpenAI chat and image endpoints.
+
+Lets concurrency limits, retries, caching and throughput be benchmarked
+offline and without spend. Point the pipeline at it by base URL (any
+non-empty key enables the API paths):
+
+    python -m ai_content_pipeline.provider_sim --latency lognormal:800 --rate-limit 0.05
+    OPENAI_API_BASE=http://127.0.0.1:8099/v1 OPENAI_API_KEY=sim IMG_API_KEY=sim \\
+        python -m ai_content_pipeline.main --candidates 4
+
+Endpoints:
+
+- ``POST /v1/chat/completions``: an HTML article (with the ``METADATA``
+  comment the pipeline parses), also as server-sent events with
+  ``"stream": true``; ``max_tokens`` truncates with ``finish_reason: length``
+- ``POST /v1/images/generations``: a PNG of the requested ``size`` as
+  ``b64_json``
+- ``GET /v1/models``, ``GET /stats`` (counters, peak concurrency) and
+  ``POST /stats/reset``
+
+Latency is sampled per request from ``--latency`` (``fixed:MS``,
+``uniform:LO-HI``, ``normal:MEAN,SD``, ``lognormal:MEDIAN[,SIGMA]`` or
+``exp:MEAN``, all in milliseconds); completions then take
+``tokens / --tokens-per-second`` longer, streamed token by token when asked.
+``--error-rate`` and ``--rate-limit`` turn that fraction of requests into
+500s and 429s (with ``Retry-After``), and requests beyond
+``--max-concurrency`` in flight get 429 like a provider's concurrency cap.
+Responses depend only on the request and ``--seed``, so repeated prompts
+return identical payloads.
+"""
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .utils import write_run_log
+
+CHARS_PER_TOKEN = 4
+STREAM_TOKENS_PER_CHUNK = 4
+WORDS = ('pastel', 'sage', 'blush', 'lavender', 'calm', 'light', 'wall', 'room', 'paint', 'finish', 'texture',
+         'natural', 'urban', 'home', 'balcony', 'warm', 'soft', 'palette', 'colour', 'mood', 'linen', 'clay',
+         'morning', 'shade', 'trim', 'ceiling', 'accent', 'matte', 'breathable', 'low-VOC', 'fresh', 'layered')
+
+
+def default_config():
+    """Simulator settings, overridable through CALYCO_SIM_* environment variables."""
+    return {
+        'host': os.environ.get('CALYCO_SIM_HOST', '127.0.0.1'),
+        'port': int(os.environ.get('CALYCO_SIM_PORT', '8099')),
+        'latency': os.environ.get('CALYCO_SIM_LATENCY', 'lognormal:600'),
+        'tokens_per_second': float(os.environ.get('CALYCO_SIM_TOKENS_PER_SECOND', '400')),
+        'error_rate': float(os.environ.get('CALYCO_SIM_ERROR_RATE', '0')),
+        'rate_limit': float(os.environ.get('CALYCO_SIM_RATE_LIMIT', '0')),
+        'retry_after': float(os.environ.get('CALYCO_SIM_RETRY_AFTER', '1')),
+        'max_concurrency': int(os.environ.get('CALYCO_SIM_MAX_CONCURRENCY', '0')),
+        'article_words': int(os.environ.get('CALYCO_SIM_ARTICLE_WORDS', '750')),
+        'image_bytes': int(os.environ.get('CALYCO_SIM_IMAGE_BYTES', '0')),
+        'seed': int(os.environ.get('CALYCO_SIM_SEED', '0')),
+    }
+
+
+def parse_latency(spec):
+    """Sampler ``f(rng) -> seconds`` for a latency spec such as ``lognormal:800``."""
+    kind, _, args = spec.partition(':')
+    try:
+        if kind == 'fixed':
+            ms = float(args)
+            return lambda rng: ms / 1000.0
+        if kind == 'uniform':
+            lo, hi = (float(v) for v in args.split('-'))
+            return lambda rng: rng.uniform(lo, hi) / 1000.0
+        if kind == 'normal':
+            mean, sd = (float(v) for v in args.split(','))
+            return lambda rng: max(0.0, rng.gauss(mean, sd)) / 1000.0
+        if kind == 'lognormal':
+            median, _, sigma = args.partition(',')
+            mu, sigma = math.log(float(median)), float(sigma or 0.5)
+            return lambda rng: rng.lognormvariate(mu, sigma) / 1000.0
+        if kind == 'exp':
+            mean = float(args)
+            return lambda rng: rng.expovariate(1.0 / mean) / 1000.0 if mean else 0.0
+    except ValueError:
+        pass
+    raise ValueError(f"invalid latency spec '{spec}' (e.g. fixed:200, uniform:100-900, normal:500,100, "
+                     f"lognormal:800, exp:300)")
+
+
+def _digest_rng(seed, *parts):
+    h = hashlib.sha256(json.dumps([seed, *parts], sort_keys=True, default=str).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(h[:8], 'big'))
+
+
+def article_html(prompt, words, seed=0):
+    """A deterministic article of about ``words`` words for ``prompt``."""
+    rng = _digest_rng(seed, 'article', prompt)
+    title = ' '.join(w.capitalize() for w in rng.sample(WORDS, 4))
+    meta = {'meta_description': f'{title}: a simulated guide to pastel interiors.',
+            'tags': rng.sample(WORDS, 5), 'author': 'CALYCO', 'datePublished': time.strftime('%Y-%m-%d')}
+    parts = [f'<!-- METADATA:{json.dumps(meta)} -->', '<article>', f'<h1>{title}</h1>']
+    written = 0
+    section = 0
+    while written < words:
+        section += 1
+        parts.append(f'<h2>Section {section}: {" ".join(rng.sample(WORDS, 3))}</h2>')
+        for _ in range(3):
+            n = min(rng.randint(40, 70), max(1, words - written))
+            sentence = ' '.join(rng.choice(WORDS) for _ in range(n))
+            parts.append(f'<p>{sentence.capitalize()}.</p>')
+            written += n
+            if written >= words:
+                break
+    parts.append('</article>')
+    return '\n'.join(parts)
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+@lru_cache(maxsize=32)
+def image_png(width, height, seed=0, pad_to=0):
+    """A ``width`` x ``height`` gradient PNG, padded to ``pad_to`` bytes with a private chunk."""
+    rng = _digest_rng(seed, 'image', width, height)
+    top, bottom = [rng.randint(150, 255) for _ in range(3)], [rng.randint(150, 255) for _ in range(3)]
+    rows = []
+    for y in range(height):
+        t = y / max(1, height - 1)
+        pixel = bytes(int(a + (b - a) * t) for a, b in zip(top, bottom))
+        rows.append(b'\x00' + pixel * width)
+    png = (b'\x89PNG\r\n\x1a\n'
+           + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+           + _png_chunk(b'IDAT', zlib.compress(b''.join(rows), 6)))
+    # ancillary, private chunk: decoders skip it, so it only inflates the payload
+    padding = pad_to - len(png) - 12 - 12
+    if padding > 0:
+        png += _png_chunk(b'siMz', bytes(padding))
+    return png + _png_chunk(b'IEND', b'')
+
+
+class Simulator:
+    """Shared state of one simulator: config, random source and counters."""
+
+    def __init__(self, **config):
+        self.config = dict(default_config(), **config)
+        self.latency = parse_latency(self.config['latency'])
+        self._rng = random.Random(self.config['seed'])
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.requests = {}
+            self.bytes_sent = 0
+            self.started = time.time()
+
+    def draw(self):
+        """``(latency_seconds, outcome)`` for a new request; outcome is ok/error/rate_limited."""
+        with self._lock:
+            latency = self.latency(self._rng)
+            roll = self._rng.random()
+        if roll < self.config['rate_limit']:
+            return latency, 'rate_limited'
+        if roll < self.config['rate_limit'] + self.config['error_rate']:
+            return latency, 'error'
+        return latency, 'ok'
+
+    def enter(self):
+        """Admit a request; False when ``max_concurrency`` are already in flight."""
+        with self._lock:
+            limit = self.config['max_concurrency']
+            if limit and self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def count(self, endpoint, status, sent=0):
+        with self._lock:
+            by_status = self.requests.setdefault(endpoint, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+            self.bytes_sent += sent
+
+    def stats(self):
+        with self._lock:
+            return {'requests': {k: dict(v) for k, v in self.requests.items()}, 'in_flight': self.in_flight,
+                    'peak_in_flight': self.peak_in_flight, 'bytes_sent': self.bytes_sent,
+                    'uptime_seconds': round(time.time() - self.started, 3), 'config': dict(self.config)}
+
+
+def _make_handler(sim, out_base=None):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, obj, status=200, headers=None):
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+            return len(body)
+
+        def _error(self, status, message, kind, headers=None):
+            return self._send_json({'error': {'message': message, 'type': kind, 'code': kind}}, status, headers)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+        def do_GET(self):
+            if self.path == '/v1/models':
+                self._send_json({'object': 'list', 'data': [{'id': 'gpt-4o-mini', 'object': 'model'},
+                                                            {'id': 'dall-e-3', 'object': 'model'}]})
+            elif self.path == '/stats':
+                self._send_json(sim.stats())
+            elif self.path == '/health':
+                self._send_json({'ok': True})
+            else:
+                self._error(404, f'unknown path {self.path}', 'not_found')
+
+        def do_POST(self):
+            try:
+                payload = self._read_json()
+            except ValueError:
+                self._error(400, 'invalid JSON body', 'invalid_request_error')
+                return
+            endpoints = {'/v1/chat/completions': self._chat, '/v1/images/generations': self._image}
+            if self.path == '/stats/reset':
+                sim.reset()
+                self._send_json(sim.stats())
+                return
+            if self.path not in endpoints:
+                self._error(404, f'unknown path {self.path}', 'not_found')
+                return
+            endpoint = self.path.rsplit('/', 1)[-1]
+            if not self.headers.get('Authorization'):
+                sim.count(endpoint, 401, self._error(401, 'missing API key', 'invalid_api_key'))
+                return
+            if not sim.enter():
+                sent = self._error(429, 'too many concurrent requests', 'rate_limit_exceeded',
+                                   {'Retry-After': f"{sim.config['retry_after']:g}"})
+                sim.count(endpoint, 429, sent)
+                return
+            try:
+                latency, outcome = sim.draw()
+                time.sleep(latency)
+                if outcome == 'rate_limited':
+                    sent = self._error(429, 'rate limit reached (simulated)', 'rate_limit_exceeded',
+                                       {'Retry-After': f"{sim.config['retry_after']:g}"})
+                    sim.count(endpoint, 429, sent)
+                elif outcome == 'error':
+                    sim.count(endpoint, 500, self._error(500, 'internal server error (simulated)', 'server_error'))
+                else:
+                    status, sent = endpoints[self.path](payload)
+                    sim.count(endpoint, status, sent)
+            except (BrokenPipeError, ConnectionResetError):
+                sim.count(endpoint, 'disconnected')
+            finally:
+                sim.leave()
+
+        def _chat(self, payload):
+            messages = payload.get('messages') or []
+            if not messages:
+                return 400, self._error(400, "'messages' is required", 'invalid_request_error')
+            prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+            content = article_html(prompt, sim.config['article_words'], sim.config['seed'])
+            finish = 'stop'
+            max_tokens = payload.get('max_tokens')
+            if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+                content, finish = content[:max_tokens * CHARS_PER_TOKEN], 'length'
+            prompt_tokens = len(prompt) // CHARS_PER_TOKEN + 1
+            completion_tokens = len(content) // CHARS_PER_TOKEN + 1
+            model = payload.get('model') or 'gpt-4o-mini'
+            base = {'id': f'chatcmpl-sim-{hashlib.sha1(prompt.encode()).hexdigest()[:12]}',
+                    'created': int(time.time()), 'model': model}
+            tps = sim.config['tokens_per_second']
+            if payload.get('stream'):
+                return 200, self._stream(base, content, finish, tps)
+            if tps:
+                time.sleep(completion_tokens / tps)
+            return 200, self._send_json(dict(base, object='chat.completion', choices=[
+                {'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': finish}],
+                usage={'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                       'total_tokens': prompt_tokens + completion_tokens}))
+
+        def _stream(self, base, content, finish, tps):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            step = STREAM_TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+            sent = 0
+
+            def event(delta, reason=None):
+                chunk = dict(base, object='chat.completion.chunk',
+                             choices=[{'index': 0, 'delta': delta, 'finish_reason': reason}])
+                data = f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode('utf-8')
+                self.wfile.write(data)
+                self.wfile.flush()
+                return len(data)
+
+            sent += event({'role': 'assistant'})
+            for i in range(0, len(content), step):
+                if tps:
+                    time.sleep(STREAM_TOKENS_PER_CHUNK / tps)
+                sent += event({'content': content[i:i + step]})
+            sent += event({}, finish)
+            self.wfile.write(b'data: [DONE]\n\n')
+            return sent + 14
+
+        def _image(self, payload):
+            try:
+                width, height = (int(v) for v in str(payload.get('size') or '1024x1024').lower().split('x'))
+            except ValueError:
+                return 400, self._error(400, "'size' must look like 1024x1024", 'invalid_request_error')
+            if not (0 < width <= 4096 and 0 < height <= 4096):
+                return 400, self._error(400, 'size out of range', 'invalid_request_error')
+            png = image_png(width, height, sim.config['seed'], sim.config['image_bytes'])
+            b64 = base64.b64encode(png).decode('ascii')
+            data = [{'b64_json': b64, 'revised_prompt': payload.get('prompt')}
+                    for _ in range(max(1, int(payload.get('n') or 1)))]
+            return 200, self._send_json({'created': int(time.time()), 'data': data})
+
+        def log_message(self, fmt, *args):
+            if out_base:
+                write_run_log(out_base, 'Provider sim: ' + (fmt % args))
+
+    return Handler
+
+
+def start_simulator(out_base=None, **config):
+    """Serve a simulator on a background thread; returns the server (``server.url``, ``server.sim``)."""
+    sim = Simulator(**config)
+    server = ThreadingHTTPServer((sim.config['host'], sim.config['port']), _make_handler(sim, out_base))
+    server.daemon_threads = True
+    server.sim = sim
+    server.url = f'http://{server.server_address[0]}:{server.server_address[1]}/v1'
+    threading.Thread(target=server.serve_forever, daemon=True, name='calyco-provider-sim').start()
+    return server
+
+
+def main(argv=None):
+    cfg = default_config()
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.provider_sim',
+                                     description='Serve a local OpenAI-compatible chat/image simulator')
+    parser.add_argument('--host', default=cfg['host'])
+    parser.add_argument('--port', type=int, default=cfg['port'])
+    parser.add_argument('--latency', default=cfg['latency'], help='latency distribution in ms, e.g. lognormal:800')
+    parser.add_argument('--tokens-per-second', type=float, default=cfg['tokens_per_second'],
+                        help='completion generation speed (0 = instant)')
+    parser.add_argument('--error-rate', type=float, default=cfg['error_rate'], help='fraction of requests that 500')
+    parser.add_argument('--rate-limit', type=float, default=cfg['rate_limit'], help='fraction of requests that 429')
+    parser.add_argument('--retry-after', type=float, default=cfg['retry_after'], help='Retry-After seconds on 429')
+    parser.add_argument('--max-concurrency', type=int, default=cfg['max_concurrency'],
+                        help='requests in flight before 429 (0 = unlimited)')
+    parser.add_argument('--article-words', type=int, default=cfg['article_words'])
+    parser.add_argument('--image-bytes', type=int, default=cfg['image_bytes'], help='pad PNG payloads to this size')
+    parser.add_argument('--seed', type=int, default=cfg['seed'])
+    args = parser.parse_args(argv)
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sim = Simulator(**vars(args))
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(sim))
+    server.daemon_threads = True
+    print(f'Provider simulator on http://{args.host}:{args.port}/v1 (latency {args.latency}, '
+          f'errors {args.error_rate:g}, 429s {args.rate_limit:g})')
+    print(f'  OPENAI_API_BASE=http://{args.host}:{args.port}/v1 OPENAI_API_KEY=sim IMG_API_KEY=sim')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(sim.stats()['requests']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
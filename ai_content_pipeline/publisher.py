@@ -0,0 +1,454 @@
+"""
+Bulk publishing of generated articles to a CMS over HTTP.
+
+Every run with an ``article.html`` (``outputs/`` plus each queued run, as in
+``site_builder``) is pushed as a post with its article body, the JSON-LD from
+``metadata.json``, hero derivatives and social captions. The REST adapter
+expects two endpoints, which most CMSs can be given through a thin plugin or
+gateway:
+
+- ``POST /media``: raw file bytes -> ``{"id", "url"}``
+- ``POST /posts/batch``: ``{"items": [post, ...]}`` upserted by
+  ``external_id`` -> ``{"results": [{"external_id", "id", "status"}]}``
+
+All calls share one pooled keep-alive session and carry an
+``Idempotency-Key`` (the content hash), so retries after timeouts, 429s and
+5xx responses never create duplicates. Media are uploaded concurrently and
+only once per content hash; posts go up in batches of ``BATCH_SIZE``.
+``publish_state.json`` remembers what was published, so articles whose
+sources (including captions) did not change are skipped without being read.
+The state is tied to the CMS base URL and starts over for a different CMS.
+An article whose files cannot be read or whose images fail to upload is
+counted as failed without stopping the others.
+
+    python -m ai_content_pipeline.publisher --url https://cms.example.com/api --token ...
+    python -m ai_content_pipeline.publisher --fake          # in-process fake CMS
+    python -m ai_content_pipeline.publisher --serve-fake    # fake CMS on :8098
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .utils import write_run_log
+from . import serialization
+
+BASE = Path(__file__).resolve().parent
+CMS_URL = os.environ.get('CALYCO_CMS_URL')
+CMS_TOKEN = os.environ.get('CALYCO_CMS_TOKEN')
+STATE_PATH = Path(os.environ.get('CALYCO_PUBLISH_STATE', str(BASE / 'publish_state.json')))
+BATCH_SIZE = int(os.environ.get('CALYCO_PUBLISH_BATCH', '50'))
+# Concurrent media uploads and post batches, and the size of the connection pool
+WORKERS = int(os.environ.get('CALYCO_PUBLISH_WORKERS', '8'))
+MEDIA_PATH = '/media'
+POSTS_BATCH_PATH = '/posts/batch'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MEDIA_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _canonical(obj):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class RestCMS:
+    """Generic REST adapter: pooled keep-alive session, retries, idempotency keys."""
+
+    def __init__(self, base_url, token=None, pool_size=WORKERS, timeout=30, retries=4):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.requests = 0
+        self.session = requests.Session()
+        # POSTs are safe to retry: every call carries an idempotency key
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES, allowed_methods=None,
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': 'calyco-publisher/1.0'})
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def _post(self, path, key, **kwargs):
+        headers = dict(kwargs.pop('headers', {}), **{'Idempotency-Key': key})
+        self.requests += 1
+        resp = self.session.post(self.base_url + path, headers=headers, timeout=self.timeout, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def upload_media(self, name, data, content_type, key):
+        """``{'id', 'url'}`` of the uploaded file."""
+        return self._post(MEDIA_PATH, key, data=data,
+                          headers={'Content-Type': content_type,
+                                   'Content-Disposition': f'attachment; filename="{name}"'})
+
+    def upsert_posts(self, items, key):
+        """Create or update ``items`` by ``external_id``; one result per item."""
+        return self._post(POSTS_BATCH_PATH, key, json={'items': items})['results']
+
+    def close(self):
+        self.session.close()
+
+
+def _captions(src):
+    try:
+        with open(src / 'social_captions.txt', 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return []
+    return [c.strip() for c in re.split(r'\n-{3,}\n', text) if c.strip()]
+
+
+def _hero_media(hero, heroes):
+    """``[(file, width, sha256, bytes)]`` for the hero and its derivatives.
+
+    ``heroes`` maps the hash of an already published hero to its derivatives'
+    ``[file, width, sha256]``; those are returned without bytes instead of
+    being decoded and re-encoded again.
+    """
+    try:
+        with open(hero, 'rb') as f:
+            known = heroes.get(_sha256(f.read()))
+    except OSError:
+        return []
+    if known:
+        return [(name, width, sha, None) for name, width, sha in known]
+    from .site_builder import hero_derivatives
+    return [(name, width, _sha256(data), data) for name, width, data in hero_derivatives(hero)]
+
+
+def prepare_article(article_id, src, slug, heroes=None):
+    """``(post, media)`` for one source: the post without media references and
+    ``[(file, width, sha256, bytes)]`` for its hero images."""
+    from .site_builder import _read_json, _tag_list
+    with open(src / 'article.html', 'r', encoding='utf-8') as f:
+        full_html = f.read()
+    article = _read_json(src / 'article.json') or {}
+    jsonld = _read_json(src / 'metadata.json') or {}
+    meta = article.get('metadata') or {}
+    body_match = re.search(r'<body[^>]*>(.*?)</body>', full_html, re.S)
+    jsonld = dict(jsonld)
+    jsonld.pop('articleBody', None)
+    post = {
+        'external_id': article_id,
+        'slug': slug,
+        'title': article.get('title') or jsonld.get('headline') or article_id,
+        'status': 'publish',
+        'date': meta.get('datePublished') or article.get('date') or jsonld.get('datePublished'),
+        'excerpt': meta.get('meta_description') or jsonld.get('description') or '',
+        'html': (body_match.group(1) if body_match else full_html).strip(),
+        'tags': [t['name'] for t in _tag_list(meta.get('tags') or jsonld.get('keywords'))],
+        'jsonld': jsonld,
+        'captions': _captions(src),
+    }
+    return post, _hero_media(src / 'hero.png', heroes or {})
+
+
+def publish_signature(src):
+    """``site_builder.source_signature`` plus the captions, which only the publisher sends."""
+    from .site_builder import source_signature
+    from .artifact_cache import file_signature
+    captions = file_signature(os.path.join(os.fspath(src), 'social_captions.txt'))
+    return source_signature(src) + [list(captions) if captions else None]
+
+
+def _attach_media(post, media, uploaded):
+    refs = [dict(uploaded[sha], file=name, width=width) for name, width, sha, _ in media]
+    post = dict(post, media=refs, featured_media=refs[0]['id'] if refs else None)
+    if refs:
+        post['jsonld'] = dict(post['jsonld'], image=[r['url'] for r in refs])
+    post['idempotency_key'] = _sha256(_canonical(post))
+    return post
+
+
+def _fail(report, article_id, error):
+    report['failed'] += 1
+    report.setdefault('errors', []).append(f'{article_id}: {error}')
+
+
+def publish(sources=None, cms=None, state_path=None, force=False, batch_size=BATCH_SIZE, workers=WORKERS,
+            out_base=None):
+    """Publish new or changed articles in ``sources`` to ``cms``; returns a report."""
+    from .site_builder import discover_sources, unique_slugs
+    started = time.perf_counter()
+    state_path = Path(state_path or STATE_PATH)
+    sources = sources if sources is not None else discover_sources()
+    own_cms = cms is None
+    if own_cms:
+        if not CMS_URL:
+            raise RuntimeError('no CMS configured (set CALYCO_CMS_URL)')
+        cms = RestCMS(CMS_URL, CMS_TOKEN, pool_size=workers)
+    try:
+        state = serialization.load(state_path) if state_path.exists() else {}
+    except (OSError, ValueError):
+        state = {}
+    cms_url = getattr(cms, 'base_url', None)
+    if state.get('cms_url') != cms_url:
+        # ids, media URLs and published slugs belong to the CMS they came from
+        state = {'cms_url': cms_url}
+    published = state.setdefault('articles', {})
+    media_index = state.setdefault('media', {})
+    heroes = state.setdefault('heroes', {})
+    signatures = {a: publish_signature(src) for a, src in sources.items()}
+    changed = [a for a in sorted(sources)
+               if force or a not in published or published[a].get('signature') != signatures[a]]
+    slugs = unique_slugs(changed, sources, {a: e for a, e in published.items() if 'slug' in e})
+    report = {'articles': len(sources), 'skipped': len(sources) - len(changed), 'created': 0, 'updated': 0,
+              'unchanged': 0, 'failed': 0, 'media_uploaded': 0, 'media_reused': 0, 'media_failed': 0}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # a failure affects only its own article(s), never the rest of the batch
+            futures = {a: pool.submit(prepare_article, a, sources[a], slugs[a], heroes) for a in changed}
+            prepared = {}
+            for article_id, future in futures.items():
+                try:
+                    prepared[article_id] = future.result()
+                except Exception as e:
+                    _fail(report, article_id, e)
+
+            # each distinct file once, however many articles share it
+            pending = {}
+            for _, media in prepared.values():
+                for name, _, sha, data in media:
+                    if sha not in media_index and sha not in pending:
+                        pending[sha] = (name, data)
+            report['media_reused'] = sum(len(m) for _, m in prepared.values()) - len(pending)
+
+            def upload(sha):
+                name, data = pending[sha]
+                content_type = MEDIA_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+                ref = cms.upload_media(name, data, content_type, key=f'media-{sha}')
+                return {'id': ref['id'], 'url': ref['url']}
+
+            uploads = {sha: pool.submit(upload, sha) for sha in pending}
+            for sha, future in uploads.items():
+                try:
+                    media_index[sha] = future.result()
+                    report['media_uploaded'] += 1
+                except Exception as e:
+                    report['media_failed'] += 1
+                    report.setdefault('errors', []).append(f'{pending[sha][0]} ({sha[:12]}): {e}')
+            for article_id, (_, media) in list(prepared.items()):
+                missing = [name for name, _, sha, _ in media if sha not in media_index]
+                if missing:
+                    del prepared[article_id]
+                    _fail(report, article_id, f"media not uploaded: {', '.join(missing)}")
+                elif media and media[0][3] is not None:
+                    heroes[_sha256(media[0][3])] = [[name, width, sha] for name, width, sha, _ in media]
+
+            posts = [_attach_media(*prepared[a], media_index) for a in changed if a in prepared]
+            batches = [posts[i:i + batch_size] for i in range(0, len(posts), batch_size)]
+            futures = [pool.submit(cms.upsert_posts, batch, _sha256(_canonical([p['idempotency_key'] for p in batch])))
+                       for batch in batches]
+            for batch, future in zip(batches, futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    report['failed'] += len(batch)
+                    report.setdefault('errors', []).append(str(e))
+                    continue
+                by_id = {r['external_id']: r for r in results}
+                for post in batch:
+                    result = by_id.get(post['external_id'], {'status': 'failed'})
+                    status = result['status'] if result['status'] in ('created', 'updated', 'unchanged') else 'failed'
+                    report[status] += 1
+                    if status != 'failed':
+                        published[post['external_id']] = {'id': result['id'], 'slug': post['slug'],
+                                                          'signature': signatures[post['external_id']],
+                                                          'key': post['idempotency_key']}
+                serialization.dump(state_path, state)
+    finally:
+        serialization.dump(state_path, state)
+        if own_cms:
+            cms.close()
+
+    report['requests'] = getattr(cms, 'requests', None)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    write_run_log(str(out_base or BASE), f"Published {report['created']} new, {report['updated']} updated, "
+                                         f"{report['skipped']} unchanged articles in {report['seconds']}s")
+    return report
+
+
+class FakeCMS:
+    """In-memory CMS implementing the adapter's endpoints, for tests and benchmarks."""
+
+    def __init__(self, latency=0.0, token=None):
+        self.latency = latency
+        self.token = token
+        self.posts = {}
+        self.media = {}
+        self.responses = {}  # Idempotency-Key -> (status, body)
+        self.stats = {'requests': 0, 'connections': 0, 'media_uploads': 0, 'batches': 0, 'replays': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, what):
+        with self._lock:
+            self.stats[what] += 1
+
+    def upload_media(self, name, data, base_url):
+        with self._lock:
+            media_id = len(self.media) + 1
+            self.media[media_id] = {'name': name, 'size': len(data), 'sha256': _sha256(data)}
+        self._count('media_uploads')
+        return {'id': media_id, 'url': f'{base_url}/media/{media_id}/{name}'}
+
+    def upsert_posts(self, items):
+        results = []
+        with self._lock:
+            for item in items:
+                existing = self.posts.get(item['external_id'])
+                if existing is None:
+                    post_id, status = len(self.posts) + 1, 'created'
+                elif existing['idempotency_key'] == item.get('idempotency_key'):
+                    post_id, status = existing['id'], 'unchanged'
+                else:
+                    post_id, status = existing['id'], 'updated'
+                self.posts[item['external_id']] = dict(item, id=post_id)
+                results.append({'external_id': item['external_id'], 'id': post_id, 'status': status})
+        self._count('batches')
+        return {'results': results}
+
+
+def _make_fake_handler(cms):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            cms._count('connections')
+
+        def _send_json(self, obj, status=200):
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            cms._count('requests')
+            if self.path == '/stats':
+                self._send_json(dict(cms.stats, posts=len(cms.posts), media=len(cms.media)))
+            elif self.path == '/posts':
+                self._send_json({'posts': [{k: p[k] for k in ('id', 'external_id', 'slug', 'title')}
+                                           for p in cms.posts.values()]})
+            else:
+                self._send_json({'error': 'not found'}, 404)
+
+        def do_POST(self):
+            cms._count('requests')
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if cms.token and self.headers.get('Authorization') != f'Bearer {cms.token}':
+                self._send_json({'error': 'unauthorized'}, 401)
+                return
+            if cms.latency:
+                time.sleep(cms.latency)
+            key = self.headers.get('Idempotency-Key')
+            if key and key in cms.responses:
+                cms._count('replays')
+                self._send_json(*cms.responses[key])
+                return
+            if self.path == MEDIA_PATH:
+                match = re.search(r'filename="([^"]+)"', self.headers.get('Content-Disposition', ''))
+                host = self.headers.get('Host', 'localhost')
+                response = (cms.upload_media(match.group(1) if match else 'upload', body, f'http://{host}'), 201)
+            elif self.path == POSTS_BATCH_PATH:
+                try:
+                    items = json.loads(body.decode('utf-8'))['items']
+                except (ValueError, KeyError):
+                    self._send_json({'error': 'expected {"items": [...]}'}, 400)
+                    return
+                response = (cms.upsert_posts(items), 200)
+            else:
+                self._send_json({'error': 'not found'}, 404)
+                return
+            if key:
+                cms.responses[key] = response
+            self._send_json(*response)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_cms(host='127.0.0.1', port=0, latency=0.0, token=None):
+    """Serve a ``FakeCMS`` on a background thread; returns the server (``server.url``, ``server.cms``)."""
+    cms = FakeCMS(latency=latency, token=token)
+    server = ThreadingHTTPServer((host, port), _make_fake_handler(cms))
+    server.daemon_threads = True
+    server.cms = cms
+    server.url = f'http://{server.server_address[0]}:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True, name='calyco-fake-cms').start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.publisher',
+                                     description='Publish generated articles to a CMS')
+    parser.add_argument('--url', default=CMS_URL, help='CMS API base URL (CALYCO_CMS_URL)')
+    parser.add_argument('--token', default=CMS_TOKEN, help='bearer token (CALYCO_CMS_TOKEN)')
+    parser.add_argument('--force', action='store_true', help='republish articles whose sources did not change')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--state', default=None, help=f'publish state file (default {STATE_PATH}; '
+                                                      'a temporary file with --fake)')
+    parser.add_argument('--fake', action='store_true', help='publish to an in-process fake CMS')
+    parser.add_argument('--serve-fake', action='store_true', help='run a fake CMS server until interrupted')
+    parser.add_argument('--port', type=int, default=8098, help='port for --serve-fake')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='per-request latency of the fake CMS')
+    args = parser.parse_args(argv)
+
+    if args.serve_fake:
+        server = start_fake_cms(port=args.port, latency=args.latency_ms / 1000.0, token=args.token)
+        print(f'Fake CMS on {server.url} (CALYCO_CMS_URL={server.url})')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(dict(server.cms.stats, posts=len(server.cms.posts))))
+        return 0
+
+    fake = start_fake_cms(latency=args.latency_ms / 1000.0) if args.fake else None
+    url = fake.url if fake else args.url
+    if not url:
+        parser.error('no CMS URL (use --url, CALYCO_CMS_URL or --fake)')
+    state_path = args.state
+    if state_path is None:
+        # a fake CMS's state must never be mistaken for the real one's
+        state_path = os.path.join(tempfile.mkdtemp(prefix='calyco-fake-cms-'), 'publish_state.json') if fake \
+            else STATE_PATH
+    cms = RestCMS(url, args.token, pool_size=args.workers)
+    try:
+        report = publish(cms=cms, state_path=state_path, force=args.force, batch_size=args.batch_size,
+                         workers=args.workers)
+    finally:
+        cms.close()
+    print(f"{report['articles']} articles: {report['created']} created, {report['updated']} updated, "
+          f"{report['unchanged']} unchanged, {report['skipped']} skipped, {report['failed']} failed")
+    print(f"media: {report['media_uploaded']} uploaded, {report['media_reused']} reused, "
+          f"{report['media_failed']} failed; {report['requests']} requests in {report['seconds']}s")
+    for error in report.get('errors', [])[:10]:
+        print(f'  error: {error}')
+    if fake:
+        print(f"fake CMS: {fake.cms.stats['connections']} connections for {fake.cms.stats['requests']} requests")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,9 @@
 import os
-import json
 import re
+import threading
 from .utils import ensure_outputs_dir, write_run_log, seed_from_text, deterministic_choice
-
-try:
-    import openai
-except Exception:
-    openai = None
+from . import serialization
+from .run_context import store
 
 
 def word_count_from_text(text):
@@ -56,10 +53,92 @@ def seo_keywords_and_tags(text):
     return keywords, tags
 
 
-def run_article_checks(article_html_path, out_base='.'):
-    out = ensure_outputs_dir(out_base)
+# Weights of the composite score used to choose between article candidates
+ARTICLE_SCORE_WEIGHTS = {'originality': 0.4, 'readability': 0.35, 'length': 0.25}
+TARGET_WORD_COUNT = 700
+
+
+def article_text(html):
+    """Visible text of an article (tags, styles and scripts removed)."""
+    html = re.sub(r'<(style|script)\b.*?</\1>', ' ', html, flags=re.S | re.I)
+    return re.sub(r'<[^>]+>', ' ', html)
+
+
+def score_article(html):
+    """QA metrics and weighted composite score for one article candidate."""
+    text = article_text(html)
+    wc = word_count_from_text(text)
+    read = readability_score(text)
+    orig = originality_score(text)
+    parts = {
+        'originality': orig,
+        'readability': min(100.0, read),
+        'length': min(1.0, wc / TARGET_WORD_COUNT) * 100,
+    }
+    return {
+        'word_count': wc,
+        'readability_flesch_like': read,
+        'originality_score': orig,
+        'score': round(sum(ARTICLE_SCORE_WEIGHTS[k] * v for k, v in parts.items()), 2),
+    }
+
+
+# One pool per process, started on first use with the forkserver method where
+# available, so scoring never forks the (multi-threaded) daemon or worker itself
+_score_pool = None
+_score_pool_lock = threading.Lock()
+
+
+def _scoring_pool():
+    global _score_pool
+    with _score_pool_lock:
+        if _score_pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _score_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                              mp_context=multiprocessing.get_context(method))
+        return _score_pool
+
+
+def _discard_pool(pool):
+    global _score_pool
+    with _score_pool_lock:
+        if _score_pool is pool:
+            _score_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def score_articles(htmls):
+    """``score_article`` for each HTML string, spread over the shared process pool.
+
+    Falls back to scoring in-process when the pool cannot be started or breaks.
+    """
+    if len(htmls) < 2:
+        return [score_article(h) for h in htmls]
+    from concurrent.futures.process import BrokenProcessPool
+    pool = None
+    try:
+        pool = _scoring_pool()
+        return list(pool.map(score_article, htmls))
+    except (OSError, NotImplementedError, BrokenProcessPool):
+        # no working process support (e.g. sandboxed without /dev/shm) or a crashed worker
+        if pool is not None:
+            _discard_pool(pool)
+        return [score_article(h) for h in htmls]
+
+
+def _article_source(article_html_path, ctx):
+    if ctx is not None and 'article.html' in ctx:
+        return ctx.get('article.html')
     with open(article_html_path, 'r', encoding='utf-8') as f:
-        text = f.read()
+        return f.read()
+
+
+def run_article_checks(article_html_path, out_base='.', ctx=None):
+    """Readability, originality and SEO checks; ``ctx`` supplies the article from memory."""
+    ensure_outputs_dir(out_base)
+    text = _article_source(article_html_path, ctx)
     wc = word_count_from_text(text)
     read = readability_score(text)
     orig = originality_score(text)
@@ -77,32 +156,59 @@ def run_article_checks(article_html_path, out_base='.'):
             'Include a stronger CTA with a link to CALYCO palettes.'
         ]
     }
-    with open(os.path.join(out, 'qa_report.json'), 'w', encoding='utf-8') as f:
-        json.dump(qa, f, ensure_ascii=False, indent=2)
+    store(ctx, out_base, 'qa_report.json', qa, human=True)
     write_run_log(out_base, f"Saved QA report to outputs/qa_report.json")
     return qa
 
 
-def rank_images(image_meta_path, out_base='.'):
-    out = ensure_outputs_dir(out_base)
-    with open(image_meta_path, 'r', encoding='utf-8') as f:
-        meta = json.load(f)
-    # deterministic ranking explanation
+def rank_images(image_meta_path, out_base='.', ctx=None):
+    """Rank the hero variants by pixel quality metrics (see ``image_metrics``).
+
+    Writes the per-variant metric breakdown to ``image_ranking.json``. Without
+    NumPy/Pillow the generator's choice is kept with a heuristic score. With
+    ``ctx`` the metadata and variant images are taken from memory.
+    """
+    ensure_outputs_dir(out_base)
+    meta = ctx.get('image_metadata.json') if ctx is not None else serialization.load(image_meta_path)
     chosen = meta.get('chosen')
-    other = 'A' if chosen == 'B' else 'B'
-    score = deterministic_choice('rank-' + chosen, [78, 82, 88])
-    explanation = f"Variant {chosen} chosen for brand fit: balanced lighting, soft colours and good composition. Score {score}."
-    rank = {'chosen': chosen, 'score': score, 'explanation': explanation}
-    with open(os.path.join(out, 'image_ranking.json'), 'w', encoding='utf-8') as f:
-        json.dump(rank, f, ensure_ascii=False, indent=2)
+    from . import image_metrics
+    if not image_metrics.available():
+        score = deterministic_choice('rank-' + chosen, [78, 82, 88])
+        explanation = f"Variant {chosen} chosen for brand fit: balanced lighting, soft colours and good composition. Score {score}."
+        rank = {'chosen': chosen, 'score': score, 'explanation': explanation, 'method': 'heuristic'}
+    else:
+        img_dir = os.path.dirname(os.path.abspath(image_meta_path))
+        images = {k: ctx.get(name) if ctx is not None else os.path.join(img_dir, name)
+                  for k, name in meta.get('variants', {}).items()}
+        order, results = image_metrics.rank_variants(images)
+        # near-duplicates of recent heroes only win when every variant is one
+        duplicates = {k for k, v in (meta.get('duplicate_check') or {}).items() if v.get('duplicate')}
+        best = next((k for k in order if k not in duplicates), order[0])
+        m = results[best]['metrics']
+        explanation = (f"Variant {best} chosen with score {results[best]['score']}: "
+                       f"contrast {m['contrast']:.3f}, colourfulness {m['colourfulness']:.3f}, "
+                       f"mean luminance {m['luminance']:.2f}, entropy {m['entropy']:.2f} bits, "
+                       f"sharpness {m['sharpness']:.2e}.")
+        rank = {
+            'chosen': best,
+            'score': results[best]['score'],
+            'explanation': explanation,
+            'method': 'metrics',
+            'ranking': order,
+            'weights': image_metrics.METRIC_WEIGHTS,
+            'variants': results,
+            'near_duplicates': sorted(duplicates),
+        }
+        if chosen and best != chosen:
+            rank['generator_choice'] = chosen
+    store(ctx, out_base, 'image_ranking.json', rank)
     write_run_log(out_base, f"Saved image ranking to outputs/image_ranking.json")
     return rank
 
 
-def final_qa(article_html_path, out_base='.'):
-    out = ensure_outputs_dir(out_base)
-    with open(article_html_path, 'r', encoding='utf-8') as f:
-        text = f.read()
+def final_qa(article_html_path, out_base='.', ctx=None):
+    ensure_outputs_dir(out_base)
+    text = _article_source(article_html_path, ctx)
     wc = word_count_from_text(text)
     orig = originality_score(text)
     suggestions = [
@@ -120,7 +226,6 @@ def final_qa(article_html_path, out_base='.'):
         'edit_suggestions': suggestions,
         'alt_texts': alt_texts
     }
-    with open(os.path.join(out, 'final_qa.json'), 'w', encoding='utf-8') as f:
-        json.dump(outjson, f, ensure_ascii=False, indent=2)
+    store(ctx, out_base, 'final_qa.json', outjson, human=True)
     write_run_log(out_base, 'Saved final QA to outputs/final_qa.json')
     return outjson
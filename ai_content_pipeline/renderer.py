@@ -0,0 +1,77 @@
+"""
+Template renderer for article, FAQ, captions and JSON-LD outputs.
+
+Templates live in ``templates/`` and are compiled once per process on first
+use; every later render reuses the compiled template, so batch rendering
+costs one template evaluation per output rather than repeated string
+concatenation. Inputs are content objects from ``content.article_content``.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+SITE_URL = 'https://calyco.example.com'
+
+
+@lru_cache(maxsize=1)
+def get_environment():
+    import jinja2
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(str(TEMPLATE_DIR)),
+        # content is our own or model-generated HTML fragments; only the
+        # title (which may come from an API request) is escaped explicitly
+        autoescape=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+    )
+    env.filters['json'] = json.dumps
+    return env
+
+
+@lru_cache(maxsize=None)
+def get_template(name):
+    return get_environment().get_template(name)
+
+
+def render_article(content):
+    return get_template('article.html').render(content)
+
+
+def render_faq(content):
+    return get_template('faq.html').render(faq=content['faq'])
+
+
+def render_captions(content):
+    return get_template('captions.txt').render(captions=content['captions'])
+
+
+def article_jsonld(title, metadata, text_only, word_count, today):
+    """schema.org Article object written to metadata.json."""
+    return {
+        '@context': 'https://schema.org',
+        '@type': 'Article',
+        'headline': title,
+        'description': metadata.get('meta_description'),
+        'author': {
+            '@type': 'Organization',
+            'name': 'CALYCO',
+            'logo': f'{SITE_URL}/logo.png'
+        },
+        'datePublished': metadata.get('datePublished'),
+        'dateModified': today,
+        'image': f'{SITE_URL}/outputs/hero.png',
+        'articleBody': text_only[:500] + '...',
+        'wordCount': word_count,
+        'keywords': metadata.get('tags', [])
+    }
+
+
+def render_all(content):
+    """Article HTML, FAQ HTML and captions text for one content object."""
+    return {
+        'article_html': render_article(content),
+        'faq_html': render_faq(content),
+        'captions': render_captions(content),
+    }
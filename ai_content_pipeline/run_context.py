@@ -0,0 +1,176 @@
+"""
+In-memory handoff of artifacts between the stages of one run.
+
+A ``RunContext`` holds every artifact a stage produces -- HTML strings,
+dicts, PIL images -- under its ``outputs/`` file name. Later stages read the
+value from memory instead of re-reading the file. Files are written by a
+single background thread in the order artifacts were produced, so
+persistence stays off the critical path; work that needs the files to exist
+(checkpoint records, precompression) is queued on the same thread and runs
+after the writes it depends on.
+
+Artifacts the run did not produce itself (e.g. stages skipped on resume) are
+loaded from disk on first access. Stage functions take ``ctx=None`` and,
+without a context, write synchronously through ``store``.
+"""
+import io
+import os
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from . import serialization
+from .utils import ensure_outputs_dir
+from .storage import get_storage
+
+TEXT_EXTENSIONS = ('.html', '.txt', '.css', '.xml')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def _is_image(value):
+    return hasattr(value, 'save') and hasattr(value, 'mode')
+
+
+def encode(value, human=False):
+    """Bytes written to disk for an artifact value."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if _is_image(value):
+        buf = io.BytesIO()
+        value.save(buf, format='PNG')
+        return buf.getvalue()
+    return serialization.dumps(value, 'json' if human else serialization.ARTIFACT_FORMAT)
+
+
+def decode(name, path):
+    """Artifact value for the file at ``path``, typed by ``name``'s extension."""
+    if name.endswith('.json'):
+        return serialization.load(path)
+    if name.endswith(TEXT_EXTENSIONS):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    if name.endswith(IMAGE_EXTENSIONS):
+        from PIL import Image
+        img = Image.open(path)
+        img.load()
+        return img
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_artifact(path, data):
+    get_storage().write(path, data)
+
+
+def store(ctx, out_base, name, value, human=False, data=None):
+    """Put ``value`` in ``ctx``, or write it straight to ``outputs/`` without one."""
+    if ctx is not None:
+        return ctx.put(name, value, human=human, data=data)
+    write_artifact(os.path.join(ensure_outputs_dir(out_base), name), data if data is not None else encode(value, human))
+    return value
+
+
+class RunContext:
+    """Artifacts of one run, held in memory and persisted in the background."""
+
+    def __init__(self, out_base='.', out_dir=None):
+        self.out_base = str(out_base)
+        self.out_dir = Path(out_dir) if out_dir is not None else Path(ensure_outputs_dir(self.out_base))
+        self._values = {}
+        self._written = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='calyco-persist')
+        self._tasks = []
+
+    def path(self, name):
+        return str(self.out_dir / name)
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def put(self, name, value, human=False, data=None):
+        """Hold ``value`` as artifact ``name`` and queue it for writing.
+
+        ``human`` artifacts are pretty JSON; ``data`` supplies already-encoded
+        bytes (e.g. an image exactly as the API returned it). The value must
+        not be mutated afterwards.
+        """
+        self._values[name] = value
+        self._written[name] = self._writer.submit(self._persist, name, value, human, data)
+        return value
+
+    def alias(self, name, source):
+        """Artifact ``name`` is a byte-for-byte copy of ``source``, encoded once."""
+        self._values[name] = self._values[source]
+        encoded = self._written[source]
+        self._written[name] = self._writer.submit(lambda: self._write(name, encoded.result()))
+
+    def _persist(self, name, value, human, data):
+        return self._write(name, data if data is not None else encode(value, human))
+
+    def _write(self, name, data):
+        write_artifact(self.path(name), data)
+        return data
+
+    def get(self, name, default=None):
+        """The artifact's value, loaded from ``outputs/`` if this run did not produce it."""
+        if name in self._values:
+            return self._values[name]
+        path = self.path(name)
+        if not os.path.exists(path):
+            return default
+        value = self._values[name] = decode(name, path)
+        return value
+
+    def data(self, name):
+        """Bytes of ``name`` as written to disk (waits for the write)."""
+        if name in self._written:
+            return self._written[name].result()
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def names(self):
+        return list(self._written)
+
+    def digests(self, names):
+        """Function returning ``{path: {'size', 'sha256'}}`` for ``names`` as queued now.
+
+        The writes are captured on the calling thread, so later ``put`` calls
+        for the same names do not change what is hashed. Call the function
+        from an ``after_writes`` task queued afterwards: the captured writes
+        have finished by the time it runs, so it never waits on the writer
+        thread from inside it.
+        """
+        pending = {self.path(name): self._written[name] for name in names if name in self._written}
+
+        def compute():
+            out = {}
+            for path, future in pending.items():
+                data = future.result()
+                out[path] = {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+            return out
+        return compute
+
+    def after_writes(self, fn, *args, **kwargs):
+        """Run ``fn`` on the writer thread once everything queued so far is on disk."""
+        task = self._writer.submit(fn, *args, **kwargs)
+        self._tasks.append(task)
+        return task
+
+    def flush(self):
+        """Wait for all queued writes and tasks; re-raises the first failure."""
+        for future in list(self._written.values()) + self._tasks:
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._writer.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
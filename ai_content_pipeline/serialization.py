@@ -0,0 +1,82 @@
+"""
+Serialization of pipeline artifacts.
+
+Every module writes artifacts through ``dump`` and reads them through
+``load``. Files other code (or people) consume directly -- the published
+article JSON, metadata, FAQ and QA reports -- are written as pretty JSON
+with ``human=True``. Internal artifacts (stage handoff files, checkpoints,
+manifests) use ``ARTIFACT_FORMAT``:
+
+- ``compact``: single-line JSON, encoded with ``orjson`` when installed
+- ``msgpack``: MessagePack (needs the optional ``msgpack`` package; falls
+  back to ``compact`` without it)
+- ``json``: pretty JSON everywhere, as before
+
+``load`` sniffs the first byte, so any artifact reads back the same way
+whichever format it was written in and file names never change.
+"""
+import os
+import json
+
+from .utils import optional_import
+
+FORMATS = ('compact', 'msgpack', 'json')
+ARTIFACT_FORMAT = os.environ.get('CALYCO_ARTIFACT_FORMAT', 'compact')
+# First bytes a JSON document can start with; anything else is MessagePack
+_JSON_START = frozenset(b'{["-0123456789tfn \t\r\n')
+
+
+def dumps(obj, fmt='compact'):
+    """Encode ``obj`` as bytes in ``fmt``."""
+    if fmt == 'msgpack':
+        msgpack = optional_import('msgpack')
+        if msgpack is not None:
+            return msgpack.packb(obj, use_bin_type=True)
+        fmt = 'compact'
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown artifact format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    orjson = optional_import('orjson')
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if fmt == 'json' else 0)
+        return orjson.dumps(obj, option=option)
+    if fmt == 'json':
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Decode bytes written by ``dumps`` in any format."""
+    if data[:3] == b'\xef\xbb\xbf':
+        data = data[3:]
+    if data and data[0] not in _JSON_START:
+        msgpack = optional_import('msgpack')
+        if msgpack is None:
+            raise ValueError('artifact is MessagePack but the msgpack package is not installed')
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    orjson = optional_import('orjson')
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def is_binary(path):
+    """True when the artifact at ``path`` was written as MessagePack."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    return bool(head) and head[:3] != b'\xef\xbb\xbf' and head[0] not in _JSON_START
+
+
+def dump(path, obj, human=False, fmt=None):
+    """Atomically write ``obj`` to ``path``; ``human`` artifacts are always pretty JSON."""
+    data = dumps(obj, 'json' if human else (fmt or ARTIFACT_FORMAT))
+    path = os.fspath(path)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
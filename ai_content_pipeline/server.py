@@ -0,0 +1,175 @@
+"""
+Production launcher for the preview app.
+
+Uses gunicorn (worker processes x threads) when it is installed, otherwise
+waitress (threads), and only falls back to the threaded Werkzeug server when
+neither is available. Under gunicorn the master writes its PID and process
+start time to ``outputs/.server.pid`` (removed again on shutdown) so a
+finished run can trigger a graceful reload; the start time guards against
+signalling an unrelated process that reused a stale PID.
+
+    python -m ai_content_pipeline.server --workers 4 --threads 8
+"""
+import os
+import sys
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+
+from .utils import optional_import, write_run_log
+
+BASE = Path(__file__).resolve().parent
+PID_FILE = BASE / 'outputs' / '.server.pid'
+APP_MODULE = 'ai_content_pipeline.app:app'
+
+
+def default_config():
+    """Server settings, overridable through CALYCO_* environment variables."""
+    cpus = os.cpu_count() or 1
+    return {
+        'host': os.environ.get('CALYCO_SERVER_HOST', '127.0.0.1'),
+        'port': int(os.environ.get('CALYCO_SERVER_PORT', '8000')),
+        'workers': int(os.environ.get('CALYCO_WORKERS', str(min(2 * cpus + 1, 9)))),
+        'threads': int(os.environ.get('CALYCO_THREADS', '4')),
+        'keepalive': int(os.environ.get('CALYCO_KEEPALIVE', '5')),
+        'timeout': int(os.environ.get('CALYCO_TIMEOUT', '30')),
+    }
+
+
+def _process_start(pid):
+    """Start time (clock ticks since boot) of ``pid`` from /proc, or None where unavailable."""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # fields after the parenthesised command name; starttime is field 22
+    return stat.rsplit(')', 1)[1].split()[19]
+
+
+def _write_pid_file(server):
+    pid = os.getpid()
+    PID_FILE.write_text(f'{pid}\n{_process_start(pid) or ""}\n')
+
+
+def _remove_pid_file(server):
+    try:
+        if PID_FILE.read_text().split()[0] == str(os.getpid()):
+            PID_FILE.unlink()
+    except (OSError, IndexError):
+        pass
+
+
+def _is_preview_master(pid, start):
+    """True if ``pid`` is still the master that wrote the PID file."""
+    current = _process_start(pid)
+    if current is not None:
+        return current == start
+    # no /proc (e.g. macOS): fall back to the command line
+    try:
+        command = subprocess.run(['ps', '-p', str(pid), '-o', 'command='], capture_output=True, text=True,
+                                 timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return 'gunicorn' in command or 'ai_content_pipeline' in command
+
+
+def _serve_gunicorn(cfg):
+    from gunicorn.app.base import BaseApplication
+
+    class PreviewApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': f"{cfg['host']}:{cfg['port']}",
+                'workers': cfg['workers'],
+                'threads': cfg['threads'],
+                'worker_class': 'gthread',
+                'keepalive': cfg['keepalive'],
+                'timeout': cfg['timeout'],
+                'graceful_timeout': cfg['timeout'],
+                'when_ready': _write_pid_file,
+                'on_exit': _remove_pid_file,
+                'preload_app': False,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from .app import app
+            return app
+
+    PreviewApplication().run()
+
+
+def _serve_waitress(cfg, waitress):
+    from .app import app
+    waitress.serve(app, host=cfg['host'], port=cfg['port'],
+                   threads=cfg['workers'] * cfg['threads'], channel_timeout=cfg['timeout'])
+
+
+def _serve_werkzeug(cfg):
+    from werkzeug.serving import run_simple
+    from .app import app
+    run_simple(cfg['host'], cfg['port'], app, threaded=True)
+
+
+def serve(**overrides):
+    """Run the preview app on the best available production server."""
+    cfg = default_config()
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    write_run_log(str(BASE), f"Starting preview server on {cfg['host']}:{cfg['port']} "
+                             f"(workers={cfg['workers']}, threads={cfg['threads']})")
+    if os.name == 'posix' and optional_import('gunicorn') is not None:
+        return _serve_gunicorn(cfg)
+    waitress = optional_import('waitress')
+    if waitress is not None:
+        return _serve_waitress(cfg, waitress)
+    write_run_log(str(BASE), 'gunicorn/waitress not installed; using threaded Werkzeug server')
+    return _serve_werkzeug(cfg)
+
+
+def reload_server():
+    """Ask a running gunicorn master to gracefully reload its workers.
+
+    Returns True when a reload signal was delivered.
+    """
+    if not hasattr(signal, 'SIGHUP'):
+        return False
+    try:
+        fields = PID_FILE.read_text().split()
+        pid, start = int(fields[0]), fields[1] if len(fields) > 1 else None
+    except (OSError, ValueError, IndexError):
+        return False
+    if not _is_preview_master(pid, start):
+        # the server is gone and the PID may belong to another process now
+        try:
+            PID_FILE.unlink()
+        except OSError:
+            pass
+        write_run_log(str(BASE), f'Removed stale preview server PID file (pid {pid})')
+        return False
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except OSError:
+        return False
+    write_run_log(str(BASE), f'Sent graceful reload to preview server (pid {pid})')
+    return True
+
+
+def main(argv=None):
+    cfg = default_config()
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.server', description='Serve the CALYCO preview app')
+    parser.add_argument('--host', default=cfg['host'])
+    parser.add_argument('--port', type=int, default=cfg['port'])
+    parser.add_argument('--workers', type=int, default=cfg['workers'], help='worker processes')
+    parser.add_argument('--threads', type=int, default=cfg['threads'], help='threads per worker')
+    parser.add_argument('--keepalive', type=int, default=cfg['keepalive'], help='keep-alive seconds')
+    parser.add_argument('--timeout', type=int, default=cfg['timeout'], help='worker/request timeout seconds')
+    args = parser.parse_args(argv)
+    serve(**vars(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
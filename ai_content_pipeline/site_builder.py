@@ -0,0 +1,352 @@
+"""
+Incremental static-site export of generated articles.
+
+Every run with an ``article.html`` becomes ``articles/<slug>/index.html``
+(article body, hero derivatives, FAQ and JSON-LD), plus a paginated index,
+one page per tag and ``sitemap.xml``. ``.manifest.json`` in the site
+directory records each article's source signature (``(mtime_ns, size)`` of
+its artifacts, the same check ``artifact_cache`` uses), so a rebuild only
+re-renders articles whose sources changed; listing pages and the sitemap are
+re-rendered from the stored summaries and rewritten only when their bytes
+change. Templates or base URL changing invalidates every page. Pages are
+minified and link their CSS from ``assets/<hash>.css``, so articles sharing
+a stylesheet share one file.
+
+    python -m ai_content_pipeline.site_builder
+    python -m ai_content_pipeline.site_builder --out /srv/www/blog --base-url https://blog.calyco.example.com
+"""
+import io
+import os
+import re
+import sys
+import html
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .artifact_cache import file_signature
+from .html_optimizer import minify_css, minify_html
+from .renderer import SITE_URL, TEMPLATE_DIR, get_template
+from .utils import optional_import
+from . import serialization
+
+BASE = Path(__file__).resolve().parent
+SITE_DIR = Path(os.environ.get('CALYCO_SITE_DIR', str(BASE / 'site')))
+MANIFEST = '.manifest.json'
+MANIFEST_VERSION = 2
+SOURCE_FILES = ('article.html', 'article.json', 'metadata.json', 'faq.json', 'hero.png')
+# hero.png is published as-is for the largest size; smaller widths are JPEG derivatives
+HERO_WIDTHS = (600, 300)
+HERO_QUALITY = 82
+PAGE_SIZE = 50
+BUILD_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+_asset_lock = threading.Lock()
+
+
+def slugify(text):
+    text = re.sub(r'[^\w\s-]', '', (text or '').lower(), flags=re.ASCII)
+    return re.sub(r'[\s_-]+', '-', text).strip('-') or 'article'
+
+
+def _outputs_article_id(out):
+    """Id of the article currently in ``out``: its run id, else its title slug.
+
+    ``outputs/`` is overwritten by every CLI run, so a fixed id would give each
+    new article the previous one's slug and URL.
+    """
+    run_id = (_read_json(out / 'run_metadata.json') or {}).get('run_id')
+    if run_id:
+        return str(run_id)
+    return slugify((_read_json(out / 'article.json') or {}).get('title'))
+
+
+def discover_sources():
+    """``{article_id: outputs_dir}`` for every queued run and the package outputs."""
+    from .jobs import RUNS_DIR
+    sources = {}
+    if RUNS_DIR.is_dir():
+        for entry in os.scandir(RUNS_DIR):
+            out = Path(entry.path) / 'outputs'
+            if entry.is_dir() and (out / 'article.html').exists():
+                sources[entry.name] = out
+    if (BASE / 'outputs' / 'article.html').exists():
+        sources.setdefault(_outputs_article_id(BASE / 'outputs'), BASE / 'outputs')
+    return sources
+
+
+def source_signature(src):
+    # lists rather than tuples so signatures compare equal after a JSON round trip
+    src = os.fspath(src)
+    return [list(sig) if sig else None
+            for sig in (file_signature(os.path.join(src, name)) for name in SOURCE_FILES)]
+
+
+def _build_key(base_url):
+    """Changes whenever output for unchanged sources would differ."""
+    templates = sorted(str(p.relative_to(TEMPLATE_DIR)) + repr(file_signature(p))
+                       for p in (TEMPLATE_DIR / 'site').glob('*'))
+    return hashlib.sha256(json.dumps([MANIFEST_VERSION, base_url, HERO_WIDTHS, templates]).encode()).hexdigest()
+
+
+def _read_json(path):
+    try:
+        return serialization.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_bytes(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def hero_derivatives(hero):
+    """``[(file, width, bytes)]`` for the hero and its JPEG width derivatives, largest first."""
+    if not hero.exists():
+        return []
+    with open(hero, 'rb') as f:
+        original = f.read()
+    PIL = optional_import('PIL')
+    if PIL is None:
+        return [('hero.png', None, original)]
+    from PIL import Image
+    with Image.open(io.BytesIO(original)) as img:
+        images = [('hero.png', img.width, original)]
+        rgb = img.convert('RGB')
+        for width in HERO_WIDTHS:
+            if width >= rgb.width:
+                continue
+            buf = io.BytesIO()
+            height = round(rgb.height * width / rgb.width)
+            rgb.resize((width, height), Image.LANCZOS).save(buf, format='JPEG', quality=HERO_QUALITY, optimize=True)
+            images.append((f'hero-{width}.jpg', width, buf.getvalue()))
+    return images
+
+
+def _hero_images(hero, dest):
+    """Write the hero and its width derivatives; returns ``[(file, width)]`` largest first."""
+    images = hero_derivatives(hero)
+    for name, _, data in images:
+        _write_bytes(dest / name, data)
+    return [(name, width) for name, width, _ in images]
+
+
+def _hero_markup(images, alt):
+    srcset = ', '.join(f'{name} {width}w' for name, width in images if width)
+    attrs = f' srcset="{srcset}" sizes="(max-width: 900px) 100vw, 900px"' if srcset else ''
+    return (f'<div class="hero-section-image"><img class="hero" src="hero.png"{attrs} '
+            f'alt="{html.escape(alt or "", quote=True)}"></div>')
+
+
+def _stylesheet(css, site_dir):
+    """Content-addressed ``assets/<hash>.css``, written once however many pages share it."""
+    css = minify_css(css)
+    name = f"assets/{hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]}.css"
+    with _asset_lock:
+        if not (site_dir / name).exists():
+            _write_bytes(site_dir / name, css.encode('utf-8'))
+    return name
+
+
+def _tag_list(tags):
+    return [{'name': t, 'slug': slugify(t)} for t in tags or [] if t]
+
+
+def build_article(article_id, src, site_dir, base_url=SITE_URL, slug=None):
+    """Render one article page; returns its summary for listings and the sitemap."""
+    with open(src / 'article.html', 'r', encoding='utf-8') as f:
+        full_html = f.read()
+    article = _read_json(src / 'article.json') or {}
+    jsonld = _read_json(src / 'metadata.json') or {}
+    faq = _read_json(src / 'faq.json') or {}
+    meta = article.get('metadata') or {}
+
+    title = article.get('title') or jsonld.get('headline') or article_id
+    slug = slug or slugify(title)
+    path = f'articles/{slug}/'
+    dest = site_dir / 'articles' / slug
+    url = f'{base_url}/{path}'
+
+    body_match = re.search(r'<body[^>]*>(.*?)</body>', full_html, re.S)
+    body = body_match.group(1) if body_match else full_html
+    css_match = re.search(r'<style[^>]*>(.*?)</style>', full_html, re.S)
+
+    images = _hero_images(src / 'hero.png', dest)
+    if images:
+        alt_match = re.search(r'<!-- HERO_IMAGE_ALT: (.*?) -->', body)
+        hero = _hero_markup(images, alt_match.group(1) if alt_match else title)
+        body, placed = re.subn(r'<div class="hero-section">.*?</div>', hero, body, count=1, flags=re.S)
+        if not placed:
+            body = hero + body
+
+    jsonld = dict(jsonld, url=url, mainEntityOfPage=url)
+    if images:
+        jsonld['image'] = [f'{url}{name}' for name, _ in images]
+    jsonld.pop('articleBody', None)
+    tags = _tag_list(meta.get('tags') or jsonld.get('keywords'))
+    css = (css_match.group(1) if css_match else '') + (faq.get('css') or '')
+    page = get_template('site/article.html').render(
+        title=title, description=meta.get('meta_description') or jsonld.get('description') or '',
+        url=url, root='../../', body=body, faq_html=faq.get('faq_html'), tags=tags,
+        stylesheet=_stylesheet(css, site_dir) if css.strip() else None,
+        # '</' inside a string would end the script element early
+        jsonld=json.dumps(jsonld, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/'),
+    )
+    _write_bytes(dest / 'index.html', minify_html(page).encode('utf-8'))
+
+    thumb = next((name for name, width in reversed(images) if width), None)
+    return {
+        'id': article_id,
+        'slug': slug,
+        'path': path,
+        'title': title,
+        'description': meta.get('meta_description') or jsonld.get('description') or '',
+        'date': meta.get('datePublished') or article.get('date') or jsonld.get('datePublished') or '',
+        'tags': tags,
+        'thumb': f'{path}{thumb}' if thumb else None,
+    }
+
+
+def _listing_pages(summaries, heading, prefix):
+    """``{relative_path: html}`` for a paginated listing under ``prefix``."""
+    pages = {}
+    chunks = [summaries[i:i + PAGE_SIZE] for i in range(0, len(summaries), PAGE_SIZE)] or [[]]
+    paths = [f'{prefix}index.html'] + [f'{prefix}page/{n}/index.html' for n in range(2, len(chunks) + 1)]
+    for n, (chunk, rel) in enumerate(zip(chunks, paths)):
+        depth = rel.count('/')
+        pages[rel] = minify_html(get_template('site/listing.html').render(
+            heading=heading if n == 0 else f'{heading} (page {n + 1})', articles=chunk, root='../' * depth,
+            prev_page=paths[n - 1] if n else None, next_page=paths[n + 1] if n + 1 < len(paths) else None))
+    return pages
+
+
+def _sitemap(summaries, base_url):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+             f'  <url><loc>{base_url}/</loc></url>']
+    for s in summaries:
+        lastmod = f'<lastmod>{html.escape(s["date"])}</lastmod>' if s['date'] else ''
+        lines.append(f'  <url><loc>{html.escape(base_url + "/" + s["path"])}</loc>{lastmod}</url>')
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+
+def shared_pages(summaries, base_url=SITE_URL):
+    """Index, tag pages and sitemap for the given article summaries."""
+    ordered = sorted(summaries, key=lambda s: (s['date'], s['title']), reverse=True)
+    pages = _listing_pages(ordered, 'CALYCO Journal', '')
+    by_tag = {}
+    for s in ordered:
+        for tag in s['tags']:
+            by_tag.setdefault(tag['slug'], (tag['name'], []))[1].append(s)
+    for tag_slug, (name, items) in by_tag.items():
+        pages.update(_listing_pages(items, f'Tagged: {name}', f'tags/{tag_slug}/'))
+    pages['sitemap.xml'] = _sitemap(ordered, base_url)
+    return pages
+
+
+def unique_slugs(articles, sources, previous):
+    """Keep published slugs stable; new articles get a run-id suffix on collision."""
+    taken = {entry['slug']: article_id for article_id, entry in previous.items() if article_id in sources}
+    slugs = {article_id: entry['slug'] for article_id, entry in previous.items() if article_id in sources}
+    for article_id in articles:
+        if article_id in slugs:
+            continue
+        article = _read_json(sources[article_id] / 'article.json') or {}
+        slug = slugify(article.get('title') or article_id)
+        if slug in taken:
+            slug = f'{slug}-{article_id[:8]}'
+        taken[slug] = article_id
+        slugs[article_id] = slug
+    return slugs
+
+
+def build_site(site_dir=None, base_url=SITE_URL, sources=None, force=False, workers=BUILD_WORKERS):
+    """Bring ``site_dir`` up to date with ``sources``; returns a build report."""
+    started = time.perf_counter()
+    site_dir = Path(site_dir or SITE_DIR)
+    base_url = base_url.rstrip('/')
+    sources = sources if sources is not None else discover_sources()
+    manifest = _read_json(site_dir / MANIFEST) or {}
+    key = _build_key(base_url)
+    if force or manifest.get('version') != MANIFEST_VERSION or manifest.get('build_key') != key:
+        manifest = {}
+    previous = manifest.get('articles', {})
+    page_hashes = manifest.get('pages', {})
+
+    signatures = {article_id: source_signature(src) for article_id, src in sources.items()}
+    changed = [a for a in sorted(sources) if a not in previous or previous[a]['signature'] != signatures[a]]
+    slugs = unique_slugs(changed, sources, previous)
+
+    entries = {a: previous[a] for a in sources if a in previous and a not in changed}
+    if changed:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {a: pool.submit(build_article, a, sources[a], site_dir, base_url, slugs[a]) for a in changed}
+            for article_id, future in futures.items():
+                entries[article_id] = {'signature': signatures[article_id], 'slug': slugs[article_id],
+                                       'summary': future.result()}
+
+    removed = [a for a in previous if a not in sources]
+    for article_id in removed:
+        shutil.rmtree(site_dir / 'articles' / previous[article_id]['slug'], ignore_errors=True)
+
+    summaries = sorted((e['summary'] for e in entries.values()), key=lambda s: s['id'])
+    listing_key = hashlib.sha256(json.dumps(summaries, sort_keys=True).encode('utf-8')).hexdigest()
+    written = 0
+    new_hashes = page_hashes
+    if listing_key != manifest.get('listing_key'):
+        new_hashes = {}
+        for rel, text in shared_pages(summaries, base_url).items():
+            data = text.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            new_hashes[rel] = digest
+            if page_hashes.get(rel) != digest or not (site_dir / rel).exists():
+                _write_bytes(site_dir / rel, data)
+                written += 1
+        for rel in set(page_hashes) - set(new_hashes):
+            # tag or index pages that no longer have any articles
+            try:
+                (site_dir / rel).unlink()
+            except OSError:
+                pass
+
+    if changed or removed or written or not manifest:
+        manifest = {'version': MANIFEST_VERSION, 'build_key': key, 'base_url': base_url,
+                    'articles': entries, 'listing_key': listing_key, 'pages': new_hashes}
+        serialization.dump(site_dir / MANIFEST, manifest)
+    return {
+        'site_dir': str(site_dir),
+        'articles': len(entries),
+        'built': len(changed),
+        'removed': len(removed),
+        'pages_written': written,
+        'pages': len(new_hashes),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.site_builder',
+                                     description='Build or update the static article site')
+    parser.add_argument('--out', default=None, help=f'site directory (default {SITE_DIR})')
+    parser.add_argument('--base-url', default=SITE_URL, help='public URL the site is served from')
+    parser.add_argument('--force', action='store_true', help='rebuild every page')
+    args = parser.parse_args(argv)
+    report = build_site(args.out, base_url=args.base_url, force=args.force)
+    print(f"{report['articles']} articles: {report['built']} built, {report['removed']} removed, "
+          f"{report['pages_written']}/{report['pages']} listing pages written in {report['seconds']}s "
+          f"-> {report['site_dir']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
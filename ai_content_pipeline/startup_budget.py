@@ -0,0 +1,118 @@
+"""
+Import-time report and start-up budget check.
+
+Runs a fresh interpreter with ``-X importtime`` for each entry module, parses
+the per-module timings and fails if the cumulative import time exceeds the
+budget or if a CLI entry point pulls in a heavy dependency eagerly.
+
+    python -m ai_content_pipeline.startup_budget --budget-ms 300 --top 10
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+DEFAULT_BUDGET_MS = 300.0
+
+# Entry points that must stay light, and the dependencies they must not load
+# at import time (each is only needed once a particular stage runs).
+CLI_MODULES = [
+    'ai_content_pipeline.main',
+    'ai_content_pipeline.data_collector',
+    'ai_content_pipeline.content_generator',
+    'ai_content_pipeline.image_generator',
+    'ai_content_pipeline.qa_and_valuation',
+]
+HEAVY_MODULES = ['flask', 'PIL', 'openai', 'requests', 'bs4', 'pytrends', 'numpy']
+
+
+def parse_importtime(stderr_text):
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us, depth) rows."""
+    rows = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            # header line: "self [us] | cumulative | imported package"
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, self_us, cumulative_us, depth))
+    return rows
+
+
+def measure(module, python=None):
+    """Import ``module`` in a fresh interpreter and return its parsed timings."""
+    cmd = [python or sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    env = dict(os.environ)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f'importing {module} failed: {proc.stderr.strip().splitlines()[-1:]}')
+    return parse_importtime(proc.stderr)
+
+
+def summarise(module, rows, budget_ms, top=10):
+    """Build a report dict for one entry module."""
+    # depth-0 rows are the top-level imports; their cumulative times add up
+    # to the total time spent importing
+    total_us = sum(cum for _, _, cum, depth in rows if depth == 0)
+    loaded = {name for name, _, _, _ in rows}
+    heavy = sorted(h for h in HEAVY_MODULES if h in loaded)
+    slowest = sorted(rows, key=lambda r: -r[2])[:top]
+    return {
+        'module': module,
+        'total_ms': round(total_us / 1000.0, 1),
+        'budget_ms': budget_ms,
+        'within_budget': total_us / 1000.0 <= budget_ms,
+        'heavy_imports': heavy,
+        'slowest': [{'module': n, 'self_ms': round(s / 1000.0, 2), 'cumulative_ms': round(c / 1000.0, 2)}
+                    for n, s, c, _ in slowest],
+    }
+
+
+def check(modules=None, budget_ms=DEFAULT_BUDGET_MS, top=10):
+    """Measure every module; return (reports, ok)."""
+    reports = []
+    ok = True
+    for module in modules or CLI_MODULES:
+        report = summarise(module, measure(module), budget_ms, top=top)
+        ok = ok and report['within_budget'] and not report['heavy_imports']
+        reports.append(report)
+    return reports, ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.startup_budget',
+                                     description='Check CLI import time against a budget')
+    parser.add_argument('modules', nargs='*', help='modules to measure (default: CLI entry points)')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('CALYCO_IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list per module')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    reports, ok = check(args.modules, budget_ms=args.budget_ms, top=args.top)
+    if args.json:
+        import json
+        print(json.dumps({'ok': ok, 'reports': reports}, indent=2))
+    else:
+        for r in reports:
+            status = 'OK' if r['within_budget'] and not r['heavy_imports'] else 'FAIL'
+            print(f"[{status}] {r['module']}: {r['total_ms']:.1f} ms (budget {r['budget_ms']:.0f} ms)")
+            if r['heavy_imports']:
+                print(f"       eager heavy imports: {', '.join(r['heavy_imports'])}")
+            for s in r['slowest']:
+                print(f"       {s['cumulative_ms']:8.2f} ms  {s['module']}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
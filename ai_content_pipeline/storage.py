@@ -0,0 +1,279 @@
+"""
+Artifact storage backends.
+
+Stage writes (through ``run_context``), precompressed siblings and the
+run-complete marker go through ``get_storage().write(path, data)``; the
+preview server reads through ``fetch_path``. Paths stay local filesystem
+paths under the package directory either way, so the rest of the code keeps
+working with files:
+
+- ``local`` (default): plain atomic writes; reads are the files themselves
+- ``s3://bucket/prefix``: the local tree becomes a write-through,
+  read-through cache of the bucket. Writes land locally and are uploaded
+  under ``prefix`` + their path relative to the package directory (e.g.
+  ``outputs/article.html``, ``runs/<id>/outputs/hero.png``). Large objects
+  use parallel multipart uploads; objects carry their SHA-256 as metadata,
+  so unchanged content is not uploaded again and content this process wrote
+  under another key is copied server-side (after checking, via its hash and
+  ETag, that no other node has overwritten it). Reads check the bucket at
+  most every ``CALYCO_STORAGE_TTL`` seconds and download only when the local
+  copy's hash differs. Needs the optional ``boto3`` package; any
+  S3-compatible service works (MinIO, ``moto_server``) via
+  ``CALYCO_S3_ENDPOINT_URL``.
+
+Files outside the package directory (a custom ``out_base``) and appended
+logs stay local.
+"""
+import os
+import io
+import time
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+
+from .utils import optional_import
+
+BASE = Path(__file__).resolve().parent
+STORAGE_URL = os.environ.get('CALYCO_STORAGE', 'local')
+S3_ENDPOINT_URL = os.environ.get('CALYCO_S3_ENDPOINT_URL') or None
+# Objects above this size are uploaded in parts of this size, several at once
+PART_SIZE = int(float(os.environ.get('CALYCO_S3_PART_MB', '8')) * 1024 * 1024)
+UPLOAD_WORKERS = int(os.environ.get('CALYCO_S3_UPLOAD_WORKERS', '8'))
+# Seconds a checked local copy is trusted before the bucket is asked again
+CACHE_TTL = float(os.environ.get('CALYCO_STORAGE_TTL', '5'))
+
+
+def _write_atomic(path, data):
+    path = os.fspath(path)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _error_code(exc):
+    return str(getattr(exc, 'response', {}).get('Error', {}).get('Code', ''))
+
+
+class LocalStorage:
+    """Artifacts are the files under ``root``."""
+
+    remote = False
+
+    def __init__(self, root=BASE):
+        self.root = str(root)
+
+    def key_for(self, path):
+        """Storage key for a local path, or None when it is outside ``root``."""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == '.' or rel.startswith('..'):
+            return None
+        return rel.replace(os.sep, '/')
+
+    def write(self, path, data):
+        _write_atomic(path, data)
+        return path
+
+    def fetch_path(self, path):
+        """Local path holding the current content of ``path``, or None if it does not exist."""
+        path = os.fspath(path)
+        return path if os.path.isfile(path) else None
+
+    def read(self, path):
+        path = self.fetch_path(path)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def list_dir(self, directory):
+        """Names of the files directly inside ``directory``."""
+        try:
+            return sorted(e.name for e in os.scandir(directory) if e.is_file())
+        except OSError:
+            return []
+
+
+class S3Storage(LocalStorage):
+    """S3-compatible bucket with the local tree as a write-through, read-through cache."""
+
+    remote = True
+
+    def __init__(self, bucket, prefix='', root=BASE, endpoint_url=S3_ENDPOINT_URL, part_size=PART_SIZE,
+                 workers=UPLOAD_WORKERS, ttl=CACHE_TTL, client=None):
+        super().__init__(root)
+        boto3 = optional_import('boto3')
+        if boto3 is None:
+            raise RuntimeError('S3 storage needs the boto3 package (pip install boto3)')
+        from boto3.s3.transfer import TransferConfig
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = client or boto3.client('s3', endpoint_url=endpoint_url)
+        self.transfer = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                       max_concurrency=workers, use_threads=True)
+        self.ttl = ttl
+        self._by_hash = {}   # sha256 -> object key already in the bucket
+        self._checked = {}   # key -> (monotonic time, sha256 in the bucket or None)
+        self._local_sha = {}  # local path -> ((mtime_ns, size), sha256)
+        self._listings = {}  # key prefix -> (monotonic time, names)
+        self._lock = threading.Lock()
+        self.stats = {'uploaded': 0, 'copied': 0, 'unchanged': 0, 'downloaded': 0, 'cache_hits': 0}
+
+    def _object(self, key):
+        return self.prefix + key
+
+    def _count(self, what):
+        with self._lock:
+            self.stats[what] += 1
+
+    def _head(self, obj_key):
+        """``head_object`` of ``obj_key``, or None if it does not exist."""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=obj_key)
+        except Exception as e:
+            if _error_code(e) in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def _remote_sha(self, key):
+        """SHA-256 recorded on the object, '' if it has none, None if it does not exist."""
+        head = self._head(self._object(key))
+        return None if head is None else head.get('Metadata', {}).get('sha256', '')
+
+    def _copy_from(self, source, sha, obj_key, extra):
+        """Server-side copy of ``source`` to ``obj_key`` if it still holds ``sha``; False otherwise.
+
+        Other nodes may have overwritten ``source`` since we wrote it, so its
+        hash is checked and the copy is conditional on the ETag seen.
+        """
+        head = self._head(source)
+        if head is None or head.get('Metadata', {}).get('sha256') != sha:
+            return False
+        try:
+            self.client.copy({'Bucket': self.bucket, 'Key': source}, self.bucket, obj_key,
+                             ExtraArgs=dict(extra, MetadataDirective='REPLACE', CopySourceIfMatch=head['ETag']),
+                             Config=self.transfer)
+        except Exception as e:
+            if _error_code(e) in ('412', 'PreconditionFailed'):
+                return False
+            raise
+        return True
+
+    def _local_digest(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = self._local_sha.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        self._local_sha[path] = (sig, h.hexdigest())
+        return h.hexdigest()
+
+    def put(self, key, data, sha=None):
+        """Upload ``data`` as ``key`` unless the bucket already has it; returns what was done."""
+        sha = sha or hashlib.sha256(data).hexdigest()
+        # the bucket is shared, so what is there now is always asked rather than remembered
+        remote = self._remote_sha(key)
+        extra = {'Metadata': {'sha256': sha},
+                 'ContentType': mimetypes.guess_type(key)[0] or 'application/octet-stream'}
+        source = self._by_hash.get(sha)
+        if remote == sha:
+            action = 'unchanged'
+        elif source is not None and self._copy_from(source, sha, self._object(key), extra):
+            action = 'copied'
+        else:
+            self.client.upload_fileobj(io.BytesIO(data), self.bucket, self._object(key), ExtraArgs=extra,
+                                       Config=self.transfer)
+            action = 'uploaded'
+        with self._lock:
+            # the key's previous content is no longer a valid copy source
+            for stale in [h for h, k in self._by_hash.items() if k == self._object(key)]:
+                del self._by_hash[stale]
+            self._by_hash[sha] = self._object(key)
+            self._checked[key] = (time.monotonic(), sha)
+            self._listings.clear()
+        self._count(action)
+        return action
+
+    def write(self, path, data):
+        path = os.fspath(path)
+        _write_atomic(path, data)
+        key = self.key_for(path)
+        if key is not None:
+            sha = hashlib.sha256(data).hexdigest()
+            st = os.stat(path)
+            self._local_sha[path] = ((st.st_mtime_ns, st.st_size), sha)
+            self.put(key, data, sha)
+        return path
+
+    def fetch_path(self, path):
+        path = os.fspath(path)
+        key = self.key_for(path)
+        if key is None:
+            return super().fetch_path(path)
+        checked = self._checked.get(key)
+        if checked is not None and time.monotonic() - checked[0] < self.ttl:
+            self._count('cache_hits')
+            return super().fetch_path(path)
+        remote = self._remote_sha(key)
+        if remote is not None and (not remote or remote != self._local_digest(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.download'
+            self.client.download_file(self.bucket, self._object(key), tmp, Config=self.transfer)
+            os.replace(tmp, path)
+            self._count('downloaded')
+        with self._lock:
+            self._checked[key] = (time.monotonic(), remote)
+        # objects missing from the bucket (e.g. the appended run log) fall back to the local file
+        return super().fetch_path(path)
+
+    def list_dir(self, directory):
+        key = self.key_for(directory)
+        if key is None:
+            return super().list_dir(directory)
+        prefix = self._object(key + '/')
+        cached = self._listings.get(prefix)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        names = set(super().list_dir(directory))
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter='/'):
+            names.update(obj['Key'][len(prefix):] for obj in page.get('Contents', []))
+        names = sorted(names)
+        with self._lock:
+            self._listings[prefix] = (time.monotonic(), names)
+        return names
+
+
+def open_storage(url=None, **options):
+    """Backend for ``url`` (``local`` or ``s3://bucket/prefix``)."""
+    url = url or STORAGE_URL
+    if url == 'local':
+        return LocalStorage(**options)
+    if url.startswith('s3://'):
+        bucket, _, prefix = url[len('s3://'):].partition('/')
+        if not bucket:
+            raise ValueError(f"no bucket in storage URL '{url}'")
+        return S3Storage(bucket, prefix, **options)
+    raise ValueError(f"unknown storage '{url}' (expected 'local' or s3://bucket/prefix)")
+
+
+_STORAGE = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def get_storage():
+    """The process-wide backend configured by ``CALYCO_STORAGE``."""
+    global _STORAGE
+    if _STORAGE is None:
+        with _STORAGE_LOCK:
+            if _STORAGE is None:
+                _STORAGE = open_storage()
+    return _STORAGE
@@ -0,0 +1,166 @@
+"""
+Bounded-memory rendering for large-format banners.
+
+``render_gradient_tiled`` produces the same image as
+``image_generator._render_gradient`` one horizontal strip at a time. Each strip
+is drawn with ``BLUR_MARGIN`` extra rows above and below so the Gaussian blur
+sees the same neighbourhood it would in the full image; the margins are
+cropped off after blurring. Finished rows go straight to ``PNGStreamWriter``,
+which deflates them incrementally, so peak memory depends on the strip
+height and image width, never on the image height.
+
+    python -m ai_content_pipeline.tiled_render --size 7680x4320 --palette A banner.png
+"""
+import os
+import sys
+import zlib
+import struct
+import argparse
+
+from .utils import optional_import
+
+STRIP_HEIGHT = 256
+# Rows of context above/below each strip; covers the blur kernel's reach
+BLUR_MARGIN = 8
+BLUR_RADIUS = 0.5
+IDAT_CHUNK_BYTES = 1 << 18
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+class PNGStreamWriter:
+    """Write an 8-bit RGB PNG row-block by row-block with constant memory.
+
+    Rows use the PNG "Up" filter when NumPy is available (smooth gradients
+    then compress to almost nothing) and no filter otherwise.
+    """
+
+    def __init__(self, path, width, height, level=6):
+        self.width, self.height = width, height
+        self.path = path
+        self.f = open(path, 'wb')
+        self.f.write(b'\x89PNG\r\n\x1a\n')
+        self.f.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        self.z = zlib.compressobj(level)
+        self.np = optional_import('numpy')
+        self.prev = None
+        self.pending = []
+        self.pending_bytes = 0
+        self.rows_written = 0
+
+    def _emit(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_bytes += len(data)
+        if self.pending_bytes >= IDAT_CHUNK_BYTES:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self.pending:
+            self.f.write(_chunk(b'IDAT', b''.join(self.pending)))
+            self.pending, self.pending_bytes = [], 0
+
+    def write_rows(self, data, rows):
+        """Append ``rows`` rows of packed RGB bytes."""
+        stride = self.width * 3
+        if self.np is not None:
+            np = self.np
+            block = np.frombuffer(data, dtype=np.uint8).reshape(rows, stride)
+            prev = self.prev if self.prev is not None else np.zeros(stride, dtype=np.uint8)
+            filtered = np.empty((rows, stride + 1), dtype=np.uint8)
+            filtered[:, 0] = 2
+            filtered[0, 1:] = block[0] - prev
+            filtered[1:, 1:] = block[1:] - block[:-1]
+            self.prev = block[-1].copy()
+            self._emit(self.z.compress(filtered.tobytes()))
+        else:
+            for r in range(rows):
+                self._emit(self.z.compress(b'\x00' + data[r * stride:(r + 1) * stride]))
+        self.rows_written += rows
+
+    def abort(self):
+        """Close without finishing the image and remove the partial file."""
+        self.f.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f'PNG expects {self.height} rows, got {self.rows_written}')
+        self._emit(self.z.flush())
+        self._flush_idat()
+        self.f.write(_chunk(b'IEND', b''))
+        self.f.close()
+
+
+def _gradient_row(y, height, c1, c2):
+    t = y / float(height)
+    return tuple(int(a * (1 - t) + b * t) for a, b in zip(c1, c2))
+
+
+def _vignette_alpha(y, height):
+    return int((y / height) * 15) if y < height // 2 else int(((height - y) / height) * 15)
+
+
+def iter_gradient_strips(size, colours, strip_height=STRIP_HEIGHT, blur_radius=BLUR_RADIUS, margin=BLUR_MARGIN):
+    """Yield ``(rgb_bytes, rows)`` strips of the hero gradient, top to bottom."""
+    from PIL import Image, ImageDraw, ImageFilter
+    width, height = size
+    c1 = [int(x) for x in colours[0].split(',')]
+    c2 = [int(x) for x in colours[1].split(',')]
+    for y0 in range(0, height, strip_height):
+        y1 = min(height, y0 + strip_height)
+        top, bottom = max(0, y0 - margin), min(height, y1 + margin)
+        strip = Image.new('RGB', (width, bottom - top), color=0)
+        vignette = Image.new('RGBA', strip.size, (0, 0, 0, 0))
+        draw, vdraw = ImageDraw.Draw(strip, 'RGBA'), ImageDraw.Draw(vignette)
+        for y in range(top, bottom):
+            draw.line([(0, y - top), (width, y - top)], fill=_gradient_row(y, height, c1, c2))
+            vdraw.line([(0, y - top), (width, y - top)], fill=(0, 0, 0, _vignette_alpha(y, height)))
+        strip = Image.alpha_composite(strip.convert('RGBA'), vignette).convert('RGB')
+        del vignette
+        if blur_radius:
+            strip = strip.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+        strip = strip.crop((0, y0 - top, width, y0 - top + (y1 - y0)))
+        yield strip.tobytes(), y1 - y0
+
+
+def render_gradient_tiled(path, size, colours, strip_height=STRIP_HEIGHT, blur_radius=BLUR_RADIUS):
+    """Render the hero gradient at any size, streaming strips into a PNG at ``path``."""
+    writer = PNGStreamWriter(path, size[0], size[1])
+    try:
+        for data, rows in iter_gradient_strips(size, colours, strip_height, blur_radius):
+            writer.write_rows(data, rows)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return path
+
+
+def main(argv=None):
+    from .palettes import load_library
+    parser = argparse.ArgumentParser(prog='ai_content_pipeline.tiled_render',
+                                     description='Render a large-format gradient banner with bounded memory')
+    parser.add_argument('output', help='PNG path to write')
+    parser.add_argument('--size', default='7680x4320', help='WIDTHxHEIGHT')
+    parser.add_argument('--palette', default='A', help='palette key from palettes.json')
+    parser.add_argument('--strip-height', type=int, default=STRIP_HEIGHT)
+    args = parser.parse_args(argv)
+
+    palettes = {p['key']: p for p in load_library()}
+    if args.palette not in palettes:
+        parser.error(f"unknown palette '{args.palette}'")
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    render_gradient_tiled(args.output, size, palettes[args.palette]['colours'], strip_height=args.strip_height)
+    print(f'Wrote {size[0]}x{size[1]} banner to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
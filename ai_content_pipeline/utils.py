@@ -1,9 +1,11 @@
 import os
-import json
 import hashlib
 import random
+import importlib
 from datetime import datetime
 
+_MISSING_IMPORTS = set()
+
 
 def now_ts():
     return datetime.utcnow().isoformat() + 'Z'
@@ -23,14 +25,15 @@ def deterministic_choice(seed_text, options):
     return r.choice(options)
 
 
-def save_json(path, obj):
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-
-
-def load_json(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def optional_import(name):
+    """Import an optional dependency on first use; None if it is unavailable."""
+    if name in _MISSING_IMPORTS:
+        return None
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        _MISSING_IMPORTS.add(name)
+        return None
 
 
 def ensure_outputs_dir(base):
@@ -44,3 +47,11 @@ def write_run_log(base, text):
     ts = now_ts()
     with open(path, 'a', encoding='utf-8') as f:
         f.write(f"[{ts}] {text}\n")
+
+
+def mark_run_complete(base):
+    """Touch outputs/.run_complete so preview caches drop stale artifacts."""
+    from .storage import get_storage
+    path = os.path.join(base, 'outputs', '.run_complete')
+    get_storage().write(path, (now_ts() + '\n').encode('utf-8'))
+    return path
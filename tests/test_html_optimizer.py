@@ -0,0 +1,18 @@
+from ai_content_pipeline.html_optimizer import critical_css, optimize_article
+
+AT_RULES = ('@media (max-width:600px){body{font-size:12px}}'
+            '@keyframes fade{from{opacity:0}to{opacity:1}}'
+            '@font-face{font-family:x;src:url(x.woff2)}')
+
+
+def test_at_rules_are_kept_whole():
+    html = (f'<html><head><style>body{{color:red}} {AT_RULES} .unused{{color:blue}}</style></head>'
+            f'<body><p>hi</p></body></html>')
+    optimized, full_css = optimize_article(html)
+    assert f'<style>body{{color:red}}{AT_RULES}</style>' in optimized
+    assert full_css == f'body{{color:red}}{AT_RULES}.unused{{color:blue}}'
+
+
+def test_braces_inside_strings_do_not_split_rules():
+    css = 'p::before{content:"{"}div{color:red}'
+    assert critical_css(css, '<p>x</p>') == 'p::before{content:"{"}'
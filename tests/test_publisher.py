@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+
+from ai_content_pipeline import publisher
+from ai_content_pipeline.tiled_render import PNGStreamWriter
+
+
+def _source(root, name, title):
+    src = root / name
+    src.mkdir()
+    (src / 'article.html').write_text(f'<html><body><h1>{title}</h1><p>Body</p></body></html>', encoding='utf-8')
+    (src / 'article.json').write_text(json.dumps({'title': title, 'metadata': {'tags': ['paint']}}), encoding='utf-8')
+    (src / 'metadata.json').write_text(json.dumps({'headline': title, 'articleBody': 'x'}), encoding='utf-8')
+    (src / 'social_captions.txt').write_text('first\n---\nsecond', encoding='utf-8')
+    writer = PNGStreamWriter(str(src / 'hero.png'), 8, 4)
+    writer.write_rows(bytes(range(4)) * 24, 4)
+    writer.close()
+    return src
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return {name: _source(tmp_path, name, f'Article {name}') for name in ('a1', 'a2')}
+
+
+@pytest.fixture
+def fake():
+    server = publisher.start_fake_cms()
+    yield server
+    server.shutdown()
+
+
+def _publish(server, sources, state_path, **kwargs):
+    cms = publisher.RestCMS(server.url, retries=0)
+    try:
+        return publisher.publish(sources, cms, state_path=state_path, out_base=state_path.parent, **kwargs)
+    finally:
+        cms.close()
+
+
+def test_unchanged_articles_are_skipped_and_edits_republished(tmp_path, sources, fake):
+    (tmp_path / 'outputs').mkdir()
+    state = tmp_path / 'state.json'
+    first = _publish(fake, sources, state)
+    assert (first['created'], first['failed']) == (2, 0)
+    assert set(fake.cms.posts) == {'a1', 'a2'}
+
+    again = _publish(fake, sources, state)
+    assert (again['skipped'], again['requests']) == (2, 0)
+
+    (sources['a2'] / 'social_captions.txt').write_text('edited', encoding='utf-8')
+    edited = _publish(fake, sources, state)
+    assert (edited['skipped'], edited['updated']) == (1, 1)
+    assert fake.cms.posts['a2']['captions'] == ['edited']
+
+    forced = _publish(fake, sources, state, force=True)
+    assert (forced['skipped'], forced['unchanged']) == (0, 2)
+
+
+def test_state_starts_over_for_a_different_cms(tmp_path, sources, fake):
+    (tmp_path / 'outputs').mkdir()
+    state = tmp_path / 'state.json'
+    _publish(fake, sources, state)
+    other = publisher.start_fake_cms()
+    try:
+        report = _publish(other, sources, state)
+        assert (report['created'], report['skipped']) == (2, 0)
+        assert set(other.cms.posts) == {'a1', 'a2'}
+        assert all(m['url'].startswith(other.url) for p in other.cms.posts.values() for m in p['media'])
+    finally:
+        other.shutdown()
+
+
+def test_fake_cms_never_uses_the_default_state(tmp_path, monkeypatch):
+    used = {}
+
+    def fake_publish(cms=None, state_path=None, **kwargs):
+        used['state'] = state_path
+        return {'articles': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0,
+                'media_uploaded': 0, 'media_reused': 0, 'media_failed': 0, 'requests': 0, 'seconds': 0}
+    monkeypatch.setattr(publisher, 'STATE_PATH', tmp_path / 'publish_state.json')
+    monkeypatch.setattr(publisher, 'publish', fake_publish)
+    assert publisher.main(['--fake']) == 0
+    assert used['state'] != publisher.STATE_PATH
@@ -0,0 +1,33 @@
+import time
+import hashlib
+import threading
+
+from ai_content_pipeline import run_context
+from ai_content_pipeline.run_context import RunContext
+
+
+def _slow_writes(monkeypatch, delay=0.2):
+    write = run_context.write_artifact
+
+    def slow(path, data):
+        time.sleep(delay)
+        write(path, data)
+    monkeypatch.setattr(run_context, 'write_artifact', slow)
+
+
+def test_digests_taken_before_a_rewrite_do_not_deadlock(tmp_path, monkeypatch):
+    _slow_writes(monkeypatch)
+    ctx = RunContext(out_dir=tmp_path)
+    ctx.put('article.html', '<p>first</p>')
+    digests = ctx.digests(['article.html'])
+    recorded = ctx.after_writes(lambda: digests())
+    ctx.put('article.html', '<p>second</p>')
+
+    closer = threading.Thread(target=ctx.close, daemon=True)
+    closer.start()
+    closer.join(timeout=10)
+    assert not closer.is_alive(), 'RunContext.close() hung'
+
+    path = str(tmp_path / 'article.html')
+    assert recorded.result()[path]['sha256'] == hashlib.sha256(b'<p>first</p>').hexdigest()
+    assert (tmp_path / 'article.html').read_text(encoding='utf-8') == '<p>second</p>'